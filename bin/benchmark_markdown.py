@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+
+"""
+Time the parsing of large markdown files, to check how parsing scales with
+the size of the content.
+
+The content is made of repeated copies of a source file, or generated: a
+documentation site with the given numbers of sections, or lists with the
+given numbers of items that have fenced code in them.
+
+Examples:
+    $ ./bin/benchmark_markdown.py \
+        openformats/tests/formats/github_markdown_v2/files/1_en.md \
+        --sizes 1 2 5 10 20 50
+    $ ./bin/benchmark_markdown.py --sections 1000 2500 5000 10000
+    $ ./bin/benchmark_markdown.py --list-code 1000 8000 64000
+"""
+
+from __future__ import absolute_import, print_function
+
+import argparse
+import os
+import re
+import sys
+import time
+from io import open
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from openformats.formats import github_markdown, github_markdown_v2  # noqa
+
+
+HANDLERS = {
+    'v1': github_markdown.GithubMarkdownHandler,
+    'v2': github_markdown_v2.GithubMarkdownHandlerV2,
+}
+
+SECTION = u"""\
+## Section {0}
+
+This is the introduction of section {0}, with a [link](https://example.com/{0})
+and some `inline code`.
+
+    $ install --section {0}
+    $ run --section {0}
+
+- The first step of section {0}
+- The second step of section {0}
+- The third step of section {0}
+
+| Option | Description |
+| ------ | ----------- |
+| `--a{0}` | The first option of section {0} |
+| `--b{0}` | The second option of section {0} |
+
+> [!NOTE]
+> Remember to read   the notes of
+> section {0} before moving on.
+
+"""
+
+LIST_ITEM = u"""\
+- Step {0}
+
+    ```
+    run --step {0}
+    ```
+
+Paragraph {0}
+
+"""
+
+
+def repeat_content(source, size):
+    """Return `source`, without its YAML header, repeated to `size` MB."""
+    body = re.sub(r'^---\n[\s\S]*?\n---\n', '', source)
+    return body * max(1, int(size * 1000 * 1000 / len(body)))
+
+
+def make_sections(count):
+    """Return a documentation site of `count` sections. Each section has a
+    heading, a paragraph, a code block, a list, a table and a NOTE block."""
+    return u"# Documentation\n\n" + u"".join(
+        SECTION.format(number) for number in range(count)
+    )
+
+
+def make_list_code(count):
+    """Return `count` list items with fenced code in them, each followed by
+    a paragraph. The lexer outdents the fenced code, so none of it is found
+    in the content as it is."""
+    return u"".join(LIST_ITEM.format(number) for number in range(count))
+
+
+def time_parse(handler_class, label, content):
+    start = time.time()
+    _, stringset = handler_class().parse(content)
+    elapsed = time.time() - start
+    megabytes = len(content) / 1000.0 / 1000
+    print("{:>9}  {:9.2f}  {:8.2f}  {:7d}  {:4.2f}".format(
+        label, megabytes, elapsed, len(stringset), elapsed / megabytes
+    ))
+
+
+def run(args):
+    handler_class = HANDLERS[args.handler]
+    if args.sections:
+        print("sections  size (MB)  time (s)  strings  s/MB")
+        for count in args.sections:
+            time_parse(handler_class, count, make_sections(count))
+    elif args.list_code:
+        print("   items  size (MB)  time (s)  strings  s/MB")
+        for count in args.list_code:
+            time_parse(handler_class, count, make_list_code(count))
+    else:
+        with open(args.inputfile, encoding='utf-8') as f:
+            source = f.read()
+        print("  copies  size (MB)  time (s)  strings  s/MB")
+        for size in args.sizes:
+            content = repeat_content(source, size)
+            time_parse(handler_class, len(content) // len(source), content)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('inputfile', nargs='?',
+                        help="The markdown file to repeat")
+    parser.add_argument('--handler', choices=sorted(HANDLERS), default='v2',
+                        help="The markdown handler to use")
+    parser.add_argument('--sizes', type=float, nargs='+',
+                        default=[1, 2, 5, 10, 20, 50],
+                        help="The sizes of the content to parse, in MB")
+    parser.add_argument('--sections', type=int, nargs='+',
+                        help="Parse generated documentation sites with "
+                             "these numbers of sections instead")
+    parser.add_argument('--list-code', type=int, nargs='+',
+                        help="Parse generated lists with these numbers of "
+                             "items with fenced code instead")
+    args = parser.parse_args()
+    if not (args.inputfile or args.sections or args.list_code):
+        parser.error("an input file, --sections or --list-code is required")
+    run(args)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+
+"""
+Time the compilation of a large generated structured JSON file for many
+languages, one `compile` per language and with a single `compile_many`.
+
+Example:
+    $ ./bin/benchmark_structured_json.py --entries 100000 --languages 5
+"""
+
+from __future__ import absolute_import, print_function
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from openformats.formats.json import StructuredJsonHandler  # noqa
+from openformats.strings import OpenString  # noqa
+
+
+def make_content(entries):
+    """Return structured JSON with `entries` string objects, in groups of
+    ten. Some have a context, a developer comment, a character limit or
+    plurals."""
+    groups = {}
+    for number in range(entries):
+        entry = {"string": "The string number {}".format(number)}
+        if number % 3 == 0:
+            entry["context"] = "context {}".format(number)
+        if number % 5 == 0:
+            entry["developer_comment"] = "A comment for {}".format(number)
+        if number % 7 == 0:
+            entry["character_limit"] = 100
+        if number % 11 == 0:
+            entry["string"] = ("{{count, plural, one {{One item {0}}} "
+                               "other {{# items {0}}}}}".format(number))
+        groups.setdefault("group_{}".format(number // 10), {})[
+            "key_{}".format(number)
+        ] = entry
+    return json.dumps(groups, indent=2)
+
+
+def translate(stringset, language):
+    """Return a copy of `stringset` with every string translated to
+    `language`."""
+    translations = []
+    for string in stringset:
+        strings = {rule: u"{} ({})".format(value, language)
+                   for rule, value in string.strings.items()}
+        translations.append(OpenString(
+            string.key, strings, context=string.context,
+            pluralized=string.pluralized, order=string.order,
+        ))
+    return translations
+
+
+def run(args):
+    content = make_content(args.entries)
+    start = time.time()
+    template, stringset = StructuredJsonHandler().parse(content)
+    print("parse, {:.1f}MB: {:.2f}s".format(len(content) / 1000.0 / 1000,
+                                           time.time() - start))
+
+    stringsets = {
+        u"lang_{}".format(number): translate(stringset, number)
+        for number in range(args.languages)
+    }
+
+    start = time.time()
+    compiled = {
+        language: StructuredJsonHandler().compile(template, translations)
+        for language, translations in stringsets.items()
+    }
+    elapsed = time.time() - start
+    print("compile for each of {} languages: {:.2f}s, {:.2f}s per "
+          "language".format(args.languages, elapsed,
+                            elapsed / args.languages))
+
+    start = time.time()
+    compiled_many = StructuredJsonHandler().compile_many(template,
+                                                         stringsets)
+    elapsed = time.time() - start
+    print("compile_many for {} languages: {:.2f}s, {:.2f}s per "
+          "language".format(args.languages, elapsed,
+                            elapsed / args.languages))
+
+    assert compiled_many == compiled
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--entries', type=int, default=100000,
+                        help="The number of string objects in the file")
+    parser.add_argument('--languages', type=int, default=5,
+                        help="The number of languages to compile for")
+    run(parser.parse_args())
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+
+"""
+Time the parsing of large generated Rails-style YAML files, with the libyaml
+based loader and with the pure Python one.
+
+Example:
+    $ ./bin/benchmark_yaml.py --sizes 1 5 10 30
+"""
+
+from __future__ import absolute_import, print_function
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from openformats.formats.yaml import yaml as yaml_module  # noqa
+from openformats.formats.yaml.utils import TxYamlCLoader  # noqa
+
+
+SECTION = u"""\
+  section_{0}:
+    # The title of section {0}
+    title: Section {0}
+    description: "The description of section {0}, with a %{{count}}"
+    notice: 'A notice for section {0}'
+    body: |
+      The body of section {0},
+      over two lines.
+    summary: >
+      A folded summary
+      of section {0}.
+    items:
+      - First item of {0}
+      - Second item of {0}
+    messages:
+      one: "One message in section {0}"
+      other: "%{{count}} messages in section {0}"
+    anchored: &section_{0} Anchored text of section {0}
+    aliased: *section_{0}
+"""
+
+
+def make_content(size):
+    """Return a Rails-style en.yml of `size` MB."""
+    sections = [u"en:\n"]
+    length = 0
+    number = 0
+    while length < size * 1000 * 1000:
+        section = SECTION.format(number)
+        sections.append(section)
+        length += len(section)
+        number += 1
+    return u"".join(sections)
+
+
+def parse(content, c_loader):
+    """Parse `content` with the libyaml based loader if `c_loader` is set,
+    or with the pure Python one otherwise."""
+    original_loader = yaml_module.TxYamlCLoader
+    if not c_loader:
+        yaml_module.TxYamlCLoader = None
+    try:
+        return yaml_module.YamlHandler().parse(content)
+    finally:
+        yaml_module.TxYamlCLoader = original_loader
+
+
+def run(args):
+    loaders = [False]
+    if TxYamlCLoader is not None:
+        loaders.insert(0, True)
+    else:
+        print("PyYAML was built without libyaml, timing only TxYamlLoader")
+
+    print("size (MB)  loader   time (s)  strings  s/MB")
+    for size in args.sizes:
+        content = make_content(size)
+        megabytes = len(content) / 1000.0 / 1000
+        for c_loader in loaders:
+            start = time.time()
+            _, stringset = parse(content, c_loader)
+            elapsed = time.time() - start
+            print("{:9.1f}  {:7s}  {:8.2f}  {:7d}  {:4.2f}".format(
+                megabytes, 'libyaml' if c_loader else 'python', elapsed,
+                len(stringset), elapsed / megabytes
+            ))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=float, nargs='+',
+                        default=[1, 5, 10, 30],
+                        help="The sizes of the content to parse, in MB")
+    run(parser.parse_args())
@@ -10,7 +10,9 @@ from zipfile import ZIP_DEFLATED, ZipFile
 import six
 from bs4 import BeautifulSoup
 from openformats.handlers import Handler
-from openformats.formats.office_open_xml.parser import OfficeOpenXmlHandler
+from openformats.formats.office_open_xml.parser import (
+    OfficeOpenXmlHandler, TemplateSkeleton, clone_soup
+)
 
 
 class DocxFile(object):
@@ -179,6 +181,7 @@ class DocxHandler(Handler, OfficeOpenXmlHandler):
     EXTRACTS_RAW = False
     name = "DOCX"
     TEXT_ELEMENT_TAG = "w:t"
+    PARAGRAPH_ELEMENT_TAG = "w:p"
 
     @classmethod
     def get_hyperlink_url(cls, element, document_rels):
@@ -276,6 +279,11 @@ class DocxHandler(Handler, OfficeOpenXmlHandler):
         if tblPr.find("w:bidiVisual") is None:
             tblPr.append(soup.new_tag("w:bidiVisual"))
 
+    @classmethod
+    def set_rtl_orientation_all_tables(cls, element, soup):
+        for tbl in element.find_all("w:tbl"):
+            cls.set_rtl_orientation_tables(tbl, soup)
+
     def parse(self, content, **kwargs):
         """
         We will segment the text by paragraph `<w:p>` as this
@@ -326,8 +334,7 @@ class DocxHandler(Handler, OfficeOpenXmlHandler):
             )
 
         if is_rtl:
-            for tbl in soup.find_all("w:tbl"):
-                self.set_rtl_orientation_tables(tbl, soup)
+            self.set_rtl_orientation_all_tables(soup, soup)
 
         docx.set_document(six.text_type(soup))
         docx.set_document_rels(six.text_type(rels_soup))
@@ -335,3 +342,45 @@ class DocxHandler(Handler, OfficeOpenXmlHandler):
         result = docx.compress()
         docx.delete()
         return result
+
+    def _load_skeleton(self, template):
+        docx = DocxFile(template)
+        soup = BeautifulSoup(docx.get_document(), 'xml')
+        rels_soup = BeautifulSoup(docx.get_document_rels(), 'xml')
+
+        document = TemplateSkeleton(soup, TemplateSkeleton.outermost(
+            soup.find_all('w:p', attrs={'txid': True})
+        ))
+        # Tables nested in paragraphs (eg in text boxes) need to be turned
+        # RTL along with the paragraph that contains them
+        slots_with_tables = {
+            index
+            for index, slot in enumerate(document.slots)
+            if slot.find('w:tbl') is not None
+        }
+        return docx, (document, rels_soup, slots_with_tables)
+
+    def _compile_skeleton(self, docx, skeleton, stringset, is_rtl=False):
+        document, rels_soup, slots_with_tables = skeleton
+        rels_soup = clone_soup(rels_soup)
+
+        compiled = self._compile_paragraph_slots(
+            document, rels_soup, stringset, is_rtl=is_rtl,
+            force=slots_with_tables if is_rtl else (),
+        )
+        rendered = {}
+        for index, element in six.iteritems(compiled):
+            if is_rtl:
+                self.set_rtl_orientation_all_tables(element, document.soup)
+            rendered[index] = document.render(element)
+
+        prepare = None
+        if is_rtl:
+            def prepare(soup):
+                self.set_rtl_orientation_all_tables(soup, soup)
+
+        docx.set_document(
+            document.join(rendered, variant=is_rtl, prepare=prepare)
+        )
+        docx.set_document_rels(six.text_type(rels_soup))
+        return docx.compress()
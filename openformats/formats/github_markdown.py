@@ -1,19 +1,71 @@
 from __future__ import absolute_import
 
 import re
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import chain
 
 import six
 
-from mistune import BlockLexer, Markdown
+from mistune import BlockLexer, preprocessing
 from openformats.utils.compat import ensure_unicode
 
 from ..handlers import Handler
 from ..strings import OpenString
+from ..transcribers import Transcriber
 from ..utils.compilers import OrderedCompilerMixin
 from ..utils.newlines import find_newline_type, force_newline_type
 
 
-def string_handler(token, template):
+class CodeBlockIndex(object):
+    """
+    Finds the indentation of code blocks in a markdown template.
+
+    The lines of the template that are indented enough to be code are
+    indexed by their content without the leading spaces, the first time a
+    code block is looked up, so a lookup only goes through the lines of the
+    template that look the same as the line it is looking for.
+    """
+
+    # Lines of a code block are indented by at least 4 spaces
+    MIN_INDENTATION = 4
+
+    def __init__(self, template):
+        self.template = template
+        self._lines = None
+
+    def _index(self):
+        lines = {}
+        start = 0
+        for line in self.template.split('\n'):
+            content = line.lstrip(' ')
+            indentation = len(line) - len(content)
+            if content and indentation >= self.MIN_INDENTATION:
+                starts, indentations = lines.setdefault(content, ([], []))
+                starts.append(start)
+                indentations.append(indentation)
+            start += len(line) + 1
+        return lines
+
+    def find_indentation(self, line, pos=0):
+        """
+        Return the extra spaces `line` is indented with in the template,
+        preferring the first line after `pos`, or None if the template has
+        no such line.
+        """
+        if self._lines is None:
+            self._lines = self._index()
+        content = line.lstrip(' ')
+        indentation = len(line) - len(content)
+        starts, indentations = self._lines.get(content, ((), ()))
+        first = bisect_right(starts, pos)
+        for i in chain(range(first, len(starts)), range(first)):
+            if indentations[i] >= indentation:
+                return ' ' * (indentations[i] - indentation)
+        return None
+
+
+def string_handler(token, template, pos=0, code_blocks=None):
     """
     Extra checks and manipulation of extracted string from markdown file.
     Parameters:
@@ -21,6 +73,9 @@ def string_handler(token, template):
            type of markdown element this string belongs to. string_type
            can be None.
     template: the template of the resource
+    pos: the position in the template to start looking for the string from
+    code_blocks: a CodeBlockIndex of the template, to share between the
+                 strings of the same template
 
     returns: the manipulated string or None in case the manipulated string
              is not valid anymore e.g. empty string
@@ -33,12 +88,10 @@ def string_handler(token, template):
     # the source file both for matching the string and replacing it in the
     # template and for producing a valid markdown on compilation
     if key == 'block_code':
+        if code_blocks is None:
+            code_blocks = CodeBlockIndex(template)
         lines = string.split('\n')
-        line = lines[0]
-        spaces = re.findall(
-            ensure_unicode(r'\n( *){}').format(re.escape(line)),
-            template
-        )[0]
+        spaces = code_blocks.find_indentation(lines[0], pos)
         if spaces:
             string = ''
             for line in lines:
@@ -75,65 +128,141 @@ def string_handler(token, template):
     return string
 
 
+def get_block_ends(spans, offset=0, slack=0):
+    """
+    Return the positions in the content that the strings of `spans`, the
+    `md_spans` of a TxBlockLexer, can end at.
+
+    The lexer works on the content after mistune's preprocessing, that
+    starts at `offset` of the content and is `slack` characters shorter than
+    it, since preprocessing never makes text longer.
+    """
+    return [offset + end + slack for _, end in spans]
+
+
+@lru_cache(maxsize=None)
+def _positional_rule(rule):
+    """Return `rule` without the `^` anchor of mistune's grammar, since
+    `rule.match(text, pos)` already anchors it at `pos` while `^` would only
+    match at the start of the text."""
+    pattern = rule.pattern
+    if pattern.startswith('^'):
+        pattern = pattern[1:]
+    return re.compile(pattern, rule.flags)
+
+
 class TxBlockLexer(BlockLexer):
+    """
+    Block lexer that collects the strings of the blocks it matches in
+    `md_stringset`.
+
+    For each string, `md_spans` holds the `(start, end)` span of the text it
+    was found in: the item, for the strings of a top level list, or else the
+    top level block. Strings that are changed by the lexer, eg the fenced
+    code of list items that gets outdented, may not appear in the content
+    as they are, so looking them up only in their span keeps each miss as
+    cheap as the block it comes from.
+
+    All the state of a parse lives on the lexer instance, so a new lexer is
+    used for each parse.
+    """
 
-    md_stringset = []
+    # The following parser rules call `self.parse` recursively. We don't
+    # catch matches for such rules to avoid getting duplicated parts of the
+    # markdown content in the `self.md_stringset` because of the recursion.
+    PARSER_RULES = ('list_block', 'def_footnotes')
+    TABLE_RULES = ('table', 'nptable')
+
+    def __init__(self, *args, **kwargs):
+        super(TxBlockLexer, self).__init__(*args, **kwargs)
+        self.md_stringset = []
+        self.md_spans = []
+        self._matchers = {}
+        # The number of `parse` calls in progress, 1 for the top level blocks
+        self._depth = 0
+        self._span = None
+        self._item_spans = None
 
     # Overwritten to not drop `>` character from quote block
     def parse_block_quote(self, m):
         self.tokens.append({'type': 'block_quote_start'})
         self.tokens.append({'type': 'block_quote_end'})
 
+    def parse_list_block(self, m):
+        if self._depth == 1:
+            # Each item of a top level list is parsed on its own, in order
+            start = m.start()
+            self._item_spans = iter([
+                (start + item.start(), start + item.end())
+                for item in self.rules.list_item.finditer(m.group(0))
+            ])
+        super(TxBlockLexer, self).parse_list_block(m)
+        if self._depth == 1:
+            self._item_spans = None
+
+    def get_matchers(self, rules):
+        """Return a (key, match, parse) tuple for each of `rules`, resolving
+        the regular expression and parse method of each rule once."""
+        rules = tuple(rules)
+        matchers = self._matchers.get(rules)
+        if matchers is None:
+            matchers = self._matchers[rules] = [
+                (key,
+                 _positional_rule(getattr(self.rules, key)).match,
+                 getattr(self, 'parse_%s' % key))
+                for key in rules
+            ]
+        return matchers
+
     def parse(self, text, rules=None):
         text = text.rstrip('\n')
-        parser_rules = ('list_block', 'def_footnotes')
-        table_rules = ('table', 'nptable')
 
         if not rules:
             rules = self.default_rules
+        matchers = self.get_matchers(rules)
 
-        def manipulate(text):
-            for key in rules:
-                rule = getattr(self.rules, key)
-                m = rule.match(text)
-                if not m:
-                    continue
-                getattr(self, 'parse_%s' % key)(m)
-                return key, m
-            return False  # pragma: no cover
-        while text:
-            m = manipulate(text)
-            if isinstance(m, tuple):
-                key, m = m
-            else:
-                key = False
-            if m is not False:
-
-                # The following parser rules called by `manipulate` call
-                # `self.parse` recursively. We don't catch matches for such
-                # methods to avoid getting duplicated parts of the markdown
-                # content in the `self.md_stringset` because of the recursion.
-                if key and key in table_rules:
-                    table_token = self.tokens[-1]
-                    keys = list(six.iterkeys(table_token))
-                    if 'header' in keys and 'cells' in keys:
-                        self.md_stringset.extend(
-                            [(h, 'header') for h in table_token['header']])
-                        self.md_stringset.extend(
-                            [(cell, 'cell') for row in table_token['cells']
-                                for cell in row]
-                        )
-                elif key and key not in parser_rules:
-                    # Grab md string match and put in a md_stringset list.
-                    self.md_stringset.append((m.group(0), key))
-
-                text = text[len(m.group(0)):]
-                continue
-            if text:  # pragma: no cover
-                raise RuntimeError('Infinite loop at: %s' % text)
+        if self._depth == 1 and self._item_spans is not None:
+            self._span = next(self._item_spans, self._span)
+        self._depth += 1
+        try:
+            self._parse(text, matchers)
+        finally:
+            self._depth -= 1
 
         return self.tokens
 
+    def _parse(self, text, matchers):
+        # Blocks are matched at a position of the text that moves forward,
+        # rather than by cutting each match off the start of the text
+        pos = 0
+        end = len(text)
+        while pos < end:
+            for key, match, parse in matchers:
+                m = match(text, pos)
+                if m:
+                    break
+            else:  # pragma: no cover
+                raise RuntimeError('Infinite loop at: %s' % text[pos:])
+            if self._depth == 1:
+                self._span = m.span()
+            parse(m)
+
+            if key in self.TABLE_RULES:
+                table_token = self.tokens[-1]
+                if 'header' in table_token and 'cells' in table_token:
+                    strings = [(h, 'header') for h in table_token['header']]
+                    strings.extend([(cell, 'cell')
+                                    for row in table_token['cells']
+                                    for cell in row])
+                    self.md_stringset.extend(strings)
+                    self.md_spans.extend([self._span] * len(strings))
+            elif key not in self.PARSER_RULES:
+                # Grab md string match and put in a md_stringset list.
+                self.md_stringset.append((m.group(0), key))
+                self.md_spans.append(self._span)
+
+            pos = m.end()
+
 
 class GithubMarkdownHandler(OrderedCompilerMixin, Handler):
     name = "Github_Markdown"
@@ -207,28 +336,40 @@ class GithubMarkdownHandler(OrderedCompilerMixin, Handler):
             md_content = content
 
         block = TxBlockLexer()
-        markdown = Markdown(block=block)
-
-        # Making sure stringset is empty because of recursive inside `markdown`
-        block.md_stringset = []
-
-        # Command that populates block.stringset var
-        markdown(md_content)
 
+        # Command that populates block.md_stringset var. Only the block lexer
+        # is needed for this, so the content is not rendered to HTML
+        md_text = preprocessing(md_content)
+        block(md_text)
+
+        # The strings are replaced in the order they appear in the content,
+        # so the rest of the content is searched from the transcriber's
+        # position up to the end of the block the string was found in
+        header_end = len(yaml_header_content)
+        block_ends = get_block_ends(block.md_spans, header_end,
+                                    len(md_content) - len(md_text))
+        code_blocks = CodeBlockIndex(template)
+        transcriber = Transcriber(template)
         order = 0
-        curr_pos = 0
-        for string in (yaml_stringset + block.md_stringset):
-            string = string_handler(string, template)
-            if string and string in template[curr_pos:]:
-                string_object = OpenString(six.text_type(order),
-                                           string,
-                                           order=order)
-                order += 1
-                stringset.append(string_object)
-                # Keep track of the index of the last replaced hash
-                template = template[:curr_pos] + template[curr_pos:].replace(
-                    string, string_object.template_replacement, 1
-                )
-                curr_pos = template.find(string_object.template_replacement)
-                curr_pos = curr_pos + len(string_object.template_replacement)
+        for string, end in zip(yaml_stringset + block.md_stringset,
+                               [header_end] * len(yaml_stringset) +
+                               block_ends):
+            string = string_handler(string, template, transcriber.ptr,
+                                    code_blocks)
+            if not string:
+                continue
+            start = template.find(string, transcriber.ptr, end)
+            if start == -1:
+                continue
+            string_object = OpenString(six.text_type(order),
+                                       string,
+                                       order=order)
+            order += 1
+            stringset.append(string_object)
+            transcriber.copy_until(start)
+            transcriber.add(string_object.template_replacement)
+            transcriber.skip(len(string))
+
+        transcriber.copy_until(len(template))
+        template = transcriber.get_destination()
         return force_newline_type(template, newline_type), stringset
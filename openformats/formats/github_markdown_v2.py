@@ -4,10 +4,12 @@ import re
 
 import six
 import unicodedata
-from mistune import Markdown
+from mistune import preprocessing
 from yaml.reader import Reader
 
-from openformats.formats.github_markdown import TxBlockLexer, string_handler
+from openformats.formats.github_markdown import (CodeBlockIndex, TxBlockLexer,
+                                                 get_block_ends,
+                                                 string_handler)
 from openformats.formats.yaml import YamlHandler
 from openformats.utils.compat import ensure_unicode
 
@@ -38,6 +40,13 @@ class GithubMarkdownHandlerV2(OrderedCompilerMixin, Handler):
     PIPE = '|'
 
     SUPPORTED_BLOCK_LABELS = ['NOTE', 'TIP', 'WARNING', 'IMPORTANT', 'CAUTION']
+    BLOCK_LABEL_PATTERN = re.compile(
+        r'^\s*>\s{{0,4}}\[!({})\]'.format('|'.join(SUPPORTED_BLOCK_LABELS))
+    )
+
+    WHITESPACE = re.compile(r'\s+')
+
+    HASH_REGEX = re.compile(r'[a-f0-9]{32}_tr')
 
     # A string that looks like '\u0008'
     ESCAPED_UNICODE = re.compile(r'\\u[a-fA-F0-9]{4}')
@@ -45,20 +54,28 @@ class GithubMarkdownHandlerV2(OrderedCompilerMixin, Handler):
     ESCAPED_UNICODE_HEX = re.compile(r'\\x[a-fA-F0-9]{2}')
 
     def compile(self, template, stringset, **kwargs):
-        # assume stringset is ordered within the template
         transcriber = Transcriber(template)
         template = transcriber.source
 
-        for openstring in stringset:
+        strings = {openstring.template_replacement: openstring
+                   for openstring in stringset}
+
+        # The hashes are located in a single pass over the template, so the
+        # output follows the template whatever the order of the stringset.
+        # Hashes of strings that are not in the stringset are left as they are
+        for match in self.HASH_REGEX.finditer(template):
+            openstring = strings.pop(match.group(), None)
+            if openstring is None:
+                continue
+
             tr_string = openstring.string
             if self._is_yaml_string(openstring):
                 self._escape_invalid_chars(openstring)
                 tr_string = self._transform_yaml_string(openstring)
 
-            hash_position = template.index(openstring.template_replacement)
-            transcriber.copy_until(hash_position)
+            transcriber.copy_until(match.start())
             transcriber.add(tr_string)
-            transcriber.skip(len(openstring.template_replacement))
+            transcriber.skip(match.end() - match.start())
 
         transcriber.copy_until(len(template))
         compiled = transcriber.get_destination()
@@ -99,84 +116,88 @@ class GithubMarkdownHandlerV2(OrderedCompilerMixin, Handler):
         else:
             md_content = content
 
-        md_template = md_content
-
         block = TxBlockLexer()
-        markdown = Markdown(block=block)
-
-        # Making sure stringset is empty because of recursive inside `markdown`
-        block.md_stringset = []
 
-        # Command that populates block.stringset var
-        markdown(md_content)
+        # Command that populates block.md_stringset var. Only the block lexer
+        # is needed for this, so the content is not rendered to HTML
+        md_text = preprocessing(md_content)
+        block(md_text)
 
         stringset.extend(yaml_stringset)
         order = len(stringset)
-        curr_pos = 0
 
-        block_label_string = ("|").join(self.SUPPORTED_BLOCK_LABELS)
-        block_pattern = rf'^\s*>\s{{0,4}}\[!({block_label_string})\]'
-
-        for string in block.md_stringset:
-            string = string_handler(string, md_template)
+        # The strings are replaced in the order they appear in the content,
+        # so the template is built with a transcriber that moves forward
+        # over the content, and the rest of the content is searched from its
+        # position up to the end of the block the string was found in
+        transcriber = Transcriber(md_content)
+        code_blocks = CodeBlockIndex(md_content)
+        block_ends = get_block_ends(block.md_spans,
+                                    slack=len(md_content) - len(md_text))
+
+        for string, end in zip(block.md_stringset, block_ends):
+            string = string_handler(string, md_content, transcriber.ptr,
+                                    code_blocks)
             # Ignore any string that does not appear in the template,
             # We do this to avoid parsing strings that are not properly
             # handled by the Markdown library, such as ```code``` blocks
-            if string and (
-                bool(re.match(block_pattern, string))
-                or string in md_template[curr_pos:]
-            ):
-                # Special handling for [!NOTE] blocks
-                if bool(re.match(block_pattern, string)):
-                    start, end = self.find_fuzzy_substring(
-                        string, md_template, curr_pos
-                    )
-                    if start is not None and end is not None:
-                        string_object = OpenString(
-                            six.text_type(order), string, order=order
-                        )
-                        order += 1
-                        stringset.append(string_object)
-                        md_template = (
-                            md_template[:start] + string_object.template_replacement
-                            + md_template[end:]
-                        )
-                        curr_pos = start + len(string_object.template_replacement)
-                elif string in md_template[curr_pos:]:
-                    string_object = OpenString(
-                        six.text_type(order), string, order=order
-                    )
-                    order += 1
-                    stringset.append(string_object)
-                    # Keep track of the index of the last replaced hash
-                    md_template = (
-                        md_template[:curr_pos] + md_template[curr_pos:].replace(
-                            string, string_object.template_replacement, 1)
-                    )
+            if not string:
+                continue
+            # Special handling for [!NOTE] blocks
+            if self.BLOCK_LABEL_PATTERN.match(string):
+                match = self.find_fuzzy_substring(string, md_content,
+                                                  transcriber.ptr, end)
+                if match is None:
+                    continue
+                start, end = match
+            else:
+                start = md_content.find(string, transcriber.ptr, end)
+                if start == -1:
+                    continue
+                end = start + len(string)
+
+            string_object = OpenString(
+                six.text_type(order), string, order=order
+            )
+            order += 1
+            stringset.append(string_object)
+            transcriber.copy_until(start)
+            transcriber.add(string_object.template_replacement)
+            transcriber.skip_until(end)
 
-                    curr_pos = md_template.find(string_object.template_replacement)
-                    curr_pos = curr_pos + len(string_object.template_replacement)
+        transcriber.copy_until(len(md_content))
+        md_template = transcriber.get_destination()
 
         template = yaml_template + seperator + md_template
         return force_newline_type(template, newline_type), stringset
-    
-    def find_fuzzy_substring(self, pattern, text, pos=0):
-        # Split pattern into non-whitespace tokens
-        tokens = re.findall(r'\S+', pattern)
-        if not tokens:
-            return None
 
-        # Escape each token literally; join with \s+ (any whitespace)
-        core = r'\s+'.join(re.escape(token) for token in tokens)
+    def find_fuzzy_substring(self, pattern, text, pos=0, endpos=None):
+        """Find `pattern` in `text[pos:endpos]`, allowing any whitespace
+        between its words.
 
-        # Allow optional whitespace before/after the core to absorb indentation
-        regex = rf'(?P<pre>\s*)({core})(?P<post>\s*)'
-
-        m = re.compile(regex).search(text, pos)
-        if not m:
+        :return: the start and end positions of the match or None
+        """
+        # Split pattern into non-whitespace tokens
+        tokens = pattern.split()
+        if not tokens:
             return None
-
-        return m.start(2), m.end(2)
+        if endpos is None:
+            endpos = len(text)
+
+        first, rest = tokens[0], tokens[1:]
+        start = text.find(first, pos, endpos)
+        while start != -1:
+            end = start + len(first)
+            for token in rest:
+                whitespace = self.WHITESPACE.match(text, end, endpos)
+                if not whitespace or not text.startswith(
+                        token, whitespace.end(), endpos):
+                    break
+                end = whitespace.end() + len(token)
+            else:
+                return start, end
+            start = text.find(first, start + 1, endpos)
+        return None
 
     def _is_yaml_string(self, string):
         """Return True if the given open string is in YAML format, False otherwise.
@@ -203,18 +224,16 @@ class GithubMarkdownHandlerV2(OrderedCompilerMixin, Handler):
         :param OpenString openstring: the string object to check and update
         """
         # Check each plural rule of the string
+        # If a control character is found (e.g. backspace)
+        # escape it to a unicode format, e.g. \u007f
         for rule, string in six.iteritems(openstring.strings):
-            chars = []
-            # Go through each character
-            # If a control character is found (e.g. backspace)
-            # escape it to a unicode format, e.g. \u007f
-            for char in string:
-                if Reader.NON_PRINTABLE.match(char):
-                    chars.append('\\u{:04x}'.format(ord(char)))
-                else:
-                    chars.append(char)
+            openstring._strings[rule] = Reader.NON_PRINTABLE.sub(
+                self._escape_non_printable, string
+            )
 
-            openstring._strings[rule] = u"".join(chars)
+    @staticmethod
+    def _escape_non_printable(match):
+        return '\\u{:04x}'.format(ord(match.group()))
 
     def _unescape_non_printable(self, openstring):
         """Unescape any invalid (non-printable) characters in the given string.
@@ -3,6 +3,7 @@ from __future__ import absolute_import
 import io
 import re
 import unicodedata
+from functools import lru_cache
 from itertools import count
 
 import six
@@ -10,7 +11,6 @@ import six
 from lxml import etree
 from openformats.handlers import Handler
 from openformats.strings import OpenString
-from openformats.transcribers import Transcriber
 from openformats.utils.compat import ensure_unicode
 from ucf import UCF
 
@@ -21,6 +21,11 @@ class InDesignHandler(Handler):
 
     IDML files contain multiple XML fragments that can be parsed to extract
     strings from.
+
+    Stories are independent of each other, so both `parse` and `compile`
+    accept an optional `executor` (a `concurrent.futures.Executor`) to process
+    them in parallel. The results are merged in the order the stories appear
+    in the document, so the output is identical to that of a serial run.
     """
 
     name = "InDesign"
@@ -35,6 +40,30 @@ class InDesignHandler(Handler):
     SPECIAL_CHARACTERS_REGEX = re.compile(
         ensure_unicode(r'<\?ACE \d+\?>|<Br/>;')
     )
+    HASH_REGEX = re.compile(ensure_unicode(r'[a-z,0-9]{32}_tr'))
+    # ASCII letters, punctuation and symbols, ie everything printable except
+    # for the digits and the space
+    TRANSLATABLE_ASCII_REGEX = re.compile(ensure_unicode(r'[!-/:-~]'))
+    # Anything that `float()` may accept; the actual conversion is only
+    # attempted for strings that match
+    NUMBER_REGEX = re.compile(
+        ensure_unicode(
+            r'[-+]?(?:[\d_.]+(?:e[-+]?[\d_]+)?|nan|inf(?:inity)?)'
+        ),
+        re.IGNORECASE,
+    )
+    # Valid XML escape sequences and the special character tags of
+    # https://mayart.de/download/Indesign-IDML/special-idml-chars.pdf are left
+    # as they are, "lonely" `&` and `<` are escaped
+    ESCAPE_REGEX = re.compile(ensure_unicode(
+        r'&(?:lt|gt|amp|apos|quot|#\d+|#x[0-9a-fA-F]+);'
+        r'|<(?:\?ACE 18\?|\?ACE 19\?|\?ACE 3\?|\?ACE 8\?|\?ACE 7\?|Br/)>'
+        r'|[&<]'
+    ))
+    ESCAPES = {u'&': u'&amp;', u'<': u'&lt;'}
+    # IDML stories repeat the same short runs (bullets, numbers, punctuation)
+    # a lot, so the skip decisions are memoized
+    SKIP_CACHE_SIZE = 4096
 
     """ Parse Methods """
 
@@ -43,30 +72,28 @@ class InDesignHandler(Handler):
         self.stringset = []
         super(InDesignHandler, self).__init__(*args, **kwargs)
 
-    def parse(self, content, **kwargs):
+    def parse(self, content, executor=None, **kwargs):
         """ Parses .idml file content and returns the resource template and
             stringset.
             * Use UCF to unpack `content` to xml fragments
             * Parse all Story fragments to extract the translatable strings
-              and replace them with a replacement hash
+              and replace them with a replacement hash. If an `executor` is
+              given, the stories are split into strings in parallel and the
+              orders are assigned afterwards, following the story order
             * Pack the fragments back to create the template
             * Return the (template, stringset) tuple
         """
 
         idml = UCF(io.BytesIO(content))
-        ordered_stories = self._get_ordered_stories(idml)
+        stories = self._read_stories(idml)
+        mapper = map if executor is None else executor.map
 
         # Iterate over the contents of the IDML file
-        for key in ordered_stories:
-            try:
-                # No matter what, idml values are bytes
-                story_content = idml[key].decode('utf8')
-            except KeyError:
-                continue
-            story_content = self._find_and_replace(story_content)
-
+        split_stories = mapper(self._split_story,
+                               [story_content for _, story_content in stories])
+        for (key, _), pieces in zip(stories, split_stories):
             # Update the XML file to contain the template strings
-            idml[key] = story_content.encode('utf-8')
+            idml[key] = self._join_story(pieces).encode('utf-8')
 
         out = io.BytesIO()
         idml.save(out)
@@ -101,39 +128,57 @@ class InDesignHandler(Handler):
         story_keys.extend(all_stories - set(story_keys))
         return story_keys
 
-    def _can_skip_content(self, string):
+    def _read_stories(self, idml):
+        """ Returns a list of `(key, story_content)` tuples for the stories
+        of `idml`, in the order returned by `_get_ordered_stories`.
+        """
+        stories = []
+        for key in self._get_ordered_stories(idml):
+            try:
+                # No matter what, idml values are bytes
+                story_content = idml[key].decode('utf-8')
+            except KeyError:
+                continue
+            stories.append((key, story_content))
+        return stories
+
+    @classmethod
+    @lru_cache(maxsize=SKIP_CACHE_SIZE)
+    def _can_skip_content(cls, string):
         """
         Checks if the contents of an XML files are translateable.
         Strings that contain only special characters or can be evaluated
         to a nunber are skipped.
         """
-        stripped_string = re.\
-            sub(ensure_unicode(self.SPECIAL_CHARACTERS_REGEX), u'', string).\
-            strip()
+        stripped_string = cls.SPECIAL_CHARACTERS_REGEX.sub(u'', string).strip()
         if not stripped_string:
             return True
-        try:
-            float(string.strip())
-            return True
-        except ValueError:
-            pass
-        if not self._contains_translatable_character(stripped_string):
+        if not cls._contains_translatable_character(stripped_string):
             return True
+        number = string.strip()
+        if cls.NUMBER_REGEX.fullmatch(number):
+            try:
+                float(number)
+                return True
+            except ValueError:
+                pass
         return False
 
-    def _contains_translatable_character(self, string):
+    @classmethod
+    def _contains_translatable_character(cls, string):
         """
         Checks if a string contains at least one character that can be
         translated. We assume that translatable characters are the letters,
         the symbols and the punctuation.
         """
-        acceptable = ["L", "P", "S"]
-
-        for letter in string:
-            char_type = unicodedata.category(letter)
-            if char_type[0] in acceptable:
-                return True
-        return False
+        if cls.TRANSLATABLE_ASCII_REGEX.search(string):
+            return True
+        # The remaining ASCII characters are digits, whitespace and control
+        # characters, so only the rest need to be looked up
+        return any(
+            unicodedata.category(letter)[0] in u"LPS"
+            for letter in string if letter > u'\x7f'
+        )
 
     def _find_and_replace(self, story_xml):
         """
@@ -146,156 +191,169 @@ class InDesignHandler(Handler):
             the input string with all translatable content replaced by the
             md5 hash of the string.
         """
-        template = re.sub(ensure_unicode(self.CONTENT_REGEX),
-                          self._replace,
-                          story_xml)
-        return template
-
-    def _replace(self, match):
-        """ Implements the logic used by `self.CONTENT_REGEX.sub(...)` to
-        replace strings with their template replacement and appends new strings
-        to `self.stringset`.
-        """
-        opening_tag, string, closing_tag = match.groups()
+        return self._join_story(self._split_story(story_xml))
 
-        if self._can_skip_content(string):
-            return match.group()
-        order = next(self.order)
-        string_object = OpenString(six.text_type(order), string, order=order)
-        self.stringset.append(string_object)
-        return u"".join((opening_tag, string_object.template_replacement,
-                         closing_tag))
+    @classmethod
+    def _split_story(cls, story_xml):
+        """
+        Splits the given XML string around its translatable content. It does
+        not touch the handler's state, so it can run in executor workers.
+        args:
+            story_xml (str): The xml content of a single Story of the IDML file
+        returns:
+            a list of the parts of the story, with the translatable strings in
+            the odd positions and the content between them in the even ones.
+        """
+        pieces = []
+        position = 0
+        for match in re.finditer(ensure_unicode(cls.CONTENT_REGEX), story_xml):
+            string = match.group(2)
+            if cls._can_skip_content(string):
+                continue
+            pieces.append(story_xml[position:match.start(2)])
+            pieces.append(string)
+            position = match.end(2)
+        pieces.append(story_xml[position:])
+        return pieces
+
+    def _join_story(self, pieces):
+        """ Joins the parts returned by `_split_story` to a template, replacing
+        the strings with their template replacement and appending them to
+        `self.stringset`.
+        """
+        for index in range(1, len(pieces), 2):
+            order = next(self.order)
+            string_object = OpenString(six.text_type(order), pieces[index],
+                                       order=order)
+            self.stringset.append(string_object)
+            pieces[index] = string_object.template_replacement
+        return u"".join(pieces)
 
     """ Compile Methods """
 
-    def compile(self, template, stringset, **kwargs):
+    def compile(self, template, stringset, executor=None, **kwargs):
         # The content is a binary IDML file
         idml = UCF(io.BytesIO(template))
+        stories = self._read_stories(idml)
 
-        self.stringset = list(stringset)
+        # Strings are looked up by their hash and each one is used only once,
+        # for the first occurrence of its hash
+        self.stringset = {
+            string.template_replacement: string for string in stringset
+        }
 
-        # Iterate over the contents of the IDML file
-        for key in self._get_ordered_stories(idml):
-            try:
-                story_content = idml[key]
-            except KeyError:
-                continue
+        if executor is None:
+            compiled_stories = (self._compile_story(story_content)
+                                for _, story_content in stories)
+        else:
+            # Workers only escape the strings; which occurrence of a hash gets
+            # its string is decided here, following the story order. Each
+            # story is sent along with the strings of its own hashes only, so
+            # that the stringset is not serialized once per story
+            story_contents = [story_content for _, story_content in stories]
+            split_stories = executor.map(
+                self._split_compiled_story,
+                story_contents,
+                [self._get_story_translations(story_content)
+                 for story_content in story_contents],
+            )
+            compiled_stories = (self._join_compiled_story(pieces)
+                                for pieces in split_stories)
 
-            # no matter what, idml values are bytes
-            story_content = idml[key].decode('utf-8')
-            idml[key] = self._compile_story(story_content).encode('utf-8')
+        # Iterate over the contents of the IDML file
+        for (key, _), compiled_story in zip(stories, compiled_stories):
+            idml[key] = compiled_story.encode('utf-8')
 
         out = io.BytesIO()
         idml.save(out)
         return out.getvalue()
 
     def _compile_story(self, story_content):
-        """ Handles the compilation of a single story
+        """ Handles the compilation of a single story in a single pass: every
+        hash is replaced by its (escaped) string from `self.stringset`, which
+        is consumed in the process. Hashes that are not in the stringset are
+        replaced with an empty string.
         args:
             story_content: the xml content of the story
         returns:
             compiled_story: the compiled story content
         """
-        transcriber = Transcriber(story_content)
-        hash_regex = re.compile(ensure_unicode(r'[a-z,0-9]{32}_tr'))
-        found = True
-        while found:
-            try:
-                current_string = self.stringset.pop(0)
-                hash_position = story_content.index(
-                    current_string.template_replacement
-                )
-            except ValueError:
-                found = False
-                self.stringset.insert(0, current_string)
-            except IndexError:
-                break
-            else:
-                transcriber.copy_until(hash_position)
-                transcriber.add(self._escape_special_chars(
-                    current_string.string))
-                transcriber.skip(len(current_string.template_replacement))
-
-        # Update the XML file to contain the template strings
-        transcriber.copy_until(len(story_content))
-        compiled_story = transcriber.get_destination()
-        # in case there are any hashes that have not been replaced, replace
-        # them with an empty string
-        compiled_story = hash_regex.sub(u'', compiled_story)
-        return compiled_story
-
-    def _escape_special_chars(self, string):
-        string = self._escape_amps(string)
-        string = self._escape_lt(string)
-        return string
-
-    @staticmethod
-    def _escape_amps(string):
-        """ Escape "lonely" `&` (ampersands).
-
-            If a valid XML escape sequence is found, it is left as it is.
-            Otherwise, any occurrences of `&` are replaced with `&amp;`. Eg,
-
-            "hello world"         -> "hello world"
-            "hello &world"        -> "hello &amp;world"
-            "hello &amp;world"    -> "hello &amp;world"
-            "hello &lt;world"     -> "hello &lt;world"
-            "hello &#x0a1f;world" -> "hello &#x0a1f;world"
-            "&&#x05af;&&"         -> "&amp;&#x05af;&amp;&amp;"
-        """
+        def _replace_hash(match):
+            string = self.stringset.pop(match.group(), None)
+            if string is None:
+                return u''
+            return self._escape_special_chars(string.string)
 
-        # Find "lonely" ampersand positions by finding all ampersand positions
-        # and subtracting the positions of ampersands that are part of valid
-        # XML escape sequences
-        all_amp_positions = {match.span()[0]
-                             for match in re.finditer(r'&', string)}
-        escaped_amp_positions = {
-            match.span()[0]
-            for match in re.finditer(
-                r'&(lt|gt|amp|apos|quot|#\d+|#x[0-9a-fA-F]+);', string
-            )
-        }
-        target_positions = sorted(all_amp_positions - escaped_amp_positions)
+        return self.HASH_REGEX.sub(_replace_hash, story_content)
 
-        # Use Transcriber to replace lonely ampersands with '&amp;'
-        transcriber = Transcriber(string)
-        for position in target_positions:
-            transcriber.copy_until(position)
-            transcriber.add('&amp;')
-            transcriber.skip(1)
-        transcriber.copy_to_end()
-        return transcriber.get_destination()
+    def _get_story_translations(self, story_content):
+        """ Returns a dict of the template replacements found in
+        `story_content` to their strings from `self.stringset`.
+        """
+        translations = {}
+        for string_hash in self.HASH_REGEX.findall(story_content):
+            string = self.stringset.get(string_hash)
+            if string is not None:
+                translations[string_hash] = string.string
+        return translations
+
+    @classmethod
+    def _split_compiled_story(cls, story_content, translations):
+        """ Splits a story around its hashes, pairing each hash with its
+        escaped string from `translations` (or None if it is missing). It does
+        not touch the handler's state, so it can run in executor workers.
+        args:
+            story_content: the xml content of the story
+            translations: a dict of template replacements to strings
+        returns:
+            a list of the parts of the story, with `(hash, escaped_string)`
+            tuples in the odd positions and the content between them in the
+            even ones.
+        """
+        pieces = []
+        escaped_strings = {}
+        position = 0
+        for match in cls.HASH_REGEX.finditer(story_content):
+            string_hash = match.group()
+            if string_hash not in escaped_strings:
+                string = translations.get(string_hash)
+                if string is not None:
+                    string = cls._escape_special_chars(string)
+                escaped_strings[string_hash] = string
+            pieces.append(story_content[position:match.start()])
+            pieces.append((string_hash, escaped_strings[string_hash]))
+            position = match.end()
+        pieces.append(story_content[position:])
+        return pieces
+
+    def _join_compiled_story(self, pieces):
+        """ Joins the parts returned by `_split_compiled_story` to the compiled
+        story, consuming `self.stringset` exactly like `_compile_story` does.
+        """
+        for index in range(1, len(pieces), 2):
+            string_hash, string = pieces[index]
+            if self.stringset.pop(string_hash, None) is None:
+                string = u''
+            pieces[index] = string
+        return u''.join(pieces)
 
-    @staticmethod
-    def _escape_lt(string):
-        """Escape `<` character (&lt;).
+    @classmethod
+    def _escape_special_chars(cls, string):
+        """ Escape "lonely" `&` (ampersands) and `<` in a single pass.
 
-        If a valid XML escape sequence is found, it is left as it is.
-        Otherwise, any occurrences of `<` are replaced with `&lt;`.
-        E.g.:
+            Valid XML escape sequences and InDesign's special character tags
+            are left as they are. E.g.:
 
             "hello world"         -> "hello world"
+            "hello &world"        -> "hello &amp;world"
+            "hello &amp;world"    -> "hello &amp;world"
+            "hello &#x0a1f;world" -> "hello &#x0a1f;world"
+            "&&#x05af;&&"         -> "&amp;&#x05af;&amp;&amp;"
             "hello <world"        -> "hello &lt;world"
             "hello &lt;world"     -> "hello &lt;world"
+            "hello <?ACE 7?>"     -> "hello <?ACE 7?>"
         """
-        # Find "lonely" `<` positions by finding all `<` positions
-        # and subtracting the positions of `<` that are part of
-        # valid XML escape sequences (based on
-        # https://mayart.de/download/Indesign-IDML/special-idml-chars.pdf)
-        all_lt_positions = {match.span()[0]
-                            for match in re.finditer(r'<', string)}
-        escaped_lt_positions = {
-            match.span()[0]
-            for match in re.finditer(
-                r'<(\?ACE 18\?|\?ACE 19\?|\?ACE 3\?|\?ACE 8\?|\?ACE 7\?|Br\/)>',
-                string)}
-        target_positions = sorted(all_lt_positions - escaped_lt_positions)
-
-        # Use Transcriber to replace lonely ampersands with '&amp;'
-        transcriber = Transcriber(string)
-        for position in target_positions:
-            transcriber.copy_until(position)
-            transcriber.add('&lt;')
-            transcriber.skip(1)
-        transcriber.copy_to_end()
-        return transcriber.get_destination()
+        escapes = cls.ESCAPES
+        return cls.ESCAPE_REGEX.sub(
+            lambda match: escapes.get(match.group(), match.group()), string
+        )
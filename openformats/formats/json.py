@@ -2,7 +2,6 @@
 
 from __future__ import absolute_import
 
-import csv
 import json
 import re
 from itertools import count
@@ -16,18 +15,7 @@ from openformats.strings import OpenString
 from openformats.transcribers import Transcriber
 from openformats.utils.icu import ICUCompiler, ICUParser
 from openformats.utils.json import DumbJson, escape, unescape
-
-try:
-    from StringIO import StringIO
-except ImportError:
-    from io import StringIO
-
-
-def csv_reader_next(reader):
-    try:
-        return reader.next()
-    except AttributeError:
-        return next(reader)
+from openformats.utils.newlines import find_newline_type, force_newline_type
 
 
 class JsonHandler(Handler):
@@ -90,7 +78,9 @@ class JsonHandler(Handler):
 
                 if self.name == "STRUCTURED_JSON":
                     try:
-                        ((string_value, _),) = value.find_children(self.STRING_KEY)
+                        string_value, string_position, metadata = (
+                            self._read_payload(value)
+                        )
                     except Exception:
                         # Ignore other types of values like lists
                         pass
@@ -100,7 +90,10 @@ class JsonHandler(Handler):
                                 string_value, (six.binary_type, six.text_type)
                             ):
                                 if string_value.strip():
-                                    openstring = self._create_openstring(key, value)
+                                    openstring = self._create_openstring(
+                                        key, string_value, string_position,
+                                        metadata
+                                    )
 
                                     if openstring:
                                         self.stringset.append(openstring)
@@ -261,70 +254,213 @@ class JsonHandler(Handler):
         self.transcriber.copy_until(len(template))
         return self.transcriber.get_destination()
 
+    def sync_template(self, template, stringset, **kwargs):
+        """
+        Same as removing and then adding strings, but the template is only
+        parsed once and written in a single pass.
+        """
+        return self._sync_template(template, list(stringset), remove=True,
+                                   add=True)
+
     def remove_strings_from_template(self, template, stringset, **kwargs):
         """
         Remove strings from the template that are not in the stringset.
         """
-        fake_stringset = [
-            OpenString(
-                openstring.key,
-                openstring.template_replacement,
-                order=openstring.order,  # type: ignore
-                pluralized=openstring.pluralized,
-            )
-            for openstring in stringset
-        ]
-        updated_template = self._replace_translations(
-            template,
-            fake_stringset,
-            is_real_stringset=False,
-        )
-        return self._clean_empties(updated_template)
+        return self._sync_template(template, list(stringset), remove=True,
+                                   add=False)
 
     def add_strings_to_template(self, template, stringset, **kwargs):
         """
         Add entries that do not exist in the template with minimal conditional logic.
         """
-        remaining = stringset[self.stringset_index :]  # type: ignore
-        if not remaining:
+        stringset = list(stringset)
+        if not stringset[self.stringset_index:]:
             return template
+        return self._sync_template(template, stringset, remove=False,
+                                   add=True)
 
-        strings_to_add = list(remaining)
-
-        transcriber = Transcriber(template)
-        source = transcriber.source
+    def _sync_template(self, template, stringset, remove, add):
+        """
+        Match the strings of the template against the stringset once and
+        write the template in a single pass: without the entries that were
+        not matched, if `remove`, and with the rest of the stringset, the
+        strings after the last one that was matched, appended to the root, if
+        `add`.
+        """
+        self.transcriber = Transcriber(template)
+        source = self.transcriber.source
         parsed = DumbJson(source)
-
         container_type = self._get_root(parsed)
-        items = list(parsed)
-        had_items = bool(items)
 
-        if not had_items and container_type == dict:
-            return self._compile_empty_template(stringset)
+        self.stringset = stringset
+        removed = {}
+        if remove:
+            self.stringset_index = 0
+            self._find_removed_items(parsed, removed)
+
+        added_entries = None
+        if add and self.stringset_index < len(stringset):
+            remaining = stringset[self.stringset_index:]
+            if container_type == dict:
+                if len(removed.get(parsed.start, ())) == len(list(parsed)):
+                    return self._compile_empty_template(stringset)
+                added_entries = [self._make_added_entry_for_dict(os)
+                                 for os in remaining]
+            else:
+                added_entries = [self._make_added_entry_for_list(os)
+                                 for os in remaining]
 
-        # Detect style
-        multiline = "\n" in source[parsed.start : parsed.end + 1]
+        self._write_container(parsed, removed, added_entries)
+        self.transcriber.copy_to_end()
+        return self.transcriber.get_destination()
 
-        # Find insertion point
-        insertion_point = parsed.end
-        if multiline:
-            # Insert before last newline if present
-            i = insertion_point - 1
-            while i >= 0 and source[i] in (" ", "\t"):
-                i -= 1
-            if i >= 0 and source[i] == "\n":
-                insertion_point = i
-
-        # Build entries
-        entries = []
-        for os in strings_to_add:
-            if container_type == dict:
-                entries.append(self._make_added_entry_for_dict(os))
+    def _find_removed_items(self, parsed, removed):
+        """
+        Match the strings of the DumbJson container `parsed` against the
+        stringset in order, like `compile` does. The indexes of the items to
+        remove, the strings that don't match and the containers that are
+        left empty, are recorded in `removed` under the start of the
+        container, and so is every container with removals nested in it.
+
+        Return whether anything is left in the container.
+        """
+        removed_items = set()
+        dirty = False
+        count = 0
+        for index, item in enumerate(parsed):
+            count += 1
+            value = item[2] if parsed.type == dict else item[0]
+            if isinstance(value, DumbJson):
+                keep = self._find_removed_items(value, removed)
+                dirty = dirty or (keep and value.start in removed)
+            elif isinstance(value, six.text_type) and value.strip():
+                keep = self._match_next_string(value)
+            else:
+                # Empty strings and other JSON values are kept
+                keep = True
+            if not keep:
+                removed_items.add(index)
+
+        if removed_items or dirty:
+            removed[parsed.start] = removed_items
+        return len(removed_items) < count or count == 0
+
+    def _match_next_string(self, value):
+        """
+        Return whether the template value `value` holds the hash of the next
+        string of the stringset and move on to the string after it if so.
+        """
+        string = self._get_next_string()
+        if string is None:
+            return False
+        if string.pluralized:
+            matched = string.template_replacement in value
+        else:
+            matched = value == string.template_replacement
+        if matched:
+            self.stringset_index += 1
+        return matched
+
+    def _write_container(self, node, removed, added_entries=None):
+        """
+        Write the DumbJson container `node` to the transcriber without the
+        items that `_find_removed_items` recorded for it, and with
+        `added_entries` appended to it.
+
+        The removed items are dropped along with a comma next to them and
+        the whitespace around it:
+
+            '{"a": "x", "b": "y", "c": "z"}' -> '{"a": "x", "c": "z"}'
+            '{"a": "x", "b": "y", "c": "z"}' -> '{ "b": "y", "c": "z"}'
+            '{"a": "x", "b": "y", "c": "z"}' -> '{"a": "x", "b": "y"}'
+            '{"a": "x", "b": "y", "c": "z"}' -> '{ }'
+        """
+        transcriber = self.transcriber
+        source = transcriber.source
+        removed_items = removed.get(node.start, ())
+
+        starts, values = [], []
+        for item in node:
+            if node.type == dict:
+                _, key_position, value, _ = item
+                starts.append(key_position - 1)
+            else:
+                value, value_position = item
+                if isinstance(value, six.text_type):
+                    starts.append(value_position - 1)
+                else:
+                    starts.append(value_position)
+            values.append(value)
+        # The comma after each item but the last and where each item ends
+        commas = [source.rfind(",", 0, start) for start in starts[1:]]
+        ends = [self._find_end(source, position)
+                for position in commas + [node.end]]
+
+        transcriber.copy_until(node.start + 1)
+        destination_start = len(transcriber.destination)
+        previous = None
+        for index, value in enumerate(values):
+            if index in removed_items:
+                continue
+            if previous is None:
+                if index > 0:
+                    transcriber.skip_until(commas[index - 1] + 1)
+            elif index > previous + 1:
+                transcriber.copy_until(commas[previous] + 1)
+                transcriber.skip_until(commas[index - 1] + 1)
+            if isinstance(value, DumbJson) and value.start in removed:
+                self._write_container(value, removed)
+            transcriber.copy_until(ends[index])
+            previous = index
+
+        # The whitespace before the closing bracket
+        if previous is None:
+            if len(starts) > 1:
+                tail = source[commas[-1] + 1:starts[-1]]
+            elif starts:
+                tail = source[node.start + 1:starts[0]]
             else:
-                entries.append(self._make_added_entry_for_list(os))
+                tail = source[node.start + 1:node.end]
+            if starts:
+                tail += source[ends[-1]:node.end]
+        elif previous < len(starts) - 1:
+            tail = source[ends[previous]:commas[previous]]
+        else:
+            tail = source[ends[previous]:node.end]
+
+        if added_entries:
+            multiline = "\n" in tail or any(
+                "\n" in chunk
+                for chunk in transcriber.destination[destination_start:]
+            )
+            tail = self._add_entries_to_tail(tail, added_entries, multiline,
+                                             previous is not None)
 
-        # Format insertion based on style
+        transcriber.add(tail)
+        transcriber.skip_until(node.end)
+        transcriber.copy_until(node.end + 1)
+
+    @staticmethod
+    def _find_end(source, position):
+        """Return where the text before `position` ends, without the
+        whitespace before `position`."""
+        while source[position - 1].isspace():
+            position -= 1
+        return position
+
+    @staticmethod
+    def _add_entries_to_tail(tail, entries, multiline, had_items):
+        """
+        Add the JSON snippets `entries` to `tail`, the whitespace before the
+        closing bracket of the root, following the style of the template:
+        one entry per line before the last newline, if the template spans
+        multiple lines, or all of them in the same line otherwise.
+        """
+        position = len(tail)
         if multiline:
+            stripped_tail = tail.rstrip(" \t")
+            if stripped_tail.endswith("\n"):
+                position = len(stripped_tail) - 1
             joined = ",\n  ".join(entries)
             if had_items:
                 insertion = f",\n  {joined}"
@@ -336,13 +472,7 @@ class JsonHandler(Handler):
                 insertion = f", {joined}"
             else:
                 insertion = f" {joined} "
-
-        # Insert
-        transcriber.copy_until(insertion_point)
-        transcriber.add(insertion)
-        transcriber.copy_to_end()
-
-        return transcriber.get_destination()
+        return tail[:position] + insertion + tail[position:]
 
     def _get_root(self, parsed):
         """
@@ -535,60 +665,6 @@ class JsonHandler(Handler):
         except ValueError as e:
             raise ParseError(six.text_type(e))
 
-    def _clean_empties(self, compiled):
-        """If sections were removed, clean leftover commas, brackets etc.
-
-        Eg:
-            '{"a": "b", ,"c": "d"}' -> '{"a": "b", "c": "d"}'
-            '{, "a": "b", "c": "d"}' -> '{"a": "b", "c": "d"}'
-            '["a", , "b"]' -> '["a", "b"]'
-        """
-        while True:
-            # First key-value of a dict was removed
-            match = re.search(r"{\s*,", compiled)
-            if match:
-                compiled = "{}{{{}".format(
-                    compiled[: match.start()], compiled[match.end() :]
-                )
-                continue
-
-            # Last key-value of a dict was removed
-            match = re.search(r",\s*}", compiled)
-            if match:
-                compiled = "{}}}{}".format(
-                    compiled[: match.start()], compiled[match.end() :]
-                )
-                continue
-
-            # First item of a list was removed
-            match = re.search(r"\[\s*,", compiled)
-            if match:
-                compiled = "{}[{}".format(
-                    compiled[: match.start()], compiled[match.end() :]
-                )
-                continue
-
-            # Last item of a list was removed
-            match = re.search(r",\s*\]", compiled)
-            if match:
-                compiled = "{}]{}".format(
-                    compiled[: match.start()], compiled[match.end() :]
-                )
-                continue
-
-            # Intermediate key-value of a dict or list was removed
-            match = re.search(r",\s*,", compiled)
-            if match:
-                compiled = "{},{}".format(
-                    compiled[: match.start()], compiled[match.end() :]
-                )
-                continue
-
-            # No substitutions happened, break
-            break
-
-        return compiled
-
     def _get_next_string(self):
         try:
             return self.stringset[self.stringset_index]
@@ -604,11 +680,29 @@ class JsonHandler(Handler):
         return unescape(string)
 
 
+class ArbMetadata(object):
+    """
+    The metadata of an ARB resource, read from the `@key` object that
+    accompanies it. Resources with a type other than "text" are not
+    translatable.
+    """
+
+    __slots__ = ("context", "description", "translatable")
+
+    def __init__(self):
+        self.context = ""
+        self.description = ""
+        self.translatable = True
+
+
 class ArbHandler(JsonHandler):
     name = "ARB"
     extension = "arb"
     keep_sections = True
 
+    # The metadata of the resources without a `@key` object
+    NO_METADATA = ArbMetadata()
+
     def parse(self, content, **kwargs):
         # Validate that content is JSON
         self.validate_content(content)
@@ -617,7 +711,8 @@ class ArbHandler(JsonHandler):
         source = self.transcriber.source
         self.stringset = []
         self.existing_keys = set()
-        self.metadata = dict()
+        # The metadata of each resource, from its `@key` object
+        self.metadata = {}
 
         try:
             parsed = DumbJson(source)
@@ -626,8 +721,35 @@ class ArbHandler(JsonHandler):
         if parsed.type != dict:
             raise ParseError("Invalid JSON")
         self._order = count()
-        self._find_keys(parsed)
-        self._extract(parsed)
+
+        # The metadata of a resource may come after it, so its string is
+        # created once the whole object has been read
+        pending = []
+        for key, key_position, value, value_position in parsed:
+            key = self._escape_key(key)
+            # store all root-level keys in order to detect duplication
+            self._check_key(key, key_position)
+            self.existing_keys.add(key)
+            if key.startswith("@"):
+                if isinstance(value, DumbJson) and value.type == dict:
+                    metadata = self.metadata.setdefault(key[1:], ArbMetadata())
+                    self._read_metadata(key, value, metadata)
+            elif isinstance(value, six.text_type) and value.strip():
+                pending.append((key, value, value_position))
+            else:
+                # Ignore other JSON types (bools, nulls, numbers, objects,
+                # lists)
+                pass
+
+        for key, value, value_position in pending:
+            metadata = self.metadata.get(key, self.NO_METADATA)
+            if not metadata.translatable:
+                continue
+            openstring = self._create_openstring(
+                key, value, value_position, metadata.context, metadata.description
+            )
+            if openstring:
+                self.stringset.append(openstring)
 
         if not self.stringset:
             raise ParseError("No strings could be extracted")
@@ -636,69 +758,40 @@ class ArbHandler(JsonHandler):
 
         return self.transcriber.get_destination(), self.stringset
 
-    def _find_keys(self, parsed, nest=None):
-        for key, key_position, value, _ in parsed:
-            key = self._escape_key(key)
-            if nest is not None:
-                key = f"{nest}.{key}"
-
-            # 'key' should be unique
-            if key in self.existing_keys:
-                # Need this for line number
-                self.transcriber.copy_until(key_position)
-                raise ParseError(
-                    "Duplicate string key ('{}') in line {}".format(
-                        key, self.transcriber.line_number
-                    )
+    def _check_key(self, key, key_position):
+        # 'key' should be unique
+        if key in self.existing_keys:
+            # Need this for line number
+            self.transcriber.copy_until(key_position)
+            raise ParseError(
+                "Duplicate string key ('{}') in line {}".format(
+                    key, self.transcriber.line_number
                 )
-            if nest is None:  # store all root-level keys in order to detect duplication
-                self.existing_keys.add(key)
-            elif key.startswith("@"):
-                if key.endswith(".type") and value != "text":
-                    self.existing_keys.add(key)
-                elif key.endswith(".context"):
-                    self.metadata[key] = value
-                elif key.endswith(".description"):
-                    self.metadata[key] = value
-
-            if isinstance(value, DumbJson):
-                self._find_keys(value, key)
-            else:
-                pass
+            )
 
-    def _extract(self, parsed):
-        for key, _, value, value_position in parsed:
+    def _read_metadata(self, nest, parsed, metadata=None):
+        """
+        Read the `@key` object `parsed` into `metadata`, checking its keys,
+        and the keys of the objects nested in it, for duplicates. Only the
+        direct children of `@key` describe the resource, so `metadata` is
+        None for the nested objects.
+        """
+        for key, key_position, value, _ in parsed:
             key = self._escape_key(key)
+            nested_key = f"{nest}.{key}"
+            self._check_key(nested_key, key_position)
 
-            if key.startswith("@"):
-                continue
-            elif isinstance(value, (six.text_type)):
-                if not value.strip():
-                    continue
-                elif f"@{key}.type" in self.existing_keys:
-                    continue
-
-                context_key = f"@{key}.context"
-                context_value = (
-                    self.metadata[context_key]
-                    if context_key in self.metadata.keys()
-                    else ""
-                )
-                description_key = f"@{key}.description"
-                description_value = (
-                    self.metadata[description_key]
-                    if description_key in self.metadata.keys()
-                    else ""
-                )
+            if nested_key.endswith(".type") and value != "text":
+                self.existing_keys.add(nested_key)
+                if metadata is not None and key == "type":
+                    metadata.translatable = False
+            elif metadata is not None and key == "context":
+                metadata.context = value
+            elif metadata is not None and key == "description":
+                metadata.description = value
 
-                openstring = self._create_openstring(
-                    key, value, value_position, context_value, description_value
-                )
-                if openstring:
-                    self.stringset.append(openstring)
-            else:
-                # Ignore other JSON types (bools, nulls, numbers)
-                pass
+            if isinstance(value, DumbJson) and value.type == dict:
+                self._read_metadata(nested_key, value)
 
     def _create_openstring(
         self, key, value, value_position, context_value, description_value
@@ -723,10 +816,9 @@ class ArbHandler(JsonHandler):
         # that aren't in the stringset. For that we will create a new stringset
         # which will have the hashes themselves as strings and compile against
         # that. The compilation process will remove any string sections that
-        # are absent from the stringset. Next we will call `_clean_empties`
-        # from the template to clear out any `...,  ,...` or `...{ ,...`
-        # sequences left. The result will be used as the actual template for
-        # the compilation process
+        # are absent from the stringset. Next the `...,  ,...` or `...{ ,...`
+        # sequences left are cleaned out of the template. The result will be
+        # used as the actual template for the compilation process
         self.keep_sections = kwargs.get("keep_sections", True)
 
         stringset = list(stringset)
@@ -750,6 +842,12 @@ class ArbHandler(JsonHandler):
         template = self.remove_strings_from_template(template, stringset, **kwargs)
         return template
 
+    def _find_removed_items(self, parsed, removed):
+        # Unlike the JSON format, do not remove sections of the template
+        if self.keep_sections:
+            return True
+        return super(ArbHandler, self)._find_removed_items(parsed, removed)
+
     def _copy_until_and_remove_section(self, pos):
         """
         Copy characters to the transcriber until the given position,
@@ -762,6 +860,54 @@ class ArbHandler(JsonHandler):
             self.transcriber.remove_section()
 
 
+class StructuredJsonLayout(object):
+    """
+    The parts of a STRUCTURED_JSON template that are the same for every
+    compilation of it.
+
+    `pieces` is the template, with UNIX newlines, split around the values
+    that compilation replaces. Strings are copied as they are. Tuples of
+    `(field, entry, template_value, original)` are the value of `field` in
+    the `entry`-th string object of the template, or the place after its
+    last field when `field` is None, and `original` is the text that is kept
+    when there is no translation for the object.
+    """
+
+    def __init__(self, source, newline_type):
+        self.source = source
+        self.newline_type = newline_type
+        self.pieces = []
+        self.entry_count = 0
+        self._ptr = 0
+
+    def add_entry(self):
+        self.entry_count += 1
+        return self.entry_count - 1
+
+    def add_field(self, field, entry, template_value, start, end):
+        self._copy_until(start)
+        self.pieces.append(
+            (field, entry, template_value, self.source[start:end])
+        )
+        self._ptr = end
+
+    def _copy_until(self, end):
+        if end > self._ptr:
+            self.pieces.append(self.source[self._ptr:end])
+            self._ptr = end
+
+    def finish(self):
+        self._copy_until(len(self.source))
+        self.source = None
+        if self.newline_type == "DOS":
+            self.pieces = [
+                force_newline_type(piece, "DOS")
+                if isinstance(piece, six.text_type)
+                else piece[:3] + (force_newline_type(piece[3], "DOS"),)
+                for piece in self.pieces
+            ]
+
+
 class StructuredJsonHandler(JsonHandler):
     """Handler that preserves certain keys for internal usage, while
     keeping the flexibility and functionality of the original JsonHandler. It
@@ -806,156 +952,212 @@ class StructuredJsonHandler(JsonHandler):
     STRUCTURE_FIELDS = {CONTEXT_KEY, DEVELOPER_COMMENT_KEY, CHARACTER_LIMIT_KEY}
 
     def compile(self, template, translations, **kwargs):
-        self.translations = iter(translations)
-        self.transcriber = Transcriber(template)
-        template = self.transcriber.source
+        return self._compile_layout(self._make_layout(template), translations)
 
-        dumb_template = DumbJson(template)
-        self._compile_recursively(dumb_template)
-        self.transcriber.copy_to_end()
-        return self.transcriber.get_destination()
+    def compile_many(self, template, stringsets, **kwargs):
+        """
+        Compile the template for several languages at once. `stringsets`
+        maps language codes to stringsets.
 
-    def _compile_value(self, value, template_value, value_position, skip=False):
-        value = template_value if skip else value
+        The template is read only once, into a `StructuredJsonLayout` that
+        every language is compiled from. Returns a dict of language codes to
+        compiled templates.
+        """
+        layout = self._make_layout(template)
+        return {
+            language: self._compile_layout(layout, stringset)
+            for language, stringset in six.iteritems(stringsets)
+        }
 
-        if value is not None:
-            if value == "" and template_value is None:
-                self.transcriber.add("null")
+    def _compile_layout(self, layout, translations):
+        translations = iter(translations)
+        # Every string object with a non-blank string takes the next
+        # translation, in the order the objects appear in the template
+        entries = [next(translations, None) for _ in range(layout.entry_count)]
+        icu_compiler = ICUCompiler()
+
+        destination = []
+        for piece in layout.pieces:
+            if isinstance(piece, six.text_type):
+                destination.append(piece)
+                continue
+            field, entry, template_value, original = piece
+            translation = entries[entry]
+            if translation is None:
+                destination.append(original)
+                continue
+            if field is None:
+                value = self._compile_missing_fields(translation, *template_value)
             else:
-                if template_value is None:
-                    self.transcriber.add(f'"{value}"')
-                else:
-                    self.transcriber.add(f"{value}")
+                value = self._compile_field(
+                    field, translation, template_value, icu_compiler
+                )
+            if layout.newline_type == "DOS":
+                value = force_newline_type(value, "DOS")
+            destination.append(value)
+        return "".join(destination)
+
+    @classmethod
+    def _make_layout(cls, template):
+        """Return the layout of `template`."""
+        newline_type = find_newline_type(template)
+        if newline_type == "DOS":
+            template = force_newline_type(template, "UNIX")
+        layout = StructuredJsonLayout(template, newline_type)
+        cls._add_to_layout(layout, DumbJson(template))
+        layout.finish()
+        return layout
+
+    @classmethod
+    def _add_to_layout(cls, layout, node):
+        """Add the string objects within `node` to the layout, the same ones
+        that `parse` extracts strings from."""
+        if node.type == list:
+            for value, _ in node:
+                if isinstance(value, DumbJson):
+                    cls._add_to_layout(layout, value)
+            return
+
+        for _, _, value, _ in node:
+            # Lists within dicts are left as they are
+            if not isinstance(value, DumbJson) or value.type != dict:
+                continue
+            ((string_value, _),) = value.find_children(cls.STRING_KEY)
+            if not string_value:
+                cls._add_to_layout(layout, value)
+            elif string_value.strip():
+                cls._add_string_object(layout, value)
+
+    @classmethod
+    def _add_string_object(cls, layout, node):
+        entry = layout.add_entry()
+        present_fields = set()
+        previous_end = node.start
+        for key, key_position, value, value_position in node:
+            line_separator = layout.source[previous_end + 1 : key_position - 1]
+            key_value_separator = layout.source[
+                key_position + len(key) : value_position - 1
+            ]
+            if isinstance(value, six.text_type):
+                # Only the contents of strings are replaced, not their quotes
+                value_end = value_position + len(value)
+                previous_end = value_end + 1
+            elif isinstance(value, DumbJson):
+                value_end = previous_end = value.end + 1
+            else:
+                literal = DumbJson.VALUE_PAT.match(layout.source, value_position)
+                value_end = previous_end = value_position + len(
+                    literal.group("value")
+                )
+            if key == cls.STRING_KEY or key in cls.STRUCTURE_FIELDS:
+                layout.add_field(key, entry, value, value_position, value_end)
+                present_fields.add(key)
+
+        layout.add_field(
+            None,
+            entry,
+            (line_separator, key_value_separator, frozenset(present_fields)),
+            previous_end,
+            previous_end,
+        )
+
+    def _compile_field(self, field, translation, template_value, icu_compiler):
+        """Return the compiled value of a field of a string object, in place
+        of the template's value."""
+        if field == self.STRING_KEY:
+            if translation.pluralized:
+                value = template_value.replace(
+                    translation.template_replacement,
+                    icu_compiler.serialize_strings(translation.string, delimiter=" "),
+                )
+            else:
+                value = translation.string
+        elif field == self.CHARACTER_LIMIT_KEY:
+            value = translation.character_limit
         else:
-            self.transcriber.add("null")
-
-        self.transcriber.skip(len(f"{template_value}"))
-        self.transcriber.copy_until(value_position + len(f"{template_value}") + 1)
-
-    def _compile_recursively(self, current_part):
-        if isinstance(current_part, DumbJson):
-            if current_part.type == list:
-                for value, value_position in current_part:
-                    self._compile_recursively(value)
-            if current_part.type == dict:
-                (value, _) = current_part.find_children(self.STRING_KEY)[0]
-                if not value:
-                    for key, key_position, value, value_position in current_part:
-                        self.transcriber.copy_until(key_position - 1)
-                        self.transcriber.copy_until(value_position)
-                        self._compile_recursively(value)
-                else:
-                    (value, _) = current_part.find_children(self.STRING_KEY)[0]
-                    if not value.strip():
-                        translation = OpenString("", value)
-                        skip = True
-                    else:
-                        translation = next(self.translations, None)
-                        skip = False
-
-                    context_added = False
-                    character_limit_added = False
-                    developer_comments_added = False
-
-                    line_separator = None
-                    key_value_separator = None
-                    for key, key_position, value, value_position in current_part:
-                        prev_position_end = self.transcriber.ptr
-                        line_separator = current_part.source[
-                            prev_position_end + 1 : key_position - 1
-                        ]
-                        key_value_separator = current_part.source[
-                            key_position + len(key) : value_position - 1
-                        ]
-                        self.transcriber.copy_until(key_position - 1)
-                        self.transcriber.copy_until(value_position)
-                        if key == self.CONTEXT_KEY and translation:
-                            context = translation.context
-                            self._compile_value(
-                                self.escape(context), value, value_position, skip=skip
-                            )
-                            context_added = True
-                        elif key == self.DEVELOPER_COMMENT_KEY and translation:
-                            developer_comment = translation.developer_comment
-                            self._compile_value(
-                                self.escape(developer_comment),
-                                value,
-                                value_position,
-                                skip=skip,
-                            )
-                            developer_comments_added = True
-                        elif key == self.CHARACTER_LIMIT_KEY and translation:
-                            character_limit = translation.character_limit
-                            self._compile_value(
-                                character_limit, value, value_position, skip=skip
-                            )
-                            character_limit_added = True
-                        elif key == self.STRING_KEY and translation:
-                            if translation.pluralized:
-                                string_replacement = ICUCompiler().serialize_strings(
-                                    translation.string, delimiter=" "
-                                )
-                                string_replacement = value.replace(
-                                    translation.template_replacement,
-                                    string_replacement,
-                                )
-                            else:
-                                string_replacement = translation.string
-                            self._compile_value(
-                                string_replacement, value, value_position
-                            )
-                        elif not isinstance(value, DumbJson):
-                            self.transcriber.copy_until(
-                                value_position + len(f"{value}") + 1
-                            )
-
-                    extra_elements = []
-                    if not context_added and translation and translation.context:
-                        extra_elements.append(
-                            '"{}{}"{}"'.format(
-                                "context",
-                                key_value_separator,
-                                self.escape(translation.context),
-                            )
-                        )
-                    if (
-                        not character_limit_added
-                        and translation
-                        and translation.character_limit
-                    ):
-                        extra_elements.append(
-                            '"{}{}{}'.format(
-                                "character_limit",
-                                key_value_separator,
-                                translation.character_limit,
-                            )
-                        )
-                    if (
-                        not developer_comments_added
-                        and translation
-                        and translation.developer_comment
-                    ):
-                        extra_elements.append(
-                            '"{}{}"{}"'.format(
-                                "developer_comment",
-                                key_value_separator,
-                                self.escape(translation.developer_comment),
-                            )
-                        )
-                    if extra_elements:
-                        self.transcriber.add(
-                            ","
-                            + line_separator
-                            + ("," + line_separator).join(extra_elements)
-                        )
+            value = self.escape(getattr(translation, field))
 
-    def _create_openstring(self, key, payload_dict):
-        """Return a new OpenString based on the given key and payload_dict
-        and update the transcriber accordingly based on the provided position.
+        if value is None:
+            return "null"
+        if template_value is None:
+            return "null" if value == "" else f'"{value}"'
+        return f"{value}"
+
+    def _compile_missing_fields(
+        self, translation, line_separator, key_value_separator, present_fields
+    ):
+        """Return the metadata of the translation that its string object in
+        the template does not have a field for, to be added after the last
+        field of the object."""
+        extra_elements = []
+        if self.CONTEXT_KEY not in present_fields and translation.context:
+            extra_elements.append(
+                '"{}{}"{}"'.format(
+                    self.CONTEXT_KEY,
+                    key_value_separator,
+                    self.escape(translation.context),
+                )
+            )
+        if (
+            self.CHARACTER_LIMIT_KEY not in present_fields
+            and translation.character_limit
+        ):
+            extra_elements.append(
+                '"{}{}{}'.format(
+                    self.CHARACTER_LIMIT_KEY,
+                    key_value_separator,
+                    translation.character_limit,
+                )
+            )
+        if (
+            self.DEVELOPER_COMMENT_KEY not in present_fields
+            and translation.developer_comment
+        ):
+            extra_elements.append(
+                '"{}{}"{}"'.format(
+                    self.DEVELOPER_COMMENT_KEY,
+                    key_value_separator,
+                    self.escape(translation.developer_comment),
+                )
+            )
+        if not extra_elements:
+            return ""
+        return "," + line_separator + ("," + line_separator).join(extra_elements)
 
+    def _read_payload(self, payload_dict):
+        """Read the string and the metadata of a payload dict in one pass.
 
-        :param str key: the string key
         :param DumbJson payload_dict: the string and metadata
+        :return: a 3-tuple with the (still escaped) string value, its
+            position and a dict with the decoded values of the metadata
+            fields that are present
+        :rtype: tuple
+        """
+        string_value, string_position = None, None
+        metadata = {}
+        for key, _, value, value_position in payload_dict:
+            if key == self.STRING_KEY:
+                string_value, string_position = value, value_position
+                continue
+            if DumbJson.BACKSLASH in key:
+                key = json.loads(f'"{key}"')
+            if key not in self.STRUCTURE_FIELDS:
+                continue
+            if isinstance(value, DumbJson):
+                value = json.loads(payload_dict.source[value.start : value.end + 1])
+            elif isinstance(value, six.text_type):
+                value = json.loads(f'"{value}"')
+            metadata[key] = value
+        return string_value, string_position, metadata
+
+    def _create_openstring(self, key, string_value, string_position, metadata):
+        """Return a new OpenString based on the given key, string and metadata
+        and update the transcriber accordingly based on the provided position.
+
+        :param str key: the string key
+        :param str string_value: the string, as it appears in the source
+        :param int string_position: the position of the string in the source
+        :param dict metadata: the decoded metadata of the string
         :return: an OpenString or None
         """
         # First attempt to parse this as a special node,
@@ -963,40 +1165,36 @@ class StructuredJsonHandler(JsonHandler):
         # If it cannot be parsed that way (returns None), parse it like
         # a regular string.
         parser = ICUParser(allow_numeric_plural_values=False)
-        ((string_value, _),) = payload_dict.find_children(self.STRING_KEY)
         icu_string = parser.parse(key, string_value)
         if icu_string:
-            return self._create_pluralized_string(icu_string, payload_dict)
+            return self._create_pluralized_string(
+                icu_string, string_position, metadata
+            )
 
-        return self._create_regular_string(key, payload_dict)
+        return self._create_regular_string(
+            key, string_value, string_position, metadata
+        )
 
-    def _create_pluralized_string(self, icu_string, payload_dict):
+    def _create_pluralized_string(self, icu_string, string_position, metadata):
         """Create a pluralized string based on the given information.
 
         Also updates the transcriber accordingly.
 
         :param ICUString icu_string: The ICUString object that will generate
             the pluralized string
-        "param DumbJson payload_dict: the string and metadata
+        :param int string_position: the position of the string in the source
+        :param dict metadata: the decoded metadata of the string
         :return: an OpenString object
         :rtype: OpenString
         """
-        ((_, string_position),) = payload_dict.find_children(self.STRING_KEY)
-        payload_dict = json.loads(
-            payload_dict.source[payload_dict.start : payload_dict.end + 1]
-        )
-        comment_value = payload_dict.get(self.DEVELOPER_COMMENT_KEY)
-        limit_value = payload_dict.get(self.CHARACTER_LIMIT_KEY)
-        context_value = payload_dict.get(self.CONTEXT_KEY)
-
         openstring = OpenString(
             icu_string.key,
             icu_string.strings_by_rule,
             pluralized=icu_string.pluralized,
             order=next(self._order),
-            developer_comment=comment_value or "",
-            character_limit=limit_value,
-            context=context_value or "",
+            developer_comment=metadata.get(self.DEVELOPER_COMMENT_KEY) or "",
+            character_limit=metadata.get(self.CHARACTER_LIMIT_KEY),
+            context=metadata.get(self.CONTEXT_KEY) or "",
         )
 
         current_pos = icu_string.current_position
@@ -1008,30 +1206,24 @@ class StructuredJsonHandler(JsonHandler):
 
         return openstring
 
-    def _create_regular_string(self, key, payload_dict):
+    def _create_regular_string(self, key, string_value, string_position, metadata):
         """
         Return a new OpenString based on the given key and value
         and update the transcriber accordingly.
 
         :param key: the string key
-        :param value: the translation string
+        :param string_value: the translation string
+        :param int string_position: the position of the string in the source
+        :param dict metadata: the decoded metadata of the string
         :return: an OpenString or None
         """
-        ((string_value, string_position),) = payload_dict.find_children(self.STRING_KEY)
-        payload_dict = json.loads(
-            payload_dict.source[payload_dict.start : payload_dict.end + 1]
-        )
-        comment_value = payload_dict.get(self.DEVELOPER_COMMENT_KEY)
-        limit_value = payload_dict.get(self.CHARACTER_LIMIT_KEY)
-        context_value = payload_dict.get(self.CONTEXT_KEY)
-
         openstring = OpenString(
             key,
             string_value,
             order=next(self._order),
-            developer_comment=comment_value or "",
-            character_limit=limit_value,
-            context=context_value or "",
+            developer_comment=metadata.get(self.DEVELOPER_COMMENT_KEY) or "",
+            character_limit=metadata.get(self.CHARACTER_LIMIT_KEY),
+            context=metadata.get(self.CONTEXT_KEY) or "",
         )
         self.transcriber.copy_until(string_position)
         self.transcriber.add(openstring.template_replacement)
@@ -1062,83 +1254,6 @@ class StructuredJsonHandler(JsonHandler):
         # when calculating the length of the STRING_KEY, for the "." character
         return key[: -(len(self.STRING_KEY) + 1)]
 
-    def _get_string_structure(self, key):
-        """Given a key, find its corresponding value in a nested JSON object.
-
-        Example:
-        If our JSON file has the following structure,
-        {'key':{
-            'another_key':{
-                'string': 'This is a text',
-                'developer_comment': 'These are the developer notes'
-            }
-          }
-        }
-        Then given the key `key.another_key`, the _get_string_structure
-        function will return the following dictionary:
-        {
-            "string": "This is a text",
-            "context": "",
-            "developer_comment": "These are the developer notes",
-            "character_limit": None
-        }
-
-        :param str key: the key to search against
-        :return: a dictionary with the string structure
-        :rtype: dict
-        """
-        json_dict = self._get_value_for_key(key)
-        return {
-            field: (
-                json_dict[field] if field in json_dict else OpenString.DEFAULTS[field]
-            )
-            for field in self.STRUCTURE_FIELDS
-        }
-
-    def _get_value_for_key(self, key):
-        """Given a key, find its value in a nested JSON object.
-
-        Key will always have the format `key.[another_key[..]]`
-        As an example, given the key 'key.another_key.string'
-        and our JSON object has the following structure:
-        {'key':{
-            'another_key':{
-                'string': 'This is a text',
-                'developer_comment': 'These are the developer notes'
-            }
-          }
-        }
-        We should return the following dictionary:
-        {
-            'string': 'This is a text',
-            'developer_comment': 'These are the developer notes'
-        }
-
-        :param str key: the key to search against
-        :return: a dictionary with the value for the given key
-        :rtype: dict
-        """
-        # Go through all parts of the composite key
-        keys = csv_reader_next(
-            csv.reader(StringIO(key), delimiter=".", escapechar="\\")
-        )
-        json_dict = self.json_dict
-        for k in keys:
-            json_dict = json_dict[k]
-        return json_dict
-
-    def validate_content(self, content):
-        """Validate that a given string is valid JSON file.
-
-        :param str content: the content to parse
-        :raise ParseError: if the content is not valid JSON format
-        """
-        try:
-            # Save the JSON dict for later use
-            self.json_dict = json.loads(content)
-        except ValueError as e:
-            raise ParseError(six.text_type(e))
-
     def _copy_until_and_remove_section(self, pos):
         """
         Copy characters to the transcriber until the given position,
@@ -1160,117 +1275,46 @@ class StructuredJsonHandler(JsonHandler):
 
         return "{\n" + ",\n".join(lines) + "\n}\n"
 
-    def remove_strings_from_template(self, template, stringset, **kwargs):
+    def _find_removed_items(self, parsed, removed):
         """
-        Remove structured-json entries whose hashed 'string' content does not
-        match the ordered stringset, similar to JsonHandler behavior, but:
+        Like JsonHandler's, but the structured-json entries are matched
+        instead of strings:
 
-        - We match by OpenString.template_replacement (hash), not by key.
+        - We match by the hash in the entry's "string" field.
         - For dict roots: walk nested dicts and drop leaf objects with
-          mismatching "string".
+          mismatching "string" and dicts that end up with no kept leaves.
+          Other values are left untouched.
         - For list roots: treat each list item as a dict-root, dropping
           items that end up with no kept leaves.
-        """
-        self.stringset = list(stringset)
-        self.stringset_index = 0
-
-        transcriber = Transcriber(template)
-        source = transcriber.source
-        parsed = DumbJson(source)
-
-        def next_string():
-            try:
-                return self.stringset[self.stringset_index]
-            except IndexError:
-                return None
-
-        def walk_dict(node):
-            """
-            Recursively traverse a DumbJson dict node.
-
-            Returns True if this node (or any of its descendants) contains at
-            least one *kept* leaf. Otherwise returns False so the caller can
-            prune the whole section.
-            """
-            if node.type != dict:
-                return False
-
-            has_kept_leaf = False
-
-            for _, key_pos, value, _ in node:
-                if not (isinstance(value, DumbJson) and value.type == dict):
-                    continue
 
-                # Decide if this object is a *leaf* (direct "string" field)
-                is_leaf = any(
-                    child_key == self.STRING_KEY for child_key, _, _, _ in value
-                )
-
-                transcriber.copy_until(key_pos - 1)
-                transcriber.mark_section_start()
-
-                if is_leaf:
-                    ((string_value, _),) = value.find_children(self.STRING_KEY)
-
-                    current = next_string()
-                    keep = False
-
-                    if current is not None:
-                        templ = current.template_replacement
-
-                        if current.pluralized:
-                            # hash embedded inside ICU plural string
-                            if templ in string_value:
-                                keep = True
-                        else:
-                            # plain hash
-                            if string_value == templ:
-                                keep = True
-
-                    transcriber.copy_until(value.end + 1)
-                    transcriber.mark_section_end()
-
-                    if keep:
-                        has_kept_leaf = True
-                        self.stringset_index += 1
-                    else:
-                        transcriber.remove_section()
-                else:
-                    # Nested dict – recurse
-                    child_has_kept = walk_dict(value)
-
-                    transcriber.copy_until(value.end + 1)
-                    transcriber.mark_section_end()
-
-                    if child_has_kept:
-                        has_kept_leaf = True
-                    else:
-                        transcriber.remove_section()
-
-            return has_kept_leaf
-
-        if parsed.type == dict:
-            walk_dict(parsed)
-        elif parsed.type == list:
-            # List-root: each item is a dict-root
-            for value, _ in parsed:
-                if not isinstance(value, DumbJson) or value.type != dict:
-                    continue
-
-                transcriber.copy_until(value.start)
-                transcriber.mark_section_start()
-
-                has_kept = walk_dict(value)
+        Return whether at least one leaf is kept in the container.
+        """
+        removed_items = set()
+        dirty = has_kept_leaf = False
+        for index, item in enumerate(parsed):
+            value = item[2] if parsed.type == dict else item[0]
+            if not (isinstance(value, DumbJson) and value.type == dict):
+                continue
 
-                transcriber.copy_until(value.end + 1)
-                transcriber.mark_section_end()
+            # Decide if this object is a *leaf* (direct "string" field)
+            is_leaf = parsed.type == dict and any(
+                child_key == self.STRING_KEY for child_key, _, _, _ in value
+            )
+            if is_leaf:
+                ((string_value, _),) = value.find_children(self.STRING_KEY)
+                keep = self._match_next_string(string_value)
+            else:
+                keep = self._find_removed_items(value, removed)
+                dirty = dirty or (keep and value.start in removed)
 
-                if not has_kept:
-                    transcriber.remove_section()
+            if keep:
+                has_kept_leaf = True
+            else:
+                removed_items.add(index)
 
-        transcriber.copy_until(len(source))
-        compiled = transcriber.get_destination()
-        return self._clean_empties(compiled)
+        if removed_items or dirty:
+            removed[parsed.start] = removed_items
+        return has_kept_leaf
 
     def _build_structured_payload(self, os) -> dict:
         """
@@ -1438,6 +1482,14 @@ class ChromeI18nHandler(JsonHandler):
         except ValueError as e:
             raise ParseError(six.text_type(e))
 
+    def sync_template(
+        self, template: str, stringset: list[OpenString], **kwargs: Any
+    ) -> str:
+        """
+        Syncing is not supported, the template is returned as it is.
+        """
+        return template
+
     def remove_strings_from_template(
         self,
         template: str,
@@ -1,13 +1,141 @@
+import io
+import re
+
 import six
 from copy import copy
 
 from openformats.exceptions import MissingParentError
 from openformats.strings import OpenString
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, NavigableString
 from collections import defaultdict
 
 
+def clone_soup(soup):
+    """
+    Copy a parsed XML document. Unlike `copy(soup)`, this copies the parse
+    tree directly instead of serializing and re-parsing the whole document.
+    """
+    clone = BeautifulSoup("", "xml")
+    for child in soup.contents:
+        clone.append(copy(child))
+    return clone
+
+
+class PristineParts(object):
+    """
+    Keeps the original bytes of some parts of an unpacked file, so that a
+    part that one compilation leaves untouched can be restored after an
+    earlier compilation of the same unpacked file has overwritten it.
+    """
+
+    def __init__(self, paths):
+        self._contents = {}
+        for path in paths:
+            with io.open(path, 'rb') as f:
+                self._contents[path] = f.read()
+
+    def restore(self, path):
+        with io.open(path, 'wb') as f:
+            f.write(self._contents[path])
+
+
+class TemplateSkeleton(object):
+    """
+    A parsed template part with its translatable elements ("slots") cut out.
+
+    The markup around the slots is serialized once per variant (eg RTL or
+    not) and every slot is kept aside as a pristine subtree. Compiling a
+    language then only has to copy, compile and serialize the slots that the
+    stringset actually translates, everything else is reused as is:
+
+        >>> skeleton = TemplateSkeleton(soup, soup.find_all('w:p'))
+        >>> rendered = {}
+        >>> for index, slot in enumerate(skeleton.slots):
+        ...     if skeleton.translates(index, stringset):
+        ...         element = copy(slot)
+        ...         # compile `element` in place
+        ...         rendered[index] = skeleton.render(element)
+        >>> skeleton.join(rendered)
+
+    Slots must not be nested in each other and must be given in document
+    order.
+    """
+
+    SLOT_MARKER = u"\x00"
+
+    def __init__(self, soup, slots, formatter="minimal"):
+        self.soup = soup
+        self.slots = slots
+        self.formatter = formatter
+        self.txids = [
+            frozenset(
+                element.attrs['txid']
+                for element in ([slot] + slot.find_all(attrs={'txid': True}))
+                if element.has_attr('txid')
+            )
+            for slot in slots
+        ]
+        for slot in slots:
+            slot.replace_with(NavigableString(self.SLOT_MARKER))
+        self._chunks = {}
+        self._pristine = {}
+
+    def translates(self, index, stringset):
+        return not self.txids[index].isdisjoint(stringset)
+
+    def translates_any(self, stringset):
+        return any(not txids.isdisjoint(stringset) for txids in self.txids)
+
+    def render(self, element):
+        return element.decode(formatter=self.formatter)
+
+    def join(self, rendered, variant=None, prepare=None):
+        """
+        Put the document back together. `rendered` maps slot indexes to their
+        compiled markup, slots missing from it are rendered untouched.
+        `prepare`, if given, is applied once to a copy of the markup around
+        the slots and the result is cached under `variant`.
+        """
+        if variant not in self._chunks:
+            soup = self.soup
+            if prepare is not None:
+                soup = clone_soup(soup)
+                prepare(soup)
+            self._chunks[variant] = self.render(soup).split(self.SLOT_MARKER)
+        chunks = self._chunks[variant]
+
+        result = [chunks[0]]
+        for index, chunk in enumerate(chunks[1:]):
+            if index in rendered:
+                result.append(rendered[index])
+            else:
+                if index not in self._pristine:
+                    self._pristine[index] = self.render(self.slots[index])
+                result.append(self._pristine[index])
+            result.append(chunk)
+        return u"".join(result)
+
+    @staticmethod
+    def outermost(elements):
+        """
+        Filter `elements` (in document order) down to the ones that are not
+        nested inside another one of them.
+        """
+        seen = set()
+        result = []
+        for element in elements:
+            if id(element) in seen or any(
+                id(parent) in seen for parent in element.parents
+            ):
+                continue
+            seen.add(id(element))
+            result.append(element)
+        return result
+
+
 class OfficeOpenXmlHandler(object):
+    TXID_PATTERN = re.compile(r'\btxid="([^"]+)"')
+
     @classmethod
     def get_hyperlink_url(cls, element, document_rels):
         raise NotImplementedError
@@ -66,6 +194,73 @@ class OfficeOpenXmlHandler(object):
                     if format:
                         text_element.insert_before(format)
 
+    @classmethod
+    def _references_stringset(cls, content, stringset):
+        """
+        Cheaply check whether the raw markup of a part references any of the
+        stringset's hashes, ie whether compiling it can change anything.
+        """
+        return any(
+            match.group(1) in stringset
+            for match in cls.TXID_PATTERN.finditer(content)
+        )
+
+    def compile_many(self, template, stringsets, **kwargs):
+        """
+        Compile the template for several languages at once. `stringsets`
+        maps language codes to stringsets and the optional `is_rtl` maps
+        language codes to whether they should be compiled right-to-left.
+
+        The template is unpacked and parsed only once and every language is
+        produced out of the same `TemplateSkeleton`s. Returns a dict of
+        language codes to compiled files.
+        """
+        is_rtl = kwargs.get('is_rtl', {})
+        office_file, skeleton = self._load_skeleton(template)
+
+        result = {}
+        for language, stringset in six.iteritems(stringsets):
+            stringset = {
+                string.string_hash: string for string in stringset
+            }
+            result[language] = self._compile_skeleton(
+                office_file, skeleton, stringset,
+                is_rtl=is_rtl.get(language, False)
+            )
+
+        office_file.delete()
+        return result
+
+    def _load_skeleton(self, template):
+        raise NotImplementedError
+
+    def _compile_skeleton(self, office_file, skeleton, stringset,
+                          is_rtl=False):
+        raise NotImplementedError
+
+    def _compile_paragraph_slots(self, skeleton, rels_soup, stringset,
+                                 is_rtl=False, force=()):
+        """
+        Compile copies of the skeleton's paragraph slots that are affected by
+        the stringset, in document order. Returns a dict of slot indexes to
+        the compiled copies.
+        """
+        compiled = {}
+        for index, slot in enumerate(skeleton.slots):
+            if not skeleton.translates(index, stringset) and \
+                    index not in force:
+                continue
+            element = copy(slot)
+            paragraphs = [element] + element.find_all(
+                self.PARAGRAPH_ELEMENT_TAG
+            )
+            for paragraph in paragraphs:
+                self.compile_paragraph(
+                    paragraph, rels_soup, stringset, is_rtl=is_rtl
+                )
+            compiled[index] = element
+        return compiled
+
     @staticmethod
     def _escape_xml(translation):
         """ Do escaping: BeautifulSoup doesn't like unescaped '&' or '<' in its
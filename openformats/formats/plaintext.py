@@ -13,6 +13,9 @@ class PlaintextHandler(OrderedCompilerMixin, Handler):
     extension = "txt"
     EXTRACTS_RAW = False
 
+    # Characters read from a stream at a time by `parse_stream`
+    CHUNK_SIZE = 64 * 1024
+
     def parse(self, content, **kwargs):
         stringset = []
         # find out whether we're using UNIX or DOS newlines
@@ -29,25 +32,81 @@ class PlaintextHandler(OrderedCompilerMixin, Handler):
                 newline_sequence = "\r\n"
             lines = content.split(newline_sequence)
 
-        template = ""
-        order = 0
+        template_lines = []
         for line in lines:
-            stripped_line = line.strip()
-            if stripped_line:
-                string = OpenString(six.text_type(order),
-                                    stripped_line,
-                                    order=order)
-                order += 1
+            template_line, string = self._parse_line(line, len(stringset))
+            if string is not None:
                 stringset.append(string)
+            template_lines.append(template_line)
 
-                template_line = line.replace(stripped_line,
-                                             string.template_replacement)
-            template += newline_sequence
-            if stripped_line:
-                template += template_line
-            else:
-                template += line
-
-        # remove newline_sequence added to the start of the template
-        template = template[len(newline_sequence):]
+        template = newline_sequence.join(template_lines)
         return template, stringset
+
+    def parse_stream(self, stream, template):
+        """
+        Parse the text stream `stream` line by line, yielding the strings as
+        they are found and writing the template to the file-like `template`
+        as it is being built, so that files of any size can be parsed.
+        """
+        order = 0
+        for line, newline in self._read_lines(stream):
+            template_line, string = self._parse_line(line, order)
+            template.write(template_line)
+            template.write(newline)
+            if string is not None:
+                order += 1
+                yield string
+
+    def _parse_line(self, line, order):
+        """
+        Return the template of `line` and its string, or None if the line is
+        blank.
+        """
+        stripped_line = line.strip()
+        if not stripped_line:
+            return line, None
+
+        string = OpenString(six.text_type(order), stripped_line, order=order)
+        start = len(line) - len(line.lstrip())
+        template_line = u"".join((line[:start],
+                                  string.template_replacement,
+                                  line[start + len(stripped_line):]))
+        return template_line, string
+
+    def _read_lines(self, stream):
+        """
+        Read the text stream `stream` in chunks and yield a
+        `(line, newline)` tuple for each of its lines, splitting them like
+        `parse` does: the newline type (UNIX or DOS) of the first newline is
+        used for the whole content.
+        """
+        newline_sequence = None
+        # The pieces of the line that is being read, which are joined once,
+        # when its newline is read, so that long lines are not copied over
+        # for every chunk
+        pieces = []
+        # The lines of a DOS line, up to the UNIX newlines inside it
+        dos_lines = []
+        while True:
+            chunk = stream.read(self.CHUNK_SIZE)
+            if not chunk:
+                break
+            lines = chunk.split('\n')
+            pieces.append(lines[0])
+            if len(lines) == 1:
+                continue
+            lines[0] = u"".join(pieces)
+            pieces = [lines.pop()]
+            for line in lines:
+                if newline_sequence is None:
+                    newline_sequence = "\r\n" if line.endswith('\r') else "\n"
+                if newline_sequence == "\n":
+                    yield line, newline_sequence
+                elif line.endswith('\r'):
+                    dos_lines.append(line[:-1])
+                    yield u"\n".join(dos_lines), newline_sequence
+                    dos_lines = []
+                else:
+                    dos_lines.append(line)
+        dos_lines.append(u"".join(pieces))
+        yield u"\n".join(dos_lines), ""
@@ -1,3 +1,4 @@
+import codecs
 import itertools
 import re
 from copy import copy
@@ -8,6 +9,11 @@ import six
 from ..exceptions import ParseError
 from ..handlers import Handler
 from ..strings import OpenString
+from ..transcribers import Transcriber
+from ..utils.mo import make_original, write_mo
+from ..utils.newlines import find_newline_type
+from ..utils.po import (PoScanner, PoSyntaxError, PoTemplate, PoTemplateEntry,
+                        format_field)
 
 
 class PoHandler(Handler):
@@ -22,6 +28,7 @@ class PoHandler(Handler):
 
     FUZZY_FLAG = "fuzzy"
     EXTRACTS_RAW = False
+    CHARSET_REGEX = re.compile(r"charset=([^\s;]+)")
     SPECIFIER = re.compile(
         r"%((?:(?P<ord>\d+)\$|\((?P<key>\w+)\))?(?P<fullvar>[+#\- 0]*(?:\d+)?"
         r"(?:\.\d+)?(hh\|h\|l\|ll|j|z|t|L)?(?P<type>[diufFeEgGxXaAoscpn%])))"
@@ -38,6 +45,31 @@ class PoHandler(Handler):
             po = polib.pofile(source)
         except Exception as e:
             raise ParseError("Error while validating PO file syntax: {}".format(e))
+
+        stringset, entry_strings = self._parse_entries(po, is_source)
+
+        indexes_to_remove = []
+        for i, (entry, openstring) in enumerate(zip(po, entry_strings)):
+            if openstring is None:
+                indexes_to_remove.append(i)
+            elif openstring.pluralized:
+                entry.msgstr_plural = {"0": openstring.template_replacement}
+            else:
+                entry.msgstr = openstring.template_replacement
+
+        self._smart_remove(po, indexes_to_remove)
+        return po, stringset
+
+    def _parse_entries(self, entries, is_source):
+        """Validates the entries and extracts their strings.
+
+        `entries` can be polib's `POEntry` objects or anything with the same
+        fields, like the ones of `openformats.utils.po.PoScanner`.
+
+        Returns the stringset and a list with the OpenString that should
+        replace the msgstr of each entry in the template, or None if the
+        entry should be removed from the template.
+        """
         existing_keys = set()
 
         # Do this in two passes, on the first pass we collect the data and
@@ -47,7 +79,7 @@ class PoHandler(Handler):
 
         string_data_list = []
         string_types = set()  # choices: EMPTY, SPACES, NOT_EMPTY
-        for entry in po:
+        for entry in entries:
             msgid = self._escape_key(entry.msgid)
             if not msgid:
                 raise ParseError("Found empty msgid.")
@@ -140,10 +172,10 @@ class PoHandler(Handler):
 
         file_type = "PO" if "NOT_EMPTY" in string_types else "POT"
         stringset = []
+        entry_strings = []
         order = itertools.count()
-        indexes_to_remove = []
 
-        for i, (string_data, entry) in enumerate(zip(string_data_list, po)):
+        for string_data in string_data_list:
             if is_source:
                 if file_type == "POT":
                     # This is a POT file, we must consider the msgids as strings
@@ -161,7 +193,7 @@ class PoHandler(Handler):
                 if string_data["string_type"] == "EMPTY":
                     # Translation files are all assumed to be PO files. Empty entries
                     # should be removed from the stringset
-                    indexes_to_remove.append(i)
+                    entry_strings.append(None)
                     continue
                 string_values = string_data["msgstrs"]
             openstring = OpenString(
@@ -176,15 +208,9 @@ class PoHandler(Handler):
                 developer_comment=string_data["developer_comment"],
             )
             stringset.append(openstring)
-            if string_data["fuzzy"]:
-                indexes_to_remove.append(i)
-            elif string_data["pluralized"]:
-                entry.msgstr_plural = {"0": openstring.template_replacement}
-            else:
-                entry.msgstr = openstring.template_replacement
+            entry_strings.append(None if string_data["fuzzy"] else openstring)
 
-        self._smart_remove(po, indexes_to_remove)
-        return po, stringset
+        return stringset, entry_strings
 
     def _raise_duplicate_error(self, entry):
         has_context = entry.msgctxt is not None
@@ -250,6 +276,15 @@ class PoHandler(Handler):
         as a consequence, strings after obsoleted ones are missing
         in the compiled file.
         """
+        result = [PoHandler._render_header(po_file)]
+        for entry in po_file:
+            result.append(six.text_type(entry))
+
+        return six.text_type("\n".join(result))
+
+    @staticmethod
+    def _render_header(po_file):
+        """Renders the header comments and the metadata entry."""
         result = []
         headers = po_file.header.split("\n")
         for header in headers:
@@ -258,71 +293,209 @@ class PoHandler(Handler):
             else:
                 result.append("# %s" % header)
         result.append(six.text_type(po_file.metadata_as_entry()))
-        for entry in po_file:
-            result.append(six.text_type(entry))
-
-        return six.text_type("\n".join(result))
+        return "\n".join(result)
 
-    def compile(self, template, stringset, **kwargs):
-        stringset = iter(stringset)
-        next_string = next(stringset, None)
+    def load_template(self, template):
+        """
+        Parse the template (a string or a `polib.POFile`) into a `PoTemplate`.
 
+        `compile`, `compile_mo`, `remove_strings_from_template` and
+        `add_strings_to_template` accept the result in place of the template,
+        so a template that is compiled for many languages only needs to be
+        parsed once.
+        """
+        if isinstance(template, PoTemplate):
+            return template
         if isinstance(template, polib.POFile):
             po = template
         else:
             po = polib.pofile(template)
 
-        for i, entry in enumerate(po):
-            if next_string is not None:
-                is_plural = True if entry.msgid_plural.strip() else False
-                if is_plural:
-                    compiled = self._compile_plural_entry(entry, next_string)
-                else:
-                    compiled = self._compile_entry(entry, next_string)
-                if compiled:
-                    next_string = next(stringset, None)
-                    continue
+        # Same layout as `pofile_to_str`
+        chunks = [self._render_header(po)]
+        chunks.extend("" for _ in po)
+        entries = [self._make_template_entry(entry) for entry in po]
+        metadata = po.metadata_as_entry().msgstr if po.metadata else None
+        return PoTemplate(chunks, entries, metadata)
 
-        return PoHandler.pofile_to_str(po)
+    def _make_template_entry(self, entry):
+        """Converts a polib entry to a `PoTemplateEntry`, along with the blank
+        line that separates it from the previous one.
+        """
+        text = six.text_type(entry)
+        delflag = "#~ " if entry.obsolete else ""
+        if entry.msgstr_plural:
+            lines = []
+            for index in sorted(entry.msgstr_plural):
+                lines.extend(format_field("msgstr",
+                                          entry.msgstr_plural[index],
+                                          delflag, "[%s]" % index))
+        else:
+            lines = format_field("msgstr", entry.msgstr, delflag)
+        placeholder = "\n".join(lines)
+
+        plural = True if entry.msgid_plural.strip() else False
+        if plural:
+            replacement = entry.msgstr_plural.get("0")
+        else:
+            replacement = entry.msgstr
+        return PoTemplateEntry(
+            head="\n" + text[:-len(placeholder) - 1],
+            placeholder=placeholder,
+            tail=text[-1:],
+            replacement=replacement,
+            plural=plural,
+            obsolete=entry.obsolete,
+            msgctxt=entry.msgctxt,
+            msgid=entry.msgid,
+            msgid_plural=entry.msgid_plural,
+        )
+
+    def compile(self, template, stringset, **kwargs):
+        return "".join(self.iter_compile(template, stringset))
+
+    def compile_to(self, template, stringset, output):
+        """
+        Write the compiled file to the file-like `output` while it is being
+        compiled, instead of building it in memory.
+        """
+        for chunk in self.iter_compile(template, stringset):
+            output.write(chunk)
+
+    def iter_compile(self, template, stringset):
+        """
+        Compile the template and yield the compiled file in chunks, one for
+        each entry.
+        """
+        po_template = self.load_template(template)
+
+        stringset = iter(stringset)
+        next_string = next(stringset, None)
+
+        yield po_template.finalize(po_template.chunks[0])
+        for entry, chunk in zip(po_template.entries, po_template.chunks[1:]):
+            if (next_string is not None and
+                    entry.replacement == next_string.template_replacement):
+                msgstrs = self._format_msgstrs(entry, next_string)
+                next_string = next(stringset, None)
+            else:
+                msgstrs = entry.placeholder
+            yield po_template.finalize(
+                "".join((entry.head, msgstrs, entry.tail, chunk))
+            )
+
+    @staticmethod
+    def _format_msgstrs(entry, openstring):
+        """Formats the msgstr lines of a template entry, filled with the
+        translation of `openstring`.
+        """
+        delflag = "#~ " if entry.obsolete else ""
+        if not entry.plural:
+            return "\n".join(format_field("msgstr", openstring.string,
+                                           delflag))
+        lines = []
+        for index in sorted(openstring.string):
+            lines.extend(format_field("msgstr", openstring.string[index],
+                                      delflag, "[%s]" % index))
+        return "\n".join(lines)
+
+    def compile_mo(self, template, stringset, hash_table=True, **kwargs):
+        """
+        Compile the template and the stringset straight to a binary GNU `.mo`
+        file, instead of compiling to PO and running msgfmt on the result.
+
+        Like msgfmt, the metadata entry is kept while obsolete and
+        untranslated entries are left out. Strings are encoded with the
+        charset of the metadata (UTF-8 if there is none) and the hash table
+        for O(1) lookups is included, unless `hash_table` is False.
+        """
+        po_template = self.load_template(template)
+        charset = self._get_charset(po_template.metadata)
+
+        messages = {}
+        if po_template.metadata is not None:
+            messages[b""] = po_template.metadata.encode(charset)
+
+        stringset = iter(stringset)
+        next_string = next(stringset, None)
+        for entry in po_template.entries:
+            if next_string is None:
+                break
+            if entry.replacement != next_string.template_replacement:
+                continue
+            if entry.plural:
+                translations = [next_string.string[index]
+                                for index in sorted(next_string.string)]
+            else:
+                translations = [next_string.string]
+            next_string = next(stringset, None)
+
+            if entry.obsolete or not any(translations):
+                continue
+            original = make_original(
+                entry.msgid.encode(charset),
+                None if entry.msgctxt is None else entry.msgctxt.encode(charset),
+                entry.msgid_plural.encode(charset) if entry.plural else None,
+            )
+            messages[original] = b"\x00".join(
+                translation.encode(charset) for translation in translations
+            )
+
+        return write_mo(messages, hash_table=hash_table)
+
+    def _get_charset(self, metadata):
+        match = self.CHARSET_REGEX.search(metadata or "")
+        if match is not None:
+            try:
+                return codecs.lookup(match.group(1)).name
+            except LookupError:
+                pass
+        return "utf-8"
+
+    def sync_template(self, template, stringset, **kwargs):
+        """
+        Same as removing and then adding strings, but the template is only
+        parsed once.
+        """
+        stringset = list(stringset)
+        po_template = self._remove_entries(self.load_template(template),
+                                           stringset)
+        if self.stringset_index < len(stringset):
+            po_template = self._add_entries(
+                po_template, stringset[self.stringset_index:]
+            )
+        return po_template.to_string()
 
     def remove_strings_from_template(self, template, stringset, **kwargs):
         """
         Remove PO entries that don't correspond to the given stringset.
+        """
+        return self._remove_entries(self.load_template(template),
+                                    stringset).to_string()
 
-        we walk the PO and the stringset when the entry's
+    def _remove_entries(self, po_template, stringset):
+        """
+        We walk the PO and the stringset when the entry's
         msgstr/msgstr_plural["0"] matches next_string.template_replacement
         we keep it otherwise we mark it for removal.
         """
-        stringset = list(stringset)
-
         iterator = iter(stringset)
         next_string = next(iterator, None)
 
-        if isinstance(template, polib.POFile):
-            po = template
-        else:
-            po = polib.pofile(template)
-
         indexes_to_remove = []
         matched_count = 0
 
-        for i, entry in enumerate(po):
+        for i, entry in enumerate(po_template.entries):
             if next_string is not None:
-                is_plural = True if entry.msgid_plural.strip() else False
-                if (
-                    (is_plural and entry.msgstr_plural.get("0") == next_string.template_replacement)
-                    or entry.msgstr == next_string.template_replacement
-                ):
+                if entry.replacement == next_string.template_replacement:
                     matched_count += 1
                     next_string = next(iterator, None)
                     continue
             indexes_to_remove.append(i)
 
-        self._smart_remove(po, indexes_to_remove)
-
         self.stringset_index = matched_count
 
-        return PoHandler.pofile_to_str(po)
+        return po_template.without_entries(indexes_to_remove)
 
     def add_strings_to_template(self, template, stringset, **kwargs):
         """
@@ -334,16 +507,14 @@ class PoHandler(Handler):
         if not remaining:
             return template
 
-        if isinstance(template, polib.POFile):
-            po = template
-        else:
-            po = polib.pofile(template)
-
-        for os in remaining:
-            entry = self._make_added_entry(os)
-            po.append(entry)
+        return self._add_entries(self.load_template(template),
+                                 remaining).to_string()
 
-        return PoHandler.pofile_to_str(po)
+    def _add_entries(self, po_template, stringset):
+        return po_template.with_entries([
+            self._make_template_entry(self._make_added_entry(os))
+            for os in stringset
+        ])
 
     @staticmethod
     def _escape_key(part: str) -> str:
@@ -431,32 +602,6 @@ class PoHandler(Handler):
         return entry
 
 
-    def _compile_entry(self, entry, next_string):
-        """Compiles the current non pluralized entry.
-        If the current entry's matches the openstring compiles the string if
-        it does.
-
-        :param entry: The entry to check.
-        :param next_string: The openstring to compile.
-        """
-        if entry.msgstr == next_string.template_replacement:
-            entry.msgstr = next_string.string
-            return True
-        return False
-
-    def _compile_plural_entry(self, entry, next_string):
-        """Compiles the current pluralized entry.
-        If the current entry's matches the openstring compiles the string if
-        it does.
-
-        :param entry: The entry to check.
-        :param next_string: The openstring to compile.
-        """
-        if entry.msgstr_plural.get("0") == next_string.template_replacement:
-            entry.msgstr_plural = next_string.string
-            return True
-        return False
-
     def _smart_remove(self, po, indexes_to_remove):
         """If you have a big list and go through it and selectively remove entries with
         `.remove()`, it will get slow. This is because each call to `.remove()` will
@@ -481,3 +626,122 @@ class PoHandler(Handler):
 
         for i in reversed(indexes_to_remove):
             del po[i]
+
+
+class PoHandlerV2(PoHandler):
+    """A PO handler that does not go through polib to parse and compile.
+
+    `PoScanner` records where every entry and every msgstr is in the content,
+    so templates are written by slicing the content with a Transcriber and
+    `load_template` splits templates around their msgstrs without polib.
+    Everything outside of the msgstrs (header, comments, wrapping, obsolete
+    entries) is kept as is. The extracted strings and the validation
+    are the same as PoHandler's.
+    """
+
+    def parse(self, source, is_source=False):
+        transcriber = Transcriber(source)
+        source = transcriber.source
+        entries = self._scan(source)
+
+        stringset, entry_strings = self._parse_entries(entries, is_source)
+
+        for entry, openstring in zip(entries, entry_strings):
+            if openstring is None:
+                self._remove_entry(transcriber, entry)
+            else:
+                self._replace_msgstr(
+                    transcriber,
+                    entry,
+                    openstring.template_replacement,
+                    plural_index="[0]" if openstring.pluralized else "",
+                )
+
+        transcriber.copy_to_end()
+        return transcriber.get_destination(), stringset
+
+    def load_template(self, template):
+        if isinstance(template, PoTemplate):
+            return template
+        newline_type = find_newline_type(template)
+        template = Transcriber(template).source
+
+        scanner = PoScanner(template)
+        try:
+            entries = scanner.scan()
+        except PoSyntaxError as e:
+            raise ParseError("Error while validating PO file syntax: {}".format(e))
+
+        chunks = []
+        template_entries = []
+        position = 0
+        for entry in entries:
+            chunks.append(template[position:entry.leading])
+            if entry.msgstr_start is None:
+                head = template[entry.leading:entry.end]
+                placeholder = tail = ""
+            else:
+                head = template[entry.leading:entry.msgstr_start]
+                placeholder = template[entry.msgstr_start:entry.msgstr_end]
+                tail = template[entry.msgstr_end:entry.end]
+            plural = True if entry.msgid_plural.strip() else False
+            if plural:
+                replacement = entry.msgstr_plural.get("0")
+            else:
+                replacement = entry.msgstr
+            template_entries.append(PoTemplateEntry(
+                head=head,
+                placeholder=placeholder,
+                tail=tail,
+                replacement=replacement,
+                plural=plural,
+                obsolete=entry.obsolete,
+                msgctxt=entry.msgctxt,
+                msgid=entry.msgid,
+                msgid_plural=entry.msgid_plural,
+            ))
+            position = entry.end
+        chunks.append(template[position:])
+
+        metadata_entry = scanner.metadata_entry
+        return PoTemplate(
+            chunks,
+            template_entries,
+            None if metadata_entry is None else metadata_entry.msgstr,
+            newline_type,
+        )
+
+    @staticmethod
+    def _scan(content):
+        try:
+            return PoScanner(content).scan()
+        except PoSyntaxError as e:
+            raise ParseError("Error while validating PO file syntax: {}".format(e))
+
+    @staticmethod
+    def _format_msgstr(entry, value, plural_index=""):
+        delflag = "#~ " if entry.obsolete else ""
+        return format_field("msgstr", value, delflag, plural_index)
+
+    def _replace_msgstr(self, transcriber, entry, value, plural_index=""):
+        self._replace_lines(
+            transcriber, entry, self._format_msgstr(entry, value, plural_index)
+        )
+
+    @staticmethod
+    def _replace_lines(transcriber, entry, lines):
+        """Replaces the msgstr lines of the entry with `lines`."""
+        if entry.msgstr_start is None:
+            # The entry has no msgstr at all, add it after its last line
+            transcriber.copy_until(entry.content_end)
+            transcriber.add("\n")
+        else:
+            transcriber.copy_until(entry.msgstr_start)
+            transcriber.skip_until(entry.msgstr_end)
+        transcriber.add("\n".join(lines))
+
+    @staticmethod
+    def _remove_entry(transcriber, entry):
+        """Removes the entry along with the blank lines before it."""
+        transcriber.copy_until(entry.leading)
+        transcriber.skip_until(entry.end)
@@ -11,7 +11,9 @@ import six
 from bs4 import BeautifulSoup
 from openformats.handlers import Handler
 from openformats.exceptions import MissingParentError
-from openformats.formats.office_open_xml.parser import OfficeOpenXmlHandler
+from openformats.formats.office_open_xml.parser import (
+    OfficeOpenXmlHandler, PristineParts, TemplateSkeleton, clone_soup
+)
 from openformats.strings import OpenString
 from collections import defaultdict
 
@@ -177,6 +179,12 @@ class PptxFile(object):
 
         return self.__slides[slide]['slide']['content']
 
+    def get_slide_path(self, slide):
+        return self.__slides[slide]['slide']['path']
+
+    def get_slide_rels_path(self, slide):
+        return self.__slides[slide]['rels']['path']
+
     def is_notes_slide(self, slide):
         return self.__slides[slide]['slide']['notes']
 
@@ -267,6 +275,7 @@ class PptxHandler(Handler, OfficeOpenXmlHandler):
     EXTRACTS_RAW = False
     name = "PPTX"
     TEXT_ELEMENT_TAG = "a:t"
+    PARAGRAPH_ELEMENT_TAG = "a:p"
 
     @classmethod
     def get_hyperlink_url(cls, element, document_rels):
@@ -389,7 +398,12 @@ class PptxHandler(Handler, OfficeOpenXmlHandler):
         pptx = PptxFile(template)
         is_rtl = kwargs.get('is_rtl', False)
         for slide in pptx.get_slides():
-            soup = BeautifulSoup(pptx.get_slide(slide), 'xml')
+            # Slides without translated paragraphs are left as they are
+            slide_content = pptx.get_slide(slide)
+            if not self._references_stringset(slide_content, stringset):
+                continue
+
+            soup = BeautifulSoup(slide_content, 'xml')
             rels_soup = BeautifulSoup(pptx.get_slide_rels(slide), 'xml')
 
             for parent in soup.find_all(['p:sp', 'p:graphicFrame']):
@@ -405,6 +419,43 @@ class PptxHandler(Handler, OfficeOpenXmlHandler):
         pptx.delete()
         return result
 
+    def _load_skeleton(self, template):
+        pptx = PptxFile(template)
+        slides = []
+        for slide in pptx.get_slides():
+            soup = BeautifulSoup(pptx.get_slide(slide), 'xml')
+            rels_soup = BeautifulSoup(pptx.get_slide_rels(slide), 'xml')
+            document = TemplateSkeleton(soup, TemplateSkeleton.outermost(
+                soup.find_all('a:p', attrs={'txid': True})
+            ))
+            slides.append((slide, document, rels_soup))
+
+        pristine = PristineParts(itertools.chain.from_iterable(
+            (pptx.get_slide_path(slide), pptx.get_slide_rels_path(slide))
+            for slide, _, _ in slides
+        ))
+        return pptx, (slides, pristine)
+
+    def _compile_skeleton(self, pptx, skeleton, stringset, is_rtl=False):
+        slides, pristine = skeleton
+        for slide, document, rels_soup in slides:
+            if not document.translates_any(stringset):
+                pristine.restore(pptx.get_slide_path(slide))
+                pristine.restore(pptx.get_slide_rels_path(slide))
+                continue
+
+            rels_soup = clone_soup(rels_soup)
+            compiled = self._compile_paragraph_slots(
+                document, rels_soup, stringset, is_rtl=is_rtl
+            )
+            pptx.set_slide(slide, document.join({
+                index: document.render(element)
+                for index, element in six.iteritems(compiled)
+            }))
+            pptx.set_slide_rels(slide, six.text_type(rels_soup))
+        return pptx.compress()
+
+
 class PptxHandlerV2(PptxHandler):
     """
     New version of the PptxHandler that handles empty spaces in the text elements as
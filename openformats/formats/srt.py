@@ -1,9 +1,10 @@
-import re
+from io import StringIO
 
 from ..handlers import Handler
 from openformats.exceptions import ParseError
 from openformats.strings import OpenString
-from openformats.transcribers import Transcriber
+from openformats.utils.subtitles import (SectionTranscriber, SubtitleReader,
+                                         TimingIndex, to_milliseconds)
 
 
 class SrtHandler(Handler):
@@ -11,39 +12,42 @@ class SrtHandler(Handler):
     extension = "srt"
     EXTRACTS_RAW = False
 
-    NON_SPACE_PAT = re.compile(r'[^\s]')
-
-    def _generate_split_subtitles(self, content, **kwargs):
-        start = 0
-        for section in content.split('\n\n'):
-            # find first non-space character of section
-            match = self.NON_SPACE_PAT.search(section)
-            if match:
-                yield start + match.start(), section.strip()
-            start += len(section) + 2
-
     def parse(self, content):
-        self.transcriber = Transcriber(content)
-        source = self.transcriber.source
-        stringset = []
+        template = StringIO()
+        stringset = list(self.parse_stream(StringIO(content), template))
+        return template.getvalue(), stringset
+
+    def parse_stream(self, stream, template):
+        """
+        Parse the subtitles of the text stream `stream` one section at a time,
+        yielding their strings and writing the template to the file-like
+        `template` as they are parsed.
+
+        The start and end of every string are collected in `self.timings`,
+        a TimingIndex.
+        """
+        reader = SubtitleReader(stream)
         self.max_order = None
-        for start, subtitle_section in self._generate_split_subtitles(source):
-            self.transcriber.copy_until(start)
-            offset, string = self._parse_section(start, subtitle_section)
-
-            if string:
-                stringset.append(string)
-
-                self.transcriber.copy_until(offset)
-                self.transcriber.add(string.template_replacement)
-                self.transcriber.skip(len(string.string))
-            else:
-                self.transcriber.copy_until(start + len(subtitle_section))
+        self.timings = TimingIndex()
+        newline_count = 0
+        for gap, subtitle_section in reader.iter_subtitles():
+            template.write(reader.restore_newlines(gap))
+            if subtitle_section is None:
+                break
+            newline_count += gap.count('\n')
+            self.transcriber = SectionTranscriber(
+                subtitle_section, reader.newline_type, newline_count
+            )
+            offset, string = self._parse_section(0, subtitle_section)
 
-        self.transcriber.copy_until(len(source))
+            self.transcriber.copy_until(offset)
+            self.transcriber.add(string.template_replacement)
+            self.transcriber.skip(len(string.string))
+            self.transcriber.copy_until(len(subtitle_section))
 
-        template = self.transcriber.get_destination()
-        return template, stringset
+            template.write(self.transcriber.get_destination())
+            newline_count = self.transcriber.newline_count
+            yield string
 
     def _parse_section(self, offset, section):
         try:
@@ -104,14 +108,14 @@ class SrtHandler(Handler):
                 )
             )
         try:
-            start = self._format_timing(start)
+            start, start_ms = self._parse_timing(start)
         except ValueError:
             raise ParseError(
                 u"Problem with start of timing at line {line_no}: '{start}'".
                 format(line_no=self.transcriber.line_number + 1, start=start)
             )
         try:
-            end = self._format_timing(end)
+            end, end_ms = self._parse_timing(end)
         except ValueError:
             raise ParseError(
                 u"Problem with end of timing at line {line_no}: '{end}'".
@@ -126,9 +130,14 @@ class SrtHandler(Handler):
 
         string = OpenString(order_str.strip(), string, order=order_int,
                             occurrences="{},{}".format(start, end))
+        self.timings.append(start_ms, end_ms)
         return offset + len(order_str) + 1 + len(timings) + 1, string
 
-    def _format_timing(self, timing):
+    def _parse_timing(self, timing):
+        """
+        Return the timing formatted for `occurrences` and its time in
+        milliseconds.
+        """
         try:
             rest, milliseconds = timing.split(',')
             milliseconds = "{:<03}".format(milliseconds)
@@ -139,44 +148,53 @@ class SrtHandler(Handler):
                                                  int(minutes),
                                                  int(seconds),
                                                  int(milliseconds))
-        return "{:02}:{:02}:{:02}.{:03}".format(hours, minutes, seconds,
-                                                milliseconds)
+        return ("{:02}:{:02}:{:02}.{:03}".format(hours, minutes, seconds,
+                                                 milliseconds),
+                to_milliseconds(hours, minutes, seconds, milliseconds))
 
     def compile(self, template, stringset, **kwargs):
-        transcriber = Transcriber(template)
-        template = transcriber.source
+        output = StringIO()
+        self.compile_stream(StringIO(template), stringset, output)
+        return output.getvalue()
+
+    def compile_stream(self, template, stringset, output):
+        """
+        Compile the template read from the text stream `template` one section
+        at a time, writing the compiled file to the file-like `output`.
+        """
+        reader = SubtitleReader(template)
         stringset = iter(stringset)
-        string = next(stringset)
-
-        for start, subtitle_section in self.\
-                _generate_split_subtitles(template):
-            transcriber.copy_until(start)
+        string = next(stringset, None)
+
+        for gap, subtitle_section in reader.iter_subtitles():
+            output.write(reader.restore_newlines(gap))
+            if subtitle_section is None:
+                break
+            transcriber = SectionTranscriber(subtitle_section,
+                                             reader.newline_type)
             transcriber.mark_section_start()
 
             # Hash is supposed to follow second newline character
             first_newline = subtitle_section.index('\n')
-            second_newline = subtitle_section.index('\n', first_newline + 1)
+            second_newline = subtitle_section.index('\n',
+                                                    first_newline + 1)
             hash_position = second_newline + 1
 
-            if (subtitle_section[
+            if (string is not None and subtitle_section[
                     hash_position:
                     hash_position + len(string.template_replacement)
                     ] == string.template_replacement):
                 # found it
-                transcriber.copy_until(start + hash_position)
+                transcriber.copy_until(hash_position)
                 transcriber.add(string.string)
                 transcriber.skip(len(string.template_replacement))
-                transcriber.copy_until(start + len(subtitle_section))
+                transcriber.copy_until(len(subtitle_section))
                 transcriber.mark_section_end()
-                try:
-                    string = next(stringset)
-                except StopIteration:
-                    pass
+                string = next(stringset, string)
             else:
                 # did not find it, must remove section
-                transcriber.copy_until(start + len(subtitle_section))
+                transcriber.copy_until(len(subtitle_section))
                 transcriber.mark_section_end()
                 transcriber.remove_section()
 
-        transcriber.copy_until(len(template))
-        return transcriber.get_destination()
+            output.write(transcriber.get_destination())
@@ -1,9 +1,14 @@
-import re
+from io import StringIO
 from itertools import count
 
 from openformats.exceptions import ParseError
 from openformats.strings import OpenString
-from openformats.transcribers import Transcriber
+from openformats.utils.subtitles import (
+    SectionTranscriber,
+    SubtitleReader,
+    TimingIndex,
+    to_milliseconds,
+)
 
 from ..handlers import Handler
 
@@ -13,43 +18,57 @@ class VttHandler(Handler):
     extension = "vtt"
     EXTRACTS_RAW = False
 
-    NON_SPACE_PAT = re.compile(r"[^\s]")
-
-    def _generate_split_subtitles(self, content, **kwargs):
-        start = 0
-        for section in content.split("\n\n"):  # sections are separated by blank lines
-            # find first non-space character of section
-            match = self.NON_SPACE_PAT.search(section)
-            if match:
-                yield start + match.start(), section.strip()
-            start += len(section) + 2
-
     def parse(self, content, **kwargs):
-        self.transcriber = Transcriber(content)
-        source = self.transcriber.source
-        stringset = []
+        template = StringIO()
+        stringset = list(self.parse_stream(StringIO(content), template))
+        return template.getvalue(), stringset
+
+    def parse_stream(self, stream, template):
+        """
+        Parse the subtitles of the text stream `stream` one section at a time,
+        yielding their strings and writing the template to the file-like
+        `template` as they are parsed.
+
+        The `WEBVTT` header is checked on the first section, before anything
+        is yielded or written. The start and end of every string are
+        collected in `self.timings`, a TimingIndex.
+        """
+        reader = SubtitleReader(stream)
         self._order = count()
-        for start, subtitle_section in self._generate_split_subtitles(source):
-            self.transcriber.copy_until(start)
-            offset, string = self._parse_section(start, subtitle_section)
+        self.timings = TimingIndex()
+        has_strings = False
+        first_section = True
+        newline_count = 0
+        for gap, subtitle_section in reader.iter_subtitles():
+            if subtitle_section is None:
+                template.write(reader.restore_newlines(gap))
+                break
+            newline_count += gap.count("\n")
+            self.transcriber = SectionTranscriber(
+                subtitle_section, reader.newline_type, newline_count
+            )
+            offset, string = self._parse_section(0, subtitle_section)
 
             if string:
-                stringset.append(string)
-
                 self.transcriber.copy_until(offset)
                 self.transcriber.add(string.template_replacement)
                 self.transcriber.skip(len(string.string))
-            else:
-                self.transcriber.copy_until(start + len(subtitle_section))
-
-        self.transcriber.copy_until(len(source))
+            self.transcriber.copy_until(len(subtitle_section))
+
+            section_template = self.transcriber.get_destination()
+            if first_section:
+                if not (gap + section_template).startswith("WEBVTT"):
+                    raise ParseError("VTT file should start with 'WEBVTT'!")
+                first_section = False
+            template.write(reader.restore_newlines(gap))
+            template.write(section_template)
+            newline_count = self.transcriber.newline_count
+            if string:
+                has_strings = True
+                yield string
 
-        template = self.transcriber.get_destination()
-        if len(stringset) == 0:
+        if not has_strings:
             raise ParseError("We are not able to extract any strings from the file")
-        elif not template.startswith("WEBVTT"):
-            raise ParseError("VTT file should start with 'WEBVTT'!")
-        return template, stringset
 
     def _parse_section(self, offset, section):
         src_strings = section.split("\n")  # identifier_str is optional in VTT
@@ -89,13 +108,13 @@ class VttHandler(Handler):
                 "don't follow '[start] --> [end] (position)' pattern"
             )
         try:
-            start = self._format_timing(start)
+            start, start_ms = self._parse_timing(start)
         except ValueError:
             raise ParseError(
                 f"Problem with start of timing at line {self.transcriber.line_number + 1}: '{start}'"
             )
         try:
-            end = self._format_timing(end)
+            end, end_ms = self._parse_timing(end)
         except ValueError:
             raise ParseError(
                 f"Problem with end of timing at line {self.transcriber.line_number + 1}: '{end}'"
@@ -113,12 +132,17 @@ class VttHandler(Handler):
             occurrences=f"{start},{end}",
             order=next(self._order),
         )
+        self.timings.append(start_ms, end_ms)
         offset += len(identifier) + len(timings) + 1
         if len(identifier):
             offset += 1
         return offset, string
 
-    def _format_timing(self, timing):
+    def _parse_timing(self, timing):
+        """
+        Return the timing formatted for `occurrences` and its time in
+        milliseconds.
+        """
         try:
             rest, milliseconds = timing.split(".")
             milliseconds = f"{milliseconds:<03}"
@@ -132,7 +156,10 @@ class VttHandler(Handler):
                 int(seconds),
                 int(milliseconds),
             )
-            return f"{minutes:02}:{seconds:02}.{milliseconds:03}"
+            return (
+                f"{minutes:02}:{seconds:02}.{milliseconds:03}",
+                to_milliseconds(0, minutes, seconds, milliseconds),
+            )
         elif rest.count(":") == 2:
             hours, minutes, seconds = rest.split(":")
             hours, minutes, seconds, milliseconds = (
@@ -141,20 +168,35 @@ class VttHandler(Handler):
                 int(seconds),
                 int(milliseconds),
             )
-            return f"{hours:02}:{minutes:02}:{seconds:02}.{milliseconds:03}"
+            return (
+                f"{hours:02}:{minutes:02}:{seconds:02}.{milliseconds:03}",
+                to_milliseconds(hours, minutes, seconds, milliseconds),
+            )
         else:
             raise ParseError(
                 f"Unexpected timing format on line {self.transcriber.line_number + 2}"
             )
 
     def compile(self, template, stringset, **kwargs):
-        transcriber = Transcriber(template)
-        template = transcriber.source
+        output = StringIO()
+        self.compile_stream(StringIO(template), stringset, output)
+        return output.getvalue()
+
+    def compile_stream(self, template, stringset, output):
+        """
+        Compile the template read from the text stream `template` one section
+        at a time, writing the compiled file to the file-like `output`.
+        """
+        reader = SubtitleReader(template)
         stringset = iter(stringset)
         string = next(stringset, None)
 
-        for start, subtitle_section in self._generate_split_subtitles(template):
-            transcriber.copy_until(start)
+        for gap, subtitle_section in reader.iter_subtitles():
+            output.write(reader.restore_newlines(gap))
+            if subtitle_section is None:
+                break
+            transcriber = SectionTranscriber(subtitle_section,
+                                             reader.newline_type)
             transcriber.mark_section_start()
 
             # Find hash after timings
@@ -171,7 +213,7 @@ class VttHandler(Handler):
                     pass
 
             if hash_position < 0:
-                transcriber.copy_until(start + len(subtitle_section))
+                transcriber.copy_until(len(subtitle_section))
                 transcriber.mark_section_end()
             elif string is not None and (
                 subtitle_section[
@@ -180,17 +222,16 @@ class VttHandler(Handler):
                 == string.template_replacement
             ):
                 # found it
-                transcriber.copy_until(start + hash_position)
+                transcriber.copy_until(hash_position)
                 transcriber.add(string.string)
                 transcriber.skip(len(string.template_replacement))
-                transcriber.copy_until(start + len(subtitle_section))
+                transcriber.copy_until(len(subtitle_section))
                 transcriber.mark_section_end()
                 string = next(stringset, None)
             else:
                 # did not find it, must remove section
-                transcriber.copy_until(start + len(subtitle_section))
+                transcriber.copy_until(len(subtitle_section))
                 transcriber.mark_section_end()
                 transcriber.remove_section()
 
-        transcriber.copy_until(len(template))
-        return transcriber.get_destination()
+            output.write(transcriber.get_destination())
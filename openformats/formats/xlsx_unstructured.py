@@ -13,7 +13,9 @@ from bs4 import BeautifulSoup
 from bs4.dammit import EntitySubstitution
 from bs4.formatter import XMLFormatter
 
-from openformats.formats.office_open_xml.parser import OfficeOpenXmlHandler
+from openformats.formats.office_open_xml.parser import (
+    OfficeOpenXmlHandler, PristineParts, TemplateSkeleton, clone_soup
+)
 from openformats.handlers import Handler
 from openformats.strings import OpenString
 
@@ -163,6 +165,10 @@ class XlsxFile(object):
         with open(self.get_sheet(sheet)["path"], "w") as f:
             f.write(content.encode(formatter=UnsortedAttributes()).decode())
 
+    def set_sheet_markup(self, sheet, markup):
+        with open(self.get_sheet(sheet)["path"], "w") as f:
+            f.write(markup)
+
     def has_rels(self, sheet):
         return os.path.exists(self.get_sheet(sheet)["rels_path"])
 
@@ -184,6 +190,10 @@ class XlsxFile(object):
         with open(self.get_shared_strings_path(), "w") as f:
             f.write(content.encode(formatter=UnsortedAttributes()).decode())
 
+    def set_shared_strings_markup(self, markup):
+        with open(self.get_shared_strings_path(), "w") as f:
+            f.write(markup)
+
     def delete(self):
         shutil.rmtree(self.__tmp_folder)
 
@@ -212,6 +222,9 @@ class XlsxUnstructuredHandler(Handler, OfficeOpenXmlHandler):
     EXTRACTS_RAW = False
     name = "XLSX_UNSTRUCTURED"
 
+    SHEET_VIEW_PATTERN = re.compile(r'<sheetView\b[^>]*?(/?)>')
+    RIGHT_TO_LEFT_PATTERN = re.compile(r"""\srightToLeft=(["'])(.*?)\1""")
+
     @staticmethod
     def _extract_sheet_names(xlsx):
         wordbook_soup = BeautifulSoup(
@@ -394,10 +407,7 @@ class XlsxUnstructuredHandler(Handler, OfficeOpenXmlHandler):
 
         return cleaned_strings
 
-    def _compile_workbook(self, xlsx, stringset):
-        workbook_soup = BeautifulSoup(
-            xlsx.get_workbook_content(), "xml"
-        )
+    def _compile_workbook(self, workbook_soup, stringset):
         sheets = workbook_soup.find_all("sheet")
         for sheet in sheets:
             txid = sheet.attrs.get("txid")
@@ -410,22 +420,190 @@ class XlsxUnstructuredHandler(Handler, OfficeOpenXmlHandler):
 
             sheet.attrs["name"] = open_string.string
             sheet.attrs.pop("txid", None)
-        xlsx.set_workbook_content(workbook_soup)
 
+    @staticmethod
+    def _get_hyperlink_map(sheet_soup, sheet_rels_soup):
+        hyperlink_map = {}
+        if sheet_rels_soup:
+            relationships = sheet_rels_soup.find_all(
+                "Relationship",
+                attrs={"TargetMode": "External"}
+            ) or []
+
+            rels_map = {
+                relationship.attrs["Id"]: relationship.attrs["Target"]
+                for relationship in relationships
+            }
+            for hyperlink in sheet_soup.find_all("hyperlink"):
+                r_id = hyperlink["r:id"] if hyperlink.has_attr("r:id") else None
+                if r_id and r_id in rels_map:
+                    hyperlink_map[hyperlink.attrs["ref"]] = r_id
+        return hyperlink_map
+
+    def _parse_translation(self, open_string):
+        translation_string = open_string.string
+        escaped_translation_string = self._escape_xml(translation_string)
+
+        """
+        some examples of transifex translations would be
+        - part1
+        - <tx>part1</tx><tx>part2</tx>
+        - <tx href='app.transifex.com'><tx>part1</tx><tx>part2</tx></tx>
+        """
+        translation_soup = BeautifulSoup(
+            u'<wrapper>{}</wrapper>'.format(escaped_translation_string), 'xml',
+        )
+        translation_hyperlink = translation_soup.find(
+            lambda tag: tag.has_attr("href")
+        )
+        translation_parts = translation_soup.find_all(text=True)
+
+        target_url = None
+        if translation_hyperlink:
+            target_url = translation_hyperlink.attrs["href"]
+
+        return translation_parts, target_url
+
+    def _compile_text_elements(self, element, translation_parts):
+        t_strings = element.find_all("t")
+        t_strings_len = len(t_strings)
+
+        translation_parts_cleaned = self._prepare_string(
+            translation_parts, t_strings_len
+        )
+
+        for t_string in t_strings:
+            translation = (
+                translation_parts_cleaned.pop(0)
+                if translation_parts_cleaned
+                else None
+            )
+
+            if not translation:
+                t_string.string = ""
+                continue
+            t_string.string = translation
+
+    def _compile_shared_string(self, shared_string, open_string):
+        """
+        Shared strings that are displayed with a hyperlink are turned into
+        inline strings during parsing, so a shared string never has to update
+        the hyperlink of the cells that reference it.
+        """
+        translation_parts, _ = self._parse_translation(open_string)
+        self._compile_text_elements(shared_string, translation_parts)
+        shared_string.attrs.pop("txid", None)
+
+    def _compile_cell(self, sheet_text_cell, open_string, sheet_rels_soup,
+                      hyperlink_map):
+        translation_parts, target_url = self._parse_translation(open_string)
+
+        cell_ref = sheet_text_cell.attrs["r"]
+        cell_hyper_link_id = hyperlink_map.get(cell_ref)
+        if target_url and cell_hyper_link_id:
+            rel = sheet_rels_soup.find(
+                "Relationship",
+                attrs={"Id": cell_hyper_link_id, "TargetMode": "External"}
+            )
+            rel.attrs["Target"] = target_url
+
+        if all([
+            sheet_text_cell.has_attr("t"),
+            sheet_text_cell.attrs["t"] == "str",
+            sheet_text_cell.f,
+        ]):
+            link_content = sheet_text_cell.f.text
+            match = re.search(r'HYPERLINK\("(.*?)","(.*?)"\)', link_content)
+            link, text = match.groups() if match else (None, None)
+            if link and text:
+                translation = "".join(translation_parts)
+                if target_url:
+                    sheet_text_cell.f.string = (
+                        f'HYPERLINK("{target_url}","{translation}")'
+                    )
+                else:
+                    sheet_text_cell.f.string = (
+                        f'HYPERLINK("{link}","{translation}")'
+                    )
+
+        else:
+            self._compile_text_elements(sheet_text_cell, translation_parts)
+        sheet_text_cell.attrs.pop("txid", None)
+
+    @classmethod
+    def _orient_sheet_content(cls, sheet_content, is_rtl):
+        """
+        Set the orientation of a sheet that is otherwise left untouched,
+        without parsing it. Returns None if the sheet's orientation is already
+        the requested one.
+        """
+        if is_rtl is None:
+            return None
+        sheet_view = cls.SHEET_VIEW_PATTERN.search(sheet_content)
+        if sheet_view is None:
+            return None
+
+        sheet_view_tag = sheet_view.group(0)
+        right_to_left = cls.RIGHT_TO_LEFT_PATTERN.search(sheet_view_tag)
+        current_is_rtl = right_to_left is not None and \
+            right_to_left.group(2).lower() in ("1", "true")
+        if current_is_rtl == bool(is_rtl):
+            return None
+
+        attribute = u' rightToLeft="{}"'.format(is_rtl)
+        if right_to_left is not None:
+            start, end = right_to_left.span()
+        else:
+            start = end = sheet_view.start(1) - sheet_view.start()
+        sheet_view_tag = u"".join(
+            [sheet_view_tag[:start], attribute, sheet_view_tag[end:]]
+        )
+        return u"".join([
+            sheet_content[:sheet_view.start()],
+            sheet_view_tag,
+            sheet_content[sheet_view.end():],
+        ])
 
     def compile(self, template, stringset, **kwargs):
+        """
+        Parts (workbook, shared strings, sheets) whose markup does not
+        reference any of the stringset's hashes are left as they are, without
+        being parsed.
+        """
         is_rtl = kwargs.get('is_rtl', False)
         stringset = {
             string.string_hash: string for string in stringset
         }
         xlsx = XlsxFile(template)
 
-        shared_strings_soup = BeautifulSoup(xlsx.get_shared_strings_content(), "xml")
-        shared_strings = shared_strings_soup.find_all("si")
+        workbook_content = xlsx.get_workbook_content()
+        if self._references_stringset(workbook_content, stringset):
+            workbook_soup = BeautifulSoup(workbook_content, "xml")
+            self._compile_workbook(workbook_soup, stringset)
+            xlsx.set_workbook_content(workbook_soup)
+
+        shared_strings_content = xlsx.get_shared_strings_content()
+        if self._references_stringset(shared_strings_content, stringset):
+            shared_strings_soup = BeautifulSoup(shared_strings_content, "xml")
+            for shared_string in shared_strings_soup.find_all(
+                "si", attrs={"txid": True}
+            ):
+                open_string = stringset.get(shared_string.attrs["txid"])
+                if open_string:
+                    self._compile_shared_string(shared_string, open_string)
+            xlsx.set_shared_strings_content(shared_strings_soup)
 
-        self._compile_workbook(xlsx, stringset)
         for sheet in xlsx.get_sheets():
-            sheet_soup = BeautifulSoup(xlsx.get_sheet_content(sheet), "xml")
+            sheet_content = xlsx.get_sheet_content(sheet)
+            if not self._references_stringset(sheet_content, stringset):
+                sheet_content = self._orient_sheet_content(
+                    sheet_content, is_rtl
+                )
+                if sheet_content is not None:
+                    xlsx.set_sheet_markup(sheet, sheet_content)
+                continue
+
+            sheet_soup = BeautifulSoup(sheet_content, "xml")
             sheet_rels_soup = None
             if xlsx.has_rels(sheet):
                 sheet_rels_soup = BeautifulSoup(
@@ -442,41 +620,11 @@ class XlsxUnstructuredHandler(Handler, OfficeOpenXmlHandler):
                 attrs={"t": ["s", "inlineStr", "str"]}
             )
 
-            hyperlink_map = {}
-            if sheet_rels_soup:
-                relationships = sheet_rels_soup.find_all(
-                    "Relationship",
-                    attrs={"TargetMode": "External"}
-                ) or []
-
-                rels_map = {
-                    relationship.attrs["Id"]: relationship.attrs["Target"]
-                    for relationship in relationships
-                }
-                for hyperlink in sheet_soup.find_all("hyperlink"):
-                    r_id = hyperlink["r:id"] if hyperlink.has_attr("r:id") else None
-                    if r_id and r_id in rels_map:
-                        hyperlink_map[hyperlink.attrs["ref"]] = r_id
+            hyperlink_map = self._get_hyperlink_map(sheet_soup, sheet_rels_soup)
 
             for sheet_text_cell in sheet_text_cells:
                 txid = sheet_text_cell.attrs.get("txid")
-                replace_string_to = None
-
-                if txid:
-                    replace_string_to = sheet_text_cell
-
-                if all([
-                    not txid,
-                    sheet_text_cell.has_attr("t"),
-                    sheet_text_cell.attrs["t"] == 's',
-                ]):
-                    shared_string_index = int(sheet_text_cell.v.text)
-                    shared_string_element = shared_strings[shared_string_index]
-                    if shared_string_element.has_attr("txid"):
-                        txid = shared_string_element.attrs["txid"]
-                        replace_string_to = shared_string_element
-
-                if not replace_string_to:
+                if not txid:
                     continue
 
                 open_string = stringset.get(txid)
@@ -484,82 +632,143 @@ class XlsxUnstructuredHandler(Handler, OfficeOpenXmlHandler):
                 if not open_string:
                     continue
 
-                cell_ref = sheet_text_cell.attrs["r"]
-
-                translation_string = open_string.string
-                escaped_translation_string = self._escape_xml(translation_string)
-
-                """
-                some examples of transifex translations would be
-                - part1
-                - <tx>part1</tx><tx>part2</tx>
-                - <tx href='app.transifex.com'><tx>part1</tx><tx>part2</tx></tx>
-                """
-                translation_soup = BeautifulSoup(
-                    u'<wrapper>{}</wrapper>'.format(escaped_translation_string), 'xml',
+                self._compile_cell(
+                    sheet_text_cell, open_string, sheet_rels_soup,
+                    hyperlink_map,
                 )
-                translation_hyperlink = translation_soup.find(
-                    lambda tag: tag.has_attr("href")
-                )
-                translation_parts = translation_soup.find_all(text=True)
+            xlsx.set_sheet_content(sheet, sheet_soup)
+            if xlsx.has_rels(sheet):
+                xlsx.set_sheet_rels_content(sheet, sheet_rels_soup)
 
-                target_url = None
-                if translation_hyperlink:
-                    target_url = translation_hyperlink.attrs["href"]
+        result = xlsx.compress()
+        xlsx.delete()
+        return result
 
-                cell_hyper_link_id = hyperlink_map.get(cell_ref)
-                if target_url and cell_hyper_link_id:
-                    rel = sheet_rels_soup.find(
-                        "Relationship",
-                        attrs={"Id": cell_hyper_link_id, "TargetMode": "External"}
-                    )
-                    rel.attrs["Target"] = target_url
+    def _load_skeleton(self, template):
+        """
+        Cells that carry a `txid` become slots of their sheet's skeleton and
+        shared strings that carry a `txid` become slots of the shared strings'
+        skeleton.
+        """
+        xlsx = XlsxFile(template)
+        formatter = UnsortedAttributes()
 
-                if all([
-                    sheet_text_cell.has_attr("t"),
-                    sheet_text_cell.attrs["t"] == "str",
-                    sheet_text_cell.f,
-                ]):
-                    link_content = sheet_text_cell.f.text
-                    match = re.search(r'HYPERLINK\("(.*?)","(.*?)"\)', link_content)
-                    link, text = match.groups() if match else (None, None)
-                    if link and text:
-                        translation = "".join(translation_parts)
-                        if target_url:
-                            sheet_text_cell.f.string = (
-                                f'HYPERLINK("{target_url}","{translation}")'
-                            )
-                        else:
-                            sheet_text_cell.f.string = (
-                                f'HYPERLINK("{link}","{translation}")'
-                            )
+        workbook_soup = BeautifulSoup(xlsx.get_workbook_content(), "xml")
+        workbook_txids = {
+            sheet.attrs["txid"]
+            for sheet in workbook_soup.find_all("sheet", attrs={"txid": True})
+        }
 
-                else:
-                    t_strings = replace_string_to.find_all("t")
-                    t_strings_len = len(t_strings)
+        shared_strings_soup = BeautifulSoup(
+            xlsx.get_shared_strings_content(), "xml"
+        )
+        shared_strings = TemplateSkeleton(
+            shared_strings_soup,
+            shared_strings_soup.find_all("si", attrs={"txid": True}),
+            formatter=formatter,
+        )
 
-                    translation_parts_cleaned = self._prepare_string(
-                        translation_parts, t_strings_len
-                    )
+        sheets = []
+        for sheet in xlsx.get_sheets():
+            sheet_content = xlsx.get_sheet_content(sheet)
+            sheet_soup = BeautifulSoup(sheet_content, "xml")
+            sheet_rels_soup = None
+            if xlsx.has_rels(sheet):
+                sheet_rels_soup = BeautifulSoup(
+                    xlsx.get_sheet_rels_content(sheet), "xml"
+                )
+            hyperlink_map = self._get_hyperlink_map(sheet_soup, sheet_rels_soup)
 
-                    for t_string in t_strings:
-                        translation = (
-                            translation_parts_cleaned.pop(0)
-                            if translation_parts_cleaned
-                            else None
-                        )
-
-                        if not translation:
-                            t_string.string = ""
-                            continue
-                        t_string.string = translation
-                replace_string_to.attrs.pop("txid", None)
-            xlsx.set_sheet_content(sheet, sheet_soup)
-            xlsx.set_shared_strings_content(shared_strings_soup)
+            cells = [
+                sheet_text_cell
+                for sheet_text_cell in sheet_soup.find_all(
+                    "c",
+                    attrs={"t": ["s", "inlineStr", "str"]}
+                )
+                if sheet_text_cell.attrs.get("txid")
+            ]
+            sheets.append((
+                sheet,
+                sheet_content,
+                TemplateSkeleton(sheet_soup, cells, formatter=formatter),
+                sheet_rels_soup,
+                hyperlink_map,
+            ))
+
+        paths = [xlsx.get_workbook_path(), xlsx.get_shared_strings_path()]
+        for sheet in xlsx.get_sheets():
+            paths.append(xlsx.get_sheet(sheet)["path"])
             if xlsx.has_rels(sheet):
-                xlsx.set_sheet_rels_content(sheet, sheet_rels_soup)
+                paths.append(xlsx.get_sheet(sheet)["rels_path"])
+        pristine = PristineParts(paths)
 
-        result = xlsx.compress()
-        xlsx.delete()
-        return result
+        return xlsx, (
+            workbook_soup, workbook_txids, shared_strings, sheets, pristine
+        )
+
+    def _compile_skeleton(self, xlsx, skeleton, stringset, is_rtl=False):
+        (workbook_soup, workbook_txids, shared_strings, sheets,
+         pristine) = skeleton
+
+        if workbook_txids.isdisjoint(stringset):
+            pristine.restore(xlsx.get_workbook_path())
+        else:
+            workbook_soup = clone_soup(workbook_soup)
+            self._compile_workbook(workbook_soup, stringset)
+            xlsx.set_workbook_content(workbook_soup)
+
+        if shared_strings.translates_any(stringset):
+            rendered = {}
+            for index, slot in enumerate(shared_strings.slots):
+                if not shared_strings.translates(index, stringset):
+                    continue
+                shared_string = copy.copy(slot)
+                self._compile_shared_string(
+                    shared_string, stringset[shared_string.attrs["txid"]]
+                )
+                rendered[index] = shared_strings.render(shared_string)
+            xlsx.set_shared_strings_markup(shared_strings.join(rendered))
+        else:
+            pristine.restore(xlsx.get_shared_strings_path())
+
+        def set_sheet_orientation(sheet_soup):
+            sheet_view = sheet_soup.find("sheetView")
+            if sheet_view:
+                sheet_view.attrs["rightToLeft"] = is_rtl
+
+        for (sheet, sheet_content, document, sheet_rels_soup,
+             hyperlink_map) in sheets:
+            if not document.translates_any(stringset):
+                sheet_content = self._orient_sheet_content(
+                    sheet_content, is_rtl
+                )
+                if sheet_content is not None:
+                    xlsx.set_sheet_markup(sheet, sheet_content)
+                else:
+                    pristine.restore(xlsx.get_sheet(sheet)["path"])
+                if sheet_rels_soup is not None:
+                    pristine.restore(xlsx.get_sheet(sheet)["rels_path"])
+                continue
+
+            if sheet_rels_soup is not None:
+                sheet_rels_soup = clone_soup(sheet_rels_soup)
+
+            rendered = {}
+            for index, slot in enumerate(document.slots):
+                if not document.translates(index, stringset):
+                    continue
+                sheet_text_cell = copy.copy(slot)
+                self._compile_cell(
+                    sheet_text_cell,
+                    stringset[sheet_text_cell.attrs["txid"]],
+                    sheet_rels_soup, hyperlink_map,
+                )
+                rendered[index] = document.render(sheet_text_cell)
+
+            xlsx.set_sheet_markup(sheet, document.join(
+                rendered, variant=is_rtl, prepare=set_sheet_orientation
+            ))
+            if sheet_rels_soup is not None:
+                xlsx.set_sheet_rels_content(sheet, sheet_rels_soup)
 
+        return xlsx.compress()
@@ -2,15 +2,18 @@ from __future__ import absolute_import
 
 import re
 from collections import OrderedDict, namedtuple
+from operator import itemgetter
 
 import six
 import yaml
 from yaml.constructor import ConstructorError
+from yaml.emitter import Emitter
 
 from openformats.exceptions import ParseError
 from openformats.utils.compat import ensure_unicode
 
-from .constants import YAML_BINARY_ID, YAML_STRING_ID
+from .constants import (YAML_BINARY_ID, YAML_DICT_ID, YAML_LIST_ID,
+                        YAML_STRING_ID)
 from .yaml_representee_classes import (BlockList, BlockStyleOrderedDict,
                                        FlowList, FlowStyleOrderedDict,
                                        double_quoted_unicode, folded_unicode,
@@ -27,6 +30,11 @@ from .yaml_representers import (block_list_representer,
                                 single_quoted_unicode_representer,
                                 unicode_representer)
 
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
 yaml.add_representer(six.text_type, unicode_representer)
 yaml.add_representer(plain_unicode, unicode_representer)
 yaml.add_representer(six.binary_type, unicode_representer)
@@ -48,13 +56,24 @@ yaml.add_representer(FlowStyleOrderedDict,
 Node = namedtuple("Node", ['value', 'start', 'end', 'style', 'tag'])
 
 
-class TxYamlLoader(yaml.SafeLoader):
+class TxYamlLoaderMixin(object):
     """
-    Custom YAML Loader for Tx
+    Overrides of the composition and construction steps of a safe YAML
+    loader, shared by `TxYamlLoader` and `TxYamlCLoader`
     """
 
+    # All the unknown tags, like custom ones, are constructed as strings. The
+    # registry is a copy of SafeConstructor's, so PyYAML's global one is
+    # left untouched and loaders can be used from multiple threads
+    yaml_constructors = dict(
+        yaml.constructor.SafeConstructor.yaml_constructors
+    )
+    yaml_constructors[None] = (
+        yaml.constructor.SafeConstructor.construct_yaml_str
+    )
+
     def __init__(self, *args, **kwargs):
-        super(TxYamlLoader, self).__init__(*args, **kwargs)
+        super(TxYamlLoaderMixin, self).__init__(*args, **kwargs)
         self.stream = args[0]
         self.post_block_comment_pattern = re.compile(
             ensure_unicode(r'(?:#.*\r?\n\s*)+$')
@@ -71,7 +90,7 @@ class TxYamlLoader(yaml.SafeLoader):
             return yaml.nodes.ScalarNode(
                 YAML_STRING_ID, u'', event.start_mark, event.end_mark
             )
-        return super(TxYamlLoader, self).compose_node(parent, index)
+        return super(TxYamlLoaderMixin, self).compose_node(parent, index)
 
     def compose_mapping_node(self, anchor):
         """
@@ -81,7 +100,7 @@ class TxYamlLoader(yaml.SafeLoader):
         Copied for https://github.com/yaml/pyyaml/blob/master/lib/yaml/composer.py  # noqa
         """
         if anchor is None:
-            return super(TxYamlLoader, self).compose_mapping_node(anchor)
+            return super(TxYamlLoaderMixin, self).compose_mapping_node(anchor)
         else:
             start_event = self.get_event()
             tag = start_event.tag
@@ -119,9 +138,9 @@ class TxYamlLoader(yaml.SafeLoader):
             the anchor label
         """
         if anchor is None:
-            return super(TxYamlLoader, self).compose_scalar_node(anchor)
+            return super(TxYamlLoaderMixin, self).compose_scalar_node(anchor)
         else:
-            node = super(TxYamlLoader, self).compose_scalar_node(anchor)
+            node = super(TxYamlLoaderMixin, self).compose_scalar_node(anchor)
             if node.tag == u'tag:yaml.org,2002:null':
                 # 'key: &anchor' should be interpreted as 'key:', ie the value
                 # should be ignored
@@ -131,8 +150,13 @@ class TxYamlLoader(yaml.SafeLoader):
             ].split(' ', 1)[1]
             leading_spaces = len(anchor_value) - len(anchor_value.lstrip(' '))
 
-            node.start_mark.index = node.end_mark.index - len(anchor_value) \
-                + leading_spaces
+            # libyaml's marks are read-only, so the mark is replaced instead
+            start_mark = node.start_mark
+            node.start_mark = yaml.error.Mark(
+                start_mark.name,
+                node.end_mark.index - len(anchor_value) + leading_spaces,
+                start_mark.line, start_mark.column, None, None,
+            )
             return node
 
     def _is_custom_tag(self, tag):
@@ -316,6 +340,182 @@ class TxYamlLoader(yaml.SafeLoader):
         return end
 
 
+class TxYamlLoader(TxYamlLoaderMixin, yaml.SafeLoader):
+    """
+    Custom YAML Loader for Tx
+    """
+
+
+if getattr(yaml, '__with_libyaml__', False):
+    class CSafeComposingLoader(yaml.composer.Composer, yaml.cyaml.CParser,
+                               yaml.constructor.SafeConstructor,
+                               yaml.resolver.Resolver):
+        """
+        A safe loader that gets its events from libyaml, but composes the
+        nodes in Python like `yaml.SafeLoader` does, so that the overrides of
+        `TxYamlLoaderMixin` (and the marks of the nodes) apply.
+        """
+
+        def __init__(self, stream):
+            yaml.cyaml.CParser.__init__(self, stream)
+            yaml.composer.Composer.__init__(self)
+            yaml.constructor.SafeConstructor.__init__(self)
+            yaml.resolver.Resolver.__init__(self)
+
+        def compose_scalar_node(self, anchor):
+            node = yaml.composer.Composer.compose_scalar_node(self, anchor)
+            # libyaml reports plain scalars with an empty style, PyYAML with
+            # None
+            node.style = node.style or None
+            return node
+
+    class TxYamlCLoader(TxYamlLoaderMixin, CSafeComposingLoader):
+        """
+        Same as `TxYamlLoader`, but a lot faster since the content is scanned
+        and parsed by libyaml
+        """
+else:
+    # PyYAML was built without libyaml
+    TxYamlCLoader = None
+
+
+class StyledScalarWriter(object):
+    """
+    Formats strings as YAML scalars of a given style, using the methods of
+    `yaml.emitter.Emitter`.
+
+    A single emitter is reused for all the strings of a compilation. The
+    scalar analysis of each string and the formatted scalars are cached, so
+    identical translations are only analyzed and formatted once.
+    """
+
+    def __init__(self):
+        self.stream = StringIO()
+        self.emitter = Emitter(self.stream, allow_unicode=True)
+        # set best_width to `float(inf)` so that long strings are not broken
+        # into multiple lines
+        self.emitter.best_width = float('inf')
+        self._analyses = {}
+        self._scalars = {}
+
+    def write(self, string, style, indent):
+        """
+        Returns `string` formatted as a YAML scalar.
+
+        Args:
+            string: The text of the scalar
+            style: The YAML style of the scalar, one of '"', "'", '', '|'
+                and '>'. Strings of any other style are returned as they are
+            indent: The indentation of the scalar's key, in spaces
+
+        Returns:
+            The formatted scalar
+        """
+        cache_key = (string, style, indent)
+        try:
+            return self._scalars[cache_key]
+        except KeyError:
+            pass
+
+        # Reset the emitter to the state of a newly created one
+        emitter = self.emitter
+        emitter.indent = indent
+        emitter.column = 0
+        emitter.whitespace = True
+        emitter.indention = True
+        emitter.open_ended = False
+        self.stream.seek(0)
+        self.stream.truncate()
+
+        if style == '"':
+            emitter.write_double_quoted(string)
+        elif style == '\'':
+            if self._analyze(string).allow_single_quoted:
+                emitter.write_single_quoted(string)
+            else:
+                emitter.write_double_quoted(string)
+        elif style == '':
+            analysis = self._analyze(string)
+            if analysis.allow_block_plain and analysis.allow_flow_plain:
+                emitter.write_plain(string)
+            else:
+                emitter.write_double_quoted(string)
+        elif style == '|':
+            emitter.write_literal(string)
+        elif style == '>':
+            emitter.write_folded(string)
+
+        scalar = self.stream.getvalue() or string
+        if scalar.startswith(">-") and not scalar.endswith("\n"):
+            scalar += "\n"
+        self._scalars[cache_key] = scalar
+        return scalar
+
+    def _analyze(self, string):
+        try:
+            return self._analyses[string]
+        except KeyError:
+            analysis = self._analyses[string] = \
+                self.emitter.analyze_scalar(string)
+            return analysis
+
+
+class YamlKeyIndexNode(object):
+    """
+    A list or a dictionary node of the YAML content that `YamlGenerator`
+    writes. It keeps the keys and the positions of its children, but not
+    their values.
+    """
+
+    __slots__ = ('is_list', 'style', 'key', 'parent', 'children',
+                 'positions')
+
+    def __init__(self, is_list, style=None, key=None, parent=None):
+        self.is_list = is_list
+        self.style = style
+        self.key = key
+        self.parent = parent
+        # The child nodes, or None for scalars, by position
+        self.children = []
+        # The positions of the children by key, for dictionaries
+        self.positions = {}
+
+    def get_position(self, key=None):
+        """
+        Return the position of the child with the given key, adding it if
+        it does not exist. Without a key, e.g. in lists, a new child is
+        always added.
+        """
+        if key is not None:
+            try:
+                return self.positions[key]
+            except KeyError:
+                self.positions[key] = len(self.children)
+        self.children.append(None)
+        return len(self.children) - 1
+
+    def get_ancestors(self):
+        """ Return the nodes from the top level one to this one, without
+        the root """
+        ancestors = []
+        node = self
+        while node.parent is not None:
+            ancestors.append(node)
+            node = node.parent
+        ancestors.reverse()
+        return ancestors
+
+    def get_flow_style(self, dumper):
+        """ The flow style of the node, like the one of `BlockList`,
+        `FlowList`, `BlockStyleOrderedDict`, `FlowStyleOrderedDict` and
+        `OrderedDict` """
+        if self.style == 'block':
+            return False
+        elif self.style == 'flow':
+            return True
+        return dumper.default_flow_style
+
+
 class YamlGenerator(object):
     """
     Generate YAML content for a resource translation.
@@ -343,25 +543,184 @@ class YamlGenerator(object):
             An YAML serializable OrderedDict instance.
         """
         yaml_dict = OrderedDict()
+        for keys, styles, translation, tag in self._iter_entries(stringset):
+            self._insert_translation_in_dict(
+                yaml_dict, keys, styles, translation, tag=tag,
+            )
+        return yaml_dict
+
+    def write_yaml(self, stringset, stream, root_key=None, indent=None):
+        """
+        Write the YAML content to `stream` while it is being generated.
+
+        The output is the same as dumping the dictionary of
+        `generate_yaml_dict` with `TxYamlDumper` (wrapped in a dictionary
+        with `root_key` as its only key, if given), but neither that
+        dictionary nor the YAML nodes for it are built. Instead, the strings
+        are sorted in the order they would have in the dictionary and the
+        YAML events for them are emitted one by one.
+
+        Args:
+            stringset: The OpenString stringset of the resource
+            stream: A file-like object to write the YAML content to
+            root_key: The key to nest the content under, e.g. the language
+                code
+            indent: The number of spaces used for indentation
+        """
+        dumper = TxYamlDumper(stream, width=float('inf'), allow_unicode=True,
+                              indent=indent)
+        try:
+            dumper.open()
+            dumper.emit(yaml.DocumentStartEvent(
+                explicit=dumper.use_explicit_start,
+                version=dumper.use_version, tags=dumper.use_tags,
+            ))
+            if root_key:
+                self._emit_mapping_start(dumper, None)
+                self._emit_scalar(dumper, root_key)
+            self._emit_entries(dumper, self._sort_entries(stringset))
+            if root_key:
+                dumper.emit(yaml.MappingEndEvent())
+            dumper.emit(yaml.DocumentEndEvent(explicit=dumper.use_explicit_end))
+            dumper.close()
+        finally:
+            dumper.dispose()
+
+    def _iter_entries(self, stringset):
+        """
+        Yield a `(keys, styles, translation, tag)` tuple for each scalar of
+        the YAML content, where `keys` are the unescaped parts of the key.
+        Pluralized strings yield one tuple per plural rule.
+        """
         for se in stringset:
-            keys = se.key.split('.')
-            flags = se.flags.split(':')
-            keys = list(map(self.handler.unescape_dots, keys))
+            keys = list(map(self.handler.unescape_dots, se.key.split('.')))
+            styles = se.flags.split(':')
             if se.pluralized:
-                plural_rules = self.handler.get_plural_rules()
-                for rule in plural_rules:
-                    if rule != plural_rules[0]:
-                        keys.pop()
-                    keys.append(self.handler.get_rule_string(rule))
-                    self._insert_translation_in_dict(
-                        yaml_dict, keys, flags, se.string.get(rule), tag=None,
-                    )
+                for rule in self.handler.get_plural_rules():
+                    yield (keys + [self.handler.get_rule_string(rule)],
+                           styles, se.string.get(rule), None)
             else:
                 tag = '!' + se.context if se.context else se.context
-                self._insert_translation_in_dict(
-                    yaml_dict, keys, flags, se.string, tag=tag,
-                )
-        return yaml_dict
+                yield keys, styles, se.string, tag
+
+    def _sort_entries(self, stringset):
+        """
+        Yield the scalars of the YAML content in the order
+        `_insert_translation_in_dict` would place them in the dictionary.
+
+        Each scalar is a `(positions, parent, key, translation, style, tag)`
+        tuple, where `positions` are the indexes of the scalar and of its
+        parent nodes in their own parents, `parent` is the
+        `YamlKeyIndexNode` of the node that contains the scalar and `key` is
+        the key of the scalar, or None if its parent is a list.
+        """
+        root = YamlKeyIndexNode(is_list=False)
+        entries = []
+        for keys, styles, translation, tag in self._iter_entries(stringset):
+            node = root
+            if len(keys) == 1:
+                key = self._parse_int_key(keys[0])
+                entries.append(((node.get_position(key), ), node, key,
+                                translation, styles[-1], tag))
+                continue
+
+            positions = []
+            for i, key in enumerate(keys[:-1]):
+                next_key = keys[i + 1]
+                key = self._parse_int_key(key)
+                key, is_list = self._parse_list_index_key(key)
+                next_key, next_is_list = self._parse_list_index_key(next_key)
+                if is_list and key < len(node.children):
+                    position = key
+                else:
+                    position = node.get_position(None if is_list else key)
+                if node.children[position] is None:
+                    node.children[position] = YamlKeyIndexNode(
+                        is_list=next_is_list, style=styles[i],
+                        key=None if is_list else key, parent=node,
+                    )
+                node = node.children[position]
+                positions.append(position)
+
+            if next_is_list:
+                next_key = None
+            positions.append(node.get_position(next_key))
+            # Only top level strings keep their tags
+            entries.append((tuple(positions), node, next_key, translation,
+                            styles[-1], None))
+
+        # Sorting is stable, so for scalars with the same key the last one
+        # is kept, which is what assigning to the dictionary does
+        entries.sort(key=itemgetter(0))
+        for index, entry in enumerate(entries):
+            if (index + 1 == len(entries) or
+                    entry[0] != entries[index + 1][0]):
+                yield entry
+
+    def _emit_entries(self, dumper, entries):
+        """
+        Emit the YAML events for the scalars returned by `_sort_entries` and
+        their parent nodes.
+        """
+        self._emit_mapping_start(dumper, None)
+        open_nodes = []
+        last_parent = None
+        for _, parent, key, translation, style, tag in entries:
+            if parent is not last_parent:
+                parents = parent.get_ancestors()
+                common = 0
+                for open_node, node in zip(open_nodes, parents):
+                    if open_node is not node:
+                        break
+                    common += 1
+                for open_node in reversed(open_nodes[common:]):
+                    self._emit_end(dumper, open_node)
+                for node in parents[common:]:
+                    if node.key is not None:
+                        self._emit_scalar(dumper, node.key)
+                    if node.is_list:
+                        dumper.emit(yaml.SequenceStartEvent(
+                            None, YAML_LIST_ID, True,
+                            flow_style=node.get_flow_style(dumper),
+                        ))
+                    else:
+                        self._emit_mapping_start(dumper, node)
+                open_nodes = parents
+                last_parent = parent
+
+            if key is not None:
+                self._emit_scalar(dumper, key)
+            self._emit_scalar(dumper, self._get_styled_string(translation,
+                                                              style, tag=tag))
+
+        for open_node in reversed(open_nodes):
+            self._emit_end(dumper, open_node)
+        dumper.emit(yaml.MappingEndEvent())
+
+    def _emit_end(self, dumper, node):
+        if node.is_list:
+            dumper.emit(yaml.SequenceEndEvent())
+        else:
+            dumper.emit(yaml.MappingEndEvent())
+
+    def _emit_mapping_start(self, dumper, node):
+        flow_style = (dumper.default_flow_style if node is None
+                      else node.get_flow_style(dumper))
+        dumper.emit(yaml.MappingStartEvent(None, YAML_DICT_ID, True,
+                                           flow_style=flow_style))
+
+    def _emit_scalar(self, dumper, data):
+        """ Emit the YAML event for a key or a (styled) translation, the
+        same way `yaml.serializer.Serializer` does """
+        node = dumper.represent_data(data)
+        implicit = (
+            node.tag == dumper.resolve(yaml.ScalarNode, node.value,
+                                       (True, False)),
+            node.tag == dumper.resolve(yaml.ScalarNode, node.value,
+                                       (False, True)),
+        )
+        dumper.emit(yaml.ScalarEvent(None, node.tag, implicit, node.value,
+                                     style=node.style))
 
     def _get_styled_string(self, translation_string, style, tag=None):
         """
@@ -4,11 +4,10 @@ import copy
 import re
 
 import six
-from yaml.constructor import SafeConstructor
-from yaml.emitter import Emitter
 
 from openformats.exceptions import ParseError
-from openformats.formats.yaml.utils import (TxYamlDumper, TxYamlLoader,
+from openformats.formats.yaml.utils import (StyledScalarWriter, TxYamlCLoader,
+                                            TxYamlDumper, TxYamlLoader,
                                             YamlGenerator, yaml)
 from openformats.handlers import Handler
 from openformats.strings import OpenString
@@ -47,9 +46,10 @@ class YamlHandler(Handler):
         """ Parses the given YAML content to create stringset and template
 
         Steps are:
-            1. Load yaml content using our custom loader TxYamlLoader that
-               in addition to the value for each key notes the `start` and
-               `end` index of each node in the file and some metadata.
+            1. Load yaml content using our custom loader TxYamlLoader (or
+               TxYamlCLoader, its libyaml based equivalent) that in addition
+               to the value for each key notes the `start` and `end` index of
+               each node in the file and some metadata.
             2. Flattens the output of the loader to be a list of the form:
                ```
                [{
@@ -69,14 +69,7 @@ class YamlHandler(Handler):
         """
         template = []
         stringset = []
-        # The first argument of the add_constructor method is the tag you want
-        # to handle. If you provide None as an argument, all the unknown tags
-        # will be handled by the constructor specified in the second argument.
-        # We need this in order parse all unknown custom-tagged values as
-        # strings.
-        SafeConstructor.add_constructor(None,
-                                        SafeConstructor.construct_yaml_str)
-        yaml_data = self._load_yaml(content, loader=TxYamlLoader)
+        yaml_data = self._load_yaml(content, loader=self._get_loader(content))
         yaml_data = self._get_yaml_data_to_parse(yaml_data)
         # Helper to store the processed data while parsing the file
         self._parsed_data = []
@@ -130,11 +123,31 @@ class YamlHandler(Handler):
         else:
             return self._compile_without_template(stringset)
 
+    def _get_loader(self, content):
+        """
+        Returns the loader to parse the content with: the libyaml based
+        TxYamlCLoader if PyYAML was built with libyaml, TxYamlLoader
+        otherwise.
+
+        libyaml accepts tabs in places where PyYAML does not, so content with
+        tabs is always loaded with TxYamlLoader. The marks of libyaml do not
+        count a leading byte order mark, so content that starts with one is
+        loaded with TxYamlLoader too.
+        """
+        if (TxYamlCLoader is None or u'\t' in content or
+                content.startswith(u'\ufeff')):
+            return TxYamlLoader
+        return TxYamlCLoader
+
     def _load_yaml(self, content, loader):
         """
         Loads a YAML stream and returns a dictionary
         representation for YAML data
 
+        If TxYamlCLoader fails, the content is loaded again with
+        TxYamlLoader, so that invalid content raises the same errors whether
+        libyaml is available or not.
+
         Args:
             content: A string, YAML content
             loader: YAML Loader class or None
@@ -142,6 +155,11 @@ class YamlHandler(Handler):
         Returns:
             A dictionary
         """
+        if loader is not None and loader is TxYamlCLoader:
+            try:
+                return yaml.load(content, Loader=loader)
+            except Exception:
+                loader = TxYamlLoader
         try:
             return yaml.load(content, Loader=loader)
         except yaml.scanner.ScannerError as e:
@@ -296,28 +314,30 @@ class YamlHandler(Handler):
 
     def _find_comment(self, content, start, end):
         """ Finds comment lines that precede a part of the YAML structure """
-        lines = [
-            line.strip()
-            for line in content[start:end].split('\n')
-            if line.strip() != ""
-        ]
-        lines.reverse()
-
-        # remove non-comment line just before the string to be translated
-        if lines and not lines[0].startswith('#'):
-            del lines[0]
+        # Comment lines contain a `#`, so there is nothing to split when the
+        # part has none, and the lines before the first one can be skipped
+        hash_position = content.find('#', start, end)
+        if hash_position == -1:
+            return ''
+        line_start = content.rfind('\n', start, hash_position)
+        if line_start != -1:
+            start = line_start + 1
 
         returned_lines = []
-        for line in lines:
-            if not line.startswith('#'):
-                break
-            returned_lines.append(line[1:].strip())
-
-        if returned_lines:
-            returned_lines.reverse()
-            return " ".join(returned_lines)
-        else:
-            return ''
+        # skip non-comment line just before the string to be translated
+        skip_line = True
+        for line in reversed(content[start:end].split('\n')):
+            line = line.strip()
+            if line.startswith('#'):
+                returned_lines.append(line[1:].strip())
+                skip_line = False
+            elif line:
+                if not skip_line:
+                    break
+                skip_line = False
+
+        returned_lines.reverse()
+        return " ".join(returned_lines)
 
     def _get_yaml_data_to_parse(self, yaml_data):
         """ Returns the part of the yaml_data that actually need to be parsed
@@ -331,7 +351,7 @@ class YamlHandler(Handler):
         """
         return yaml_data
 
-    def _write_styled_literal(self, string):
+    def _write_styled_literal(self, string, writer=None):
         """ Produce a properly formatted YAML string
 
         Properly format translation string based on string's style
@@ -339,6 +359,8 @@ class YamlHandler(Handler):
 
         Args:
             string: An OpenString instance
+            writer: A StyledScalarWriter to reuse, so that its emitter and
+                cache are shared between the strings of a compilation
 
         Returns:
             The formatted string.
@@ -346,40 +368,12 @@ class YamlHandler(Handler):
         if string.flags is None:
             return string.string
 
-        stream = StringIO()
-        emitter = Emitter(stream, allow_unicode=True)
-        indent = self.indent * (len(string.key.split('.')) + self.extra_indent)
-        emitter.indent = indent
-        # set best_width to `float(inf)` so that long strings are not broken
-        # into multiple lines
-        emitter.best_width = float('inf')
-
-        analysis = emitter.analyze_scalar(string.string)
-
-        style = string.flags.split(':')[-1]
-
-        if style == '"':
-            emitter.write_double_quoted(string.string)
-        elif style == '\'':
-            if analysis.allow_single_quoted:
-                emitter.write_single_quoted(string.string)
-            else:
-                emitter.write_double_quoted(string.string)
-        elif style == '':
-            if analysis.allow_block_plain and analysis.allow_flow_plain:
-                emitter.write_plain(string.string)
-            else:
-                emitter.write_double_quoted(string.string)
-        elif style == '|':
-            emitter.write_literal(string.string)
-        elif style == '>':
-            emitter.write_folded(string.string)
-
-        translation = emitter.stream.getvalue() or string.string
-        if translation.startswith(">-") and not translation.endswith("\n"):
-            translation += "\n"
-        emitter.stream.close()
-        return translation
+        if writer is None:
+            writer = StyledScalarWriter()
+        indent = self.indent * (string.key.count('.') + 1 +
+                                self.extra_indent)
+        style = string.flags.rpartition(':')[2]
+        return writer.write(string.string, style, indent)
 
     def _compile_from_template(self, template, stringset, **kwargs):
         """ Compiles translation file from template
@@ -392,13 +386,21 @@ class YamlHandler(Handler):
         """
         transcriber = Transcriber(template)
         template = transcriber.source
+        writer = StyledScalarWriter()
 
         for string in stringset:
             if string.pluralized:
                 translation = self._compile_pluralized(string)
             else:
-                translation = self._write_styled_literal(string)
-            hash_position = template.index(string.template_replacement)
+                translation = self._write_styled_literal(string, writer)
+            template_replacement = string.template_replacement
+            # The strings are normally in the order of the template, so the
+            # search continues from where the previous replacement ended and
+            # the template is scanned only once
+            hash_position = template.find(template_replacement,
+                                          transcriber.ptr)
+            if hash_position == -1:
+                hash_position = template.index(template_replacement)
             transcriber.copy_until(hash_position)
             # The context contains custom tags. If it exists, we must prepend
             # it and apply a space afterwards so it doesn't get merged with the
@@ -408,7 +410,7 @@ class YamlHandler(Handler):
                 transcriber.add('!' + string.context)
                 transcriber.add(' ')
             transcriber.add(translation)
-            transcriber.skip(len(string.template_replacement))
+            transcriber.skip(len(template_replacement))
 
         transcriber.copy_until(len(template))
         compiled = transcriber.get_destination()
@@ -416,16 +418,32 @@ class YamlHandler(Handler):
         return compiled
 
     def _compile_without_template(self, stringset):
-        yg = YamlGenerator(self)
-        yaml_dict = yg.generate_yaml_dict(stringset)
-        if self.language_code:
-            yaml_dict = self._wrap_yaml_dict(yaml_dict, self.language_code)
-        return_value = yaml.dump(yaml_dict, width=float('inf'),
-                                 Dumper=TxYamlDumper, allow_unicode=True,
-                                 indent=self.indent)
-        if isinstance(return_value, six.binary_type):
-            return_value = return_value.decode("utf-8")
-        return return_value
+        stream = StringIO()
+        self._write_without_template(stringset, stream)
+        return stream.getvalue()
+
+    def _write_without_template(self, stringset, stream):
+        """ Writes the YAML content for the stringset to `stream`, without
+        holding the whole structure in memory.
+
+        The content is nested under the language code, like
+        `_wrap_yaml_dict` does.
+        """
+        YamlGenerator(self).write_yaml(stringset, stream,
+                                       root_key=self.language_code,
+                                       indent=self.indent)
+
+    def compile_to(self, template, stringset, output):
+        """
+        Write the compiled file to the file-like `output`. Without a
+        template, it is written while it is being generated instead of being
+        built in memory first.
+        """
+        self.indent = self._get_indent(template)
+        if self.should_use_template:
+            output.write(self._compile_from_template(template, stringset))
+        else:
+            self._write_without_template(stringset, output)
 
     @staticmethod
     def unescape_dots(k):
@@ -152,7 +152,7 @@ class I18nYamlHandler(YamlHandler):
 
         # Calculate the indentation we need to prepend to each line of the
         # plural rules
-        indentation_levels = len(string.key.split('.')) + self.extra_indent
+        indentation_levels = string.key.count('.') + 1 + self.extra_indent
         indent = " " * indentation_levels * self.indent
         plural_entry = self._indent_plurals(plurals, indent, flow='flow' in string.flags)
 
@@ -199,6 +199,47 @@ class ArbTestCase(CommonFormatTestMixin, unittest.TestCase):
         self._test_parse_error('{"a": "hello", "a": "world"}',
                                "Duplicate string key ('a') in line 1")
 
+    def test_duplicate_metadata_type(self):
+        self._test_parse_error(
+            '{"a": "hello",\n"@a": {"type": "int",\n"type": "int"}}',
+            "Duplicate string key ('@a.type') in line 3"
+        )
+
+    def test_metadata(self):
+        template, stringset = self.handler.parse(
+            '{"@a": {"context": "ctx_a", "description": "desc_a"},'
+            ' "a": "hello", "b": "world",'
+            ' "@b": {"description": "desc_b", "context": "ctx_b"},'
+            ' "c": "!"}'
+        )
+        self.assertEqual(
+            [(string.key, string.context, string.developer_comment)
+             for string in stringset],
+            [("a", "ctx_a", "desc_a"), ("b", "ctx_b", "desc_b"),
+             ("c", "", "")]
+        )
+        self.assertEqual([string.order for string in stringset], [0, 1, 2])
+        self.assertEqual(self.handler.compile(template, stringset),
+                         '{"@a": {"context": "ctx_a", "description": "desc_a"},'
+                         ' "a": "hello", "b": "world",'
+                         ' "@b": {"description": "desc_b", "context": "ctx_b"},'
+                         ' "c": "!"}')
+
+    def test_non_text_type_skipped(self):
+        _, stringset = self.handler.parse(
+            '{"a": "hello", "@a": {"type": "int"},'
+            ' "b": "world", "@b": {"type": "text"},'
+            ' "@c": {"placeholders": {"type": "int"}}, "c": "!"}'
+        )
+        self.assertEqual([string.key for string in stringset], ["b", "c"])
+
+    def test_lists_ignored(self):
+        _, stringset = self.handler.parse(
+            '{"a": "hello", "b": [1, 2], "@a": {"context": "c", "l": [3]}}'
+        )
+        self.assertEqual([(string.key, string.context)
+                          for string in stringset], [("a", "c")])
+
     def test_display_json_errors(self):
         self._test_parse_error('["]',
                                "Unterminated string starting at: line 1 "
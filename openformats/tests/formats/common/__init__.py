@@ -1,5 +1,8 @@
+import asyncio
 import fnmatch
+import re
 import six
+from concurrent.futures import ThreadPoolExecutor
 from io import open
 
 from os import listdir, path
@@ -99,3 +102,106 @@ class CommonFormatTestMixin(object):
         else:
             raise AssertionError("Did not raise '{}'".format(error_msg))
         self.assertEqual(exception, error_msg)
+
+
+class ConcurrentParseTestMixin(object):
+    """
+    Test that a format parses documents in many threads at once with the
+    same result as one by one.
+
+    The class that inherits from this must define the following:
+
+    * ``HANDLER_CLASS``, eg: PlaintextHandler
+    * ``TESTFILE``, eg: `openformats/tests/formats/plaintext/files/1_en.txt`
+    """
+
+    HANDLER_CLASS = None
+    TESTFILE = None
+    DOCUMENTS = 100
+    WORKERS = 16
+
+    def setUp(self):
+        with open(self.TESTFILE, "r", encoding='utf-8') as myfile:
+            source = myfile.read()
+        # Documents with different strings, so that a parse that picks up
+        # state of another one gives a different result
+        self.sources = [
+            re.sub(r'\b([a-z]{5,})\b', r'\g<1>{}'.format(index), source)
+            for index in range(self.DOCUMENTS)
+        ]
+        self.expected = [self._parse(content) for content in self.sources]
+        super(ConcurrentParseTestMixin, self).setUp()
+
+    def _parse(self, content):
+        template, stringset = self.HANDLER_CLASS().parse(content)
+        return template, [(string.key, string.string, string.order)
+                          for string in stringset]
+
+    def test_parse_in_threads(self):
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as executor:
+            results = list(executor.map(self._parse, self.sources))
+
+        self.assertEqual(results, self.expected)
+
+    def test_parse_in_asyncio_executor(self):
+        async def parse_all(executor):
+            loop = asyncio.get_running_loop()
+            return await asyncio.gather(*[
+                loop.run_in_executor(executor, self._parse, content)
+                for content in self.sources
+            ])
+
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as executor:
+            results = asyncio.run(parse_all(executor))
+
+        self.assertEqual(results, self.expected)
+
+
+class MarkdownTestMixin(object):
+    """
+    Test how the markdown formats find the strings of the lexer in the
+    content.
+
+    The class that inherits from this must also inherit from
+    CommonFormatTestMixin, for ``self.handler``.
+    """
+
+    def test_parse_repeated_code_block_with_different_indentation(self):
+        content = (
+            "Paragraph\n\n"
+            "      indented code\n      more code\n\n"
+            "Another paragraph\n\n"
+            "    indented code\n    more code\n"
+        )
+        template, stringset = self.handler.parse(content)
+
+        self.assertEqual([string.string for string in stringset], [
+            "Paragraph",
+            "      indented code\n      more code",
+            "Another paragraph",
+            "    indented code\n    more code",
+        ])
+        self.assertEqual(template, "{}\n\n{}\n\n{}\n\n{}\n".format(
+            *[string.template_replacement for string in stringset]
+        ))
+
+    def test_parse_string_missing_from_its_list_item(self):
+        # The fenced code of the list item is outdented by the lexer, so it
+        # is not in the item. It is looked up only up to the end of the
+        # item, not in the same code further down the content
+        content = (
+            "- Step\n\n"
+            "    ```\n    run\n    ```\n\n"
+            "Paragraph\n\n"
+            "  ```\n  run\n  ```\n"
+        )
+        template, stringset = self.handler.parse(content)
+
+        self.assertEqual([string.string for string in stringset],
+                         ["Step", "Paragraph", "  ```\n  run\n  ```"])
+        self.assertEqual(
+            template,
+            "- {}\n\n    ```\n    run\n    ```\n\n{}\n\n{}\n".format(
+                *[string.template_replacement for string in stringset]
+            ),
+        )
@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
+import io
 import unittest
+from zipfile import ZipFile
 
 from bs4 import BeautifulSoup
 
@@ -985,3 +987,40 @@ class DocxTestCase(unittest.TestCase):
                 "Each table should contain exactly one <w:bidiVisual/>"
                 "under <w:tblPr> when is_rtl=True"
             )
+
+    def test_compile_many(self):
+        content = self.get_content('complex.docx')
+        template, stringset = self.handler.parse(content)
+
+        stringsets = {
+            'el': [
+                OpenString(s.key, u'<tx>Ελ & </tx>' + s.string, order=i)
+                for i, s in enumerate(stringset)
+            ],
+            'ar': [
+                OpenString(s.key, s.string[::-1], order=i)
+                for i, s in enumerate(stringset[::2])
+            ],
+            'fr': [],
+        }
+        is_rtl = {'ar': True}
+
+        compiled = self.handler.compile_many(
+            template, stringsets, is_rtl=is_rtl
+        )
+
+        self.assertEqual(set(compiled), {'el', 'ar', 'fr'})
+        for language, language_stringset in stringsets.items():
+            expected = self.handler.compile(
+                template, language_stringset,
+                is_rtl=is_rtl.get(language, False),
+            )
+            with ZipFile(io.BytesIO(expected)) as expected_zip, \
+                    ZipFile(io.BytesIO(compiled[language])) as compiled_zip:
+                self.assertEqual(
+                    compiled_zip.namelist(), expected_zip.namelist()
+                )
+                for name in expected_zip.namelist():
+                    self.assertEqual(
+                        compiled_zip.read(name), expected_zip.read(name)
+                    )
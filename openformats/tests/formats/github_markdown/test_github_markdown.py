@@ -1,10 +1,17 @@
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
 
-from openformats.tests.formats.common import CommonFormatTestMixin
-from openformats.formats.github_markdown import GithubMarkdownHandler
+from openformats.tests.formats.common import (CommonFormatTestMixin,
+                                              ConcurrentParseTestMixin,
+                                              MarkdownTestMixin)
+from openformats.formats.github_markdown import (CodeBlockIndex,
+                                                 GithubMarkdownHandler,
+                                                 TxBlockLexer, get_block_ends)
 
 
-class GithubMarkdownTestCase(CommonFormatTestMixin, unittest.TestCase):
+class GithubMarkdownTestCase(CommonFormatTestMixin, MarkdownTestMixin,
+                             unittest.TestCase):
     HANDLER_CLASS = GithubMarkdownHandler
     TESTFILE_BASE = "openformats/tests/formats/github_markdown/files"
 
@@ -14,3 +21,81 @@ class GithubMarkdownTestCase(CommonFormatTestMixin, unittest.TestCase):
         content_with_tab = self.handler.parse(content=u"# foo	bar")
         content_with_spaces = self.handler.parse(content=u"# foo    bar")
         self.assertEqual(content_with_tab[0], content_with_spaces[0])
+
+    def test_code_block_index(self):
+        template = (
+            "      code\n"
+            "code\n"
+            "\n"
+            "    code\n"
+            "        code\n"
+        )
+        code_blocks = CodeBlockIndex(template)
+
+        # Lines are looked up after the newline at or after the position
+        self.assertEqual(code_blocks.find_indentation("    code"), "")
+        self.assertEqual(code_blocks.find_indentation("    code", 20),
+                         "    ")
+        # Nothing after the position, so the first line is used
+        self.assertEqual(code_blocks.find_indentation("    code", 40), "  ")
+        self.assertEqual(code_blocks.find_indentation("      code", 1),
+                         "  ")
+        self.assertIsNone(code_blocks.find_indentation("    other"))
+
+    def test_lexer_state_is_per_instance(self):
+        block = TxBlockLexer()
+        block("# Title\n\nParagraph")
+
+        self.assertEqual(block.md_stringset,
+                         [("# Title\n\n", "heading"),
+                          ("Paragraph", "paragraph")])
+        self.assertEqual(TxBlockLexer().md_stringset, [])
+
+    def test_lexers_in_threads(self):
+        # Lexers that are not reset before lexing, all lexing at once
+        lexers = [TxBlockLexer() for _ in range(16)]
+        barrier = Barrier(len(lexers))
+
+        def lex(index):
+            barrier.wait()
+            lexers[index]("# Title {0}\n\nParagraph {0}".format(index))
+
+        with ThreadPoolExecutor(max_workers=len(lexers)) as executor:
+            list(executor.map(lex, range(len(lexers))))
+
+        for index, block in enumerate(lexers):
+            self.assertEqual(
+                block.md_stringset,
+                [("# Title {}\n\n".format(index), "heading"),
+                 ("Paragraph {}".format(index), "paragraph")],
+            )
+
+    def test_lexer_spans_of_list_nested_fenced_code(self):
+        block = TxBlockLexer()
+        block("- Step\n\n    ```\n    run\n    ```\n\nParagraph")
+
+        # The outdented fenced code can only end where its item ends
+        self.assertEqual(block.md_stringset,
+                         [("Step", "text"), ("\n\n", "newline"),
+                          ("  ```\n  run\n  ```", "fences"),
+                          ("Paragraph", "paragraph")])
+        self.assertEqual(block.md_spans,
+                         [(0, 33), (0, 33), (0, 33), (33, 42)])
+        self.assertEqual(get_block_ends(block.md_spans, 10, 2),
+                         [45, 45, 45, 54])
+
+    def test_lexer_spans(self):
+        block = TxBlockLexer()
+        block("- one\n- two\n\nParagraph")
+
+        # The items of a top level list have their own spans
+        self.assertEqual(block.md_stringset,
+                         [("one", "text"), ("two", "text"),
+                          ("Paragraph", "paragraph")])
+        self.assertEqual(block.md_spans, [(0, 5), (6, 13), (13, 22)])
+
+
+class GithubMarkdownConcurrencyTestCase(ConcurrentParseTestMixin,
+                                        unittest.TestCase):
+    HANDLER_CLASS = GithubMarkdownHandler
+    TESTFILE = "openformats/tests/formats/github_markdown/files/1_en.md"
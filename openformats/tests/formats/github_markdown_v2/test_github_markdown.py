@@ -7,12 +7,15 @@ import six
 
 from openformats.formats.github_markdown_v2 import GithubMarkdownHandlerV2
 from openformats.strings import OpenString
-from openformats.tests.formats.common import CommonFormatTestMixin
+from openformats.tests.formats.common import (CommonFormatTestMixin,
+                                              ConcurrentParseTestMixin,
+                                              MarkdownTestMixin)
 
 unittest.TestCase.maxDiff = None
 
 
-class GithubMarkdownV2TestCase(CommonFormatTestMixin, unittest.TestCase):
+class GithubMarkdownV2TestCase(CommonFormatTestMixin, MarkdownTestMixin,
+                               unittest.TestCase):
     """Tests the basic functionality of GithubMarkdownHandlerV2."""
     HANDLER_CLASS = GithubMarkdownHandlerV2
     TESTFILE_BASE = "openformats/tests/formats/github_markdown_v2/files"
@@ -28,6 +31,21 @@ class GithubMarkdownV2TestCase(CommonFormatTestMixin, unittest.TestCase):
         remade_orig_content = self.handler.compile(self.tmpl, self.strset)
         self.assertEqual(remade_orig_content, self.data["1_en_export"])
 
+    def test_compile_stringset_in_any_order(self):
+        remade_orig_content = self.handler.compile(
+            self.tmpl, list(reversed(self.strset))
+        )
+        self.assertEqual(remade_orig_content, self.data["1_en_export"])
+
+    def test_compile_keeps_hashes_of_missing_strings(self):
+        stringset = [string for string in self.strset
+                     if string.order % 2 == 0]
+        compiled = self.handler.compile(self.tmpl, stringset)
+
+        for string in self.strset:
+            self.assertEqual(string.template_replacement in compiled,
+                             string.order % 2 == 1)
+
     def test_parse(self):
         """Test parse converts tabs to spaces"""
         content_with_tab = self.handler.parse(content=u"# foo	bar")
@@ -171,6 +189,19 @@ Sample heading
     def test_empty_pattern_returns_none(self):
         assert self.handler.find_fuzzy_substring("", "anything at all") is None
 
+    def test_find_fuzzy_substring_from_position(self):
+        text = "Here is a string. Here is   a string."
+
+        assert self.handler.find_fuzzy_substring("Here is a string", text,
+                                                 1) == (18, 36)
+
+    def test_find_fuzzy_substring_up_to_end_position(self):
+        text = "Here is a string. Here is   a string."
+
+        assert self.handler.find_fuzzy_substring("Here is a string", text,
+                                                 1, 30) is None
+
+
 class GithubMarkdownV2CustomTestCase(unittest.TestCase):
     """Tests some additional functionality of GithubMarkdownHandlerV2.
 
@@ -332,3 +363,9 @@ class GithubMarkdownV2CustomTestCase(unittest.TestCase):
         )
         self.handler._unescape_non_printable(openstring)
         self.assertEqual(openstring.string, u'start\x85\x00\x09\xA9\\u0041end')
+
+
+class GithubMarkdownV2ConcurrencyTestCase(ConcurrentParseTestMixin,
+                                          unittest.TestCase):
+    HANDLER_CLASS = GithubMarkdownHandlerV2
+    TESTFILE = "openformats/tests/formats/github_markdown_v2/files/1_en.md"
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 import unittest
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from io import open
 
 from openformats.formats.indesign import InDesignHandler
@@ -10,6 +11,10 @@ class InDesignTestCase(unittest.TestCase):
     HANDLER_CLASS = InDesignHandler
     TESTFILE_BASE = "openformats/tests/formats/indesign/files"
 
+    @staticmethod
+    def index_stringset(stringset):
+        return {string.template_replacement: string for string in stringset}
+
     def test_parse_and_compile(self):
         """Test parsing to template and re-compiling to the initial file."""
 
@@ -27,6 +32,66 @@ class InDesignTestCase(unittest.TestCase):
                          [hash(string) for string in stringset2])
         self.assertEqual(template, template2)
 
+    def test_parse_and_compile_with_executor(self):
+        """Test that parallel parsing and compiling match the serial run."""
+
+        with open("%s/sample.idml" % self.TESTFILE_BASE, "rb") as _file:
+            _file_enc = _file.read()
+
+        template, stringset = self.HANDLER_CLASS().parse(_file_enc)
+        translations = [
+            OpenString(string.key, u"{} & <i>".format(string.string),
+                       order=string.order)
+            for string in stringset[::2]
+        ]
+        compiled = self.HANDLER_CLASS().compile(template, translations)
+
+        for executor_class in (ThreadPoolExecutor, ProcessPoolExecutor):
+            with executor_class(max_workers=2) as executor:
+                template2, stringset2 = self.HANDLER_CLASS().parse(
+                    _file_enc, executor=executor
+                )
+                compiled2 = self.HANDLER_CLASS().compile(
+                    template2, translations, executor=executor
+                )
+
+            self.assertEqual(template, template2)
+            self.assertEqual(
+                [(string.key, string.string, string.order)
+                 for string in stringset],
+                [(string.key, string.string, string.order)
+                 for string in stringset2],
+            )
+            self.assertEqual(compiled, compiled2)
+
+    def test_compile_sends_each_story_its_own_translations(self):
+        """Test that stories are sent to the executor with their strings."""
+
+        class RecordingExecutor(object):
+            def __init__(self):
+                self.calls = []
+
+            def map(self, function, *iterables):
+                self.calls.extend(zip(*iterables))
+                return map(function, *iterables)
+
+        with open("%s/sample.idml" % self.TESTFILE_BASE, "rb") as _file:
+            _file_enc = _file.read()
+
+        template, stringset = self.HANDLER_CLASS().parse(_file_enc)
+        executor = RecordingExecutor()
+        compiled = self.HANDLER_CLASS().compile(template, stringset,
+                                                executor=executor)
+
+        self.assertEqual(compiled,
+                         self.HANDLER_CLASS().compile(template, stringset))
+        sent_hashes = set()
+        for story_content, translations in executor.calls:
+            for string_hash in translations:
+                self.assertIn(string_hash, story_content)
+            sent_hashes.update(translations)
+        self.assertEqual(sent_hashes, set(self.index_stringset(stringset)))
+
     def test_extracts_raw(self):
         if self.HANDLER_CLASS.EXTRACTS_RAW:
             self.assertTrue(hasattr(self.HANDLER_CLASS, 'escape'))
@@ -58,6 +123,10 @@ class InDesignTestCase(unittest.TestCase):
             u'\ufeff  #',
             u'\ufef0  ()',
             u'\ufef0  A',
+            u'5 apples',
+            u'1.5<Br/>;',
+            u'\u00e9',
+            u'\u2022 \u0663',
         ]
         invalid_strings = [
             u' ',
@@ -68,6 +137,12 @@ class InDesignTestCase(unittest.TestCase):
             u' \ufeff ',
             u' \ufeff 5',
             u'\ufeff<Br/>;',
+            u' 1_000 ',
+            u'-1.5e-3',
+            u'NaN',
+            u'Infinity',
+            u'\u0661\u0662',
+            u'\u2003<?ACE 7?>42',
         ]
 
         for string in valid_strings:
@@ -115,10 +190,10 @@ class InDesignTestCase(unittest.TestCase):
             </Story>
         """
         handler = self.HANDLER_CLASS()
-        handler.stringset = [
+        handler.stringset = self.index_stringset([
             OpenString(u"0", u"Some string 1", order=0),
             OpenString(u"1", u"Some string 2", order=1),
-        ]
+        ])
 
         compiled_story = handler._compile_story(simple_story_template)
         self.assertEqual(compiled_story, simple_compiled_story)
@@ -141,9 +216,9 @@ class InDesignTestCase(unittest.TestCase):
             </Story>
         """
         handler = self.HANDLER_CLASS()
-        handler.stringset = [
+        handler.stringset = self.index_stringset([
             OpenString(u"0", u"Some string 1", order=0),
-        ]
+        ])
 
         compiled_story = handler._compile_story(simple_story_template)
         self.assertEqual(compiled_story, simple_compiled_story)
@@ -183,10 +258,10 @@ class InDesignTestCase(unittest.TestCase):
         """
         # strings #1 and #2 are missing from the stringset
         handler = self.HANDLER_CLASS()
-        handler.stringset = [
+        handler.stringset = self.index_stringset([
             OpenString(u"0", u"Some string 1", order=0),
             OpenString(u"3", u"Some string 2", order=3),
-        ]
+        ])
 
         first_compiled_story = handler._compile_story(
             first_story_template
@@ -197,6 +272,66 @@ class InDesignTestCase(unittest.TestCase):
         self.assertEqual(first_compiled_story, expected_first_compiled_story)
         self.assertEqual(second_compiled_story, expected_second_compiled_story)
 
+    def test_compile_story_out_of_order_and_repeated_hashes(self):
+        story_template = u"""
+            <Story>
+              <Content>3afcdbfeb6ecfbdd0ba628696e3cc163_tr</Content>
+              <Content>9a1c7ee2c7ce38d4bbbaf29ab9f2ac1e_tr</Content>
+              <Content>3afcdbfeb6ecfbdd0ba628696e3cc163_tr</Content>
+            </Story>
+        """
+        expected_compiled_story = u"""
+            <Story>
+              <Content>Some string 2</Content>
+              <Content>Some string 1</Content>
+              <Content></Content>
+            </Story>
+        """
+        handler = self.HANDLER_CLASS()
+        handler.stringset = self.index_stringset([
+            OpenString(u"0", u"Some string 1", order=0),
+            OpenString(u"1", u"Some string 2", order=1),
+        ])
+
+        compiled_story = handler._compile_story(story_template)
+        self.assertEqual(compiled_story, expected_compiled_story)
+        self.assertEqual(handler.stringset, {})
+
+    def test_split_and_join_compiled_stories(self):
+        first_story_template = u"""
+            <Content>9a1c7ee2c7ce38d4bbbaf29ab9f2ac1e_tr</Content>
+            <Content>3afcdbfeb6ecfbdd0ba628696e3cc163_tr</Content>
+        """
+        second_story_template = u"""
+            <Content>9a1c7ee2c7ce38d4bbbaf29ab9f2ac1e_tr</Content>
+            <Content>cdee9bf40a070d58d14dfa3bb61e0032_tr</Content>
+        """
+        stringset = [
+            OpenString(u"0", u"Some & string 1", order=0),
+            OpenString(u"3", u"Some string 2", order=3),
+        ]
+        handler = self.HANDLER_CLASS()
+        handler.stringset = self.index_stringset(stringset)
+        expected = [handler._compile_story(first_story_template),
+                    handler._compile_story(second_story_template)]
+
+        handler.stringset = self.index_stringset(stringset)
+        translations = {string.template_replacement: string.string
+                        for string in stringset}
+        pieces = [
+            handler._split_compiled_story(first_story_template, translations),
+            handler._split_compiled_story(second_story_template, translations),
+        ]
+        self.assertEqual(
+            pieces[0][1],
+            (u"9a1c7ee2c7ce38d4bbbaf29ab9f2ac1e_tr", u"Some &amp; string 1"),
+        )
+        self.assertEqual(
+            [handler._join_compiled_story(story_pieces)
+             for story_pieces in pieces],
+            expected,
+        )
+
     def test_compile_story_with_amps(self):
         regular = OpenString('0', u"hello world", order=0)
         with_amp = OpenString('1', u"hello &world", order=1)
@@ -226,7 +361,9 @@ class InDesignTestCase(unittest.TestCase):
         )
 
         handler = self.HANDLER_CLASS()
-        handler.stringset = [regular, with_amp, with_amp_escaped, many_amps]
+        handler.stringset = self.index_stringset(
+            [regular, with_amp, with_amp_escaped, many_amps]
+        )
         compiled_story = handler._compile_story(template)
         self.assertEqual(compiled_story, expected_compiled_story)
 
@@ -259,6 +396,8 @@ class InDesignTestCase(unittest.TestCase):
         )
 
         handler = self.HANDLER_CLASS()
-        handler.stringset = [regular, with_lt, with_lt_escaped, with_mixed_lts]
+        handler.stringset = self.index_stringset(
+            [regular, with_lt, with_lt_escaped, with_mixed_lts]
+        )
         compiled_story = handler._compile_story(template)
         self.assertEqual(compiled_story, expected_compiled_story)
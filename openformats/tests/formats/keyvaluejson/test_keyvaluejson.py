@@ -1069,3 +1069,56 @@ class JsonTestCase(CommonFormatTestMixin, unittest.TestCase):
 
         compiled = self.handler.compile(updated_template, [openstring])
         self.assertEqual(json.loads(compiled), {"a": string1})
+
+    def test_sync_template_removes_only_dict_from_list(self):
+        source = '{"a": [{"b": "%s"}], "c": "%s"}' % (
+            self.random_string, generate_random_string()
+        )
+        template, stringset = self.handler.parse(source)
+        keep = [stringset[1]]
+
+        updated_template = self.handler.sync_template(template, keep)
+        compiled = self.handler.compile(updated_template, keep)
+
+        self.assertEqual(json.loads(compiled), {"c": stringset[1].string})
+
+    def test_sync_template_keeps_separators_inside_strings(self):
+        source = '{"a, }": "%s", "b": "x, ]", "c": "%s"}' % (
+            self.random_string, generate_random_string()
+        )
+        template, stringset = self.handler.parse(source)
+        keep = stringset[:2]
+
+        updated_template = self.handler.sync_template(template, keep)
+        compiled = self.handler.compile(updated_template, keep)
+
+        self.assertEqual(compiled,
+                         '{"a, }": "%s", "b": "x, ]"}' % self.random_string)
+
+    def test_sync_template_adds_and_removes_in_one_pass(self):
+        source = '{\n  "a": "%s",\n  "b": "%s"\n}' % (
+            self.random_string, generate_random_string()
+        )
+        template, stringset = self.handler.parse(source)
+        new = OpenString("c", generate_random_string(), order=2)
+
+        updated_template = self.handler.sync_template(template,
+                                                      [stringset[1], new])
+
+        self.assertEqual(
+            updated_template,
+            '{\n  "b": "%s",\n  "c": "%s"\n}' % (
+                stringset[1].template_replacement, new.template_replacement
+            )
+        )
+
+    def test_sync_template_keeps_dos_newlines(self):
+        source = '{\r\n  "a": "%s"\r\n}' % self.random_string
+        template, stringset = self.handler.parse(source)
+        new = OpenString("b", generate_random_string(), order=1)
+
+        updated_template = self.handler.sync_template(template,
+                                                      [stringset[0], new])
+
+        self.assertNotIn('\n', updated_template.replace('\r\n', ''))
+        self.assertIn(new.template_replacement, updated_template)
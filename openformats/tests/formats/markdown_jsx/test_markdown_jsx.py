@@ -3,7 +3,8 @@ from io import open
 from os import path
 
 from openformats.formats.markdown_jsx import MarkdownJsxHandler
-from openformats.tests.formats.common import CommonFormatTestMixin
+from openformats.tests.formats.common import (CommonFormatTestMixin,
+                                              ConcurrentParseTestMixin)
 
 
 class MarkdownJsxTestCase(CommonFormatTestMixin, unittest.TestCase):
@@ -26,4 +27,10 @@ class MarkdownJsxTestCase(CommonFormatTestMixin, unittest.TestCase):
         """Test parse converts tabs to spaces"""
         content_with_tab = self.handler.parse(content=u"# foo	bar")
         content_with_spaces = self.handler.parse(content=u"# foo    bar")
-        self.assertEqual(content_with_tab[0], content_with_spaces[0])
\ No newline at end of file
+        self.assertEqual(content_with_tab[0], content_with_spaces[0])
+
+
+class MarkdownJsxConcurrencyTestCase(ConcurrentParseTestMixin,
+                                     unittest.TestCase):
+    HANDLER_CLASS = MarkdownJsxHandler
+    TESTFILE = "openformats/tests/formats/markdown_jsx/files/1_en.mdx"
@@ -1,9 +1,61 @@
 import unittest
+from io import StringIO
 
 from openformats.tests.formats.common import CommonFormatTestMixin
+from openformats.tests.utils import TrickleStream
 from openformats.formats.plaintext import PlaintextHandler
 
 
 class PlaintextTestCase(CommonFormatTestMixin, unittest.TestCase):
     HANDLER_CLASS = PlaintextHandler
     TESTFILE_BASE = "openformats/tests/formats/plaintext/files"
+
+    def _parse_stream(self, content):
+        template = StringIO()
+        stringset = list(
+            self.handler.parse_stream(TrickleStream(content), template)
+        )
+        return template.getvalue(), stringset
+
+    def test_parse_stream(self):
+        template, stringset = self._parse_stream(self.data["1_en"])
+
+        self.assertEqual(template, self.tmpl)
+        self.assertEqual(
+            [(string.key, string.string, string.order)
+             for string in stringset],
+            [(string.key, string.string, string.order)
+             for string in self.strset]
+        )
+
+    def test_parse_stream_matches_parse(self):
+        for content in (u"", u"one line", u"  a  \n\n b\n",
+                        u" a \r\n\r\nb\nc\r\n", u"a\nb\r\n c\r",
+                        u"\r\n\r\n x \r\n"):
+            template, stringset = self.handler.parse(content)
+            stream_template, stream_stringset = self._parse_stream(content)
+
+            self.assertEqual(stream_template, template)
+            self.assertEqual([string.string for string in stream_stringset],
+                             [string.string for string in stringset])
+
+    def test_parse_stream_lines_longer_than_a_read(self):
+        content = u" {} \r\n{}\n{}\r\n".format(u"a" * 1000, u"b" * 1000,
+                                               u"c" * 1000)
+        template, stringset = self.handler.parse(content)
+        stream_template, stream_stringset = self._parse_stream(content)
+
+        self.assertEqual(stream_template, template)
+        self.assertEqual([string.string for string in stream_stringset],
+                         [string.string for string in stringset])
+
+    def test_dos_newlines_split_only_dos_lines(self):
+        template, stringset = self._parse_stream(u" a \r\nb\nc\r\n")
+
+        self.assertEqual([string.string for string in stringset],
+                         [u"a", u"b\nc"])
+        self.assertEqual(
+            template,
+            u" {} \r\n{}\r\n".format(stringset[0].template_replacement,
+                                     stringset[1].template_replacement)
+        )
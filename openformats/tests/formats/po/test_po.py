@@ -1,12 +1,21 @@
-import unittest
+import gettext
+import io
 import itertools
+import pickle
+import struct
+import unittest
+
+import mock
 import polib
+import six
 
 from openformats.exceptions import ParseError
-from openformats.formats.po import PoHandler
+from openformats.formats.po import PoHandler, PoHandlerV2
 from openformats.strings import OpenString
 from openformats.tests.formats.common import CommonFormatTestMixin
 from openformats.tests.utils.strings import strip_leading_spaces, generate_random_string
+from openformats.utils.mo import hash_string
+from openformats.utils.po import PoTemplate, format_field
 
 
 class PoTestCase(CommonFormatTestMixin, unittest.TestCase):
@@ -1323,3 +1332,412 @@ class PoTestCase(CommonFormatTestMixin, unittest.TestCase):
         self.assertIn(string1.key, result)
         self.assertNotIn(string2.key, result)
         self.assertIn(string_new.key, result)
+
+
+class PoHandlerV2TestCase(CommonFormatTestMixin, unittest.TestCase):
+    HANDLER_CLASS = PoHandlerV2
+    TESTFILE_BASE = "openformats/tests/formats/po/files"
+
+    SOURCE = strip_leading_spaces(
+        """
+        # Header comment
+        #
+        msgid ""
+        msgstr ""
+        "Content-Type: text/plain; charset=UTF-8\\n"
+        "Plural-Forms: nplurals=2; plural=(n != 1);\\n"
+
+        #  translator-comments
+        #. extracted-comments
+        #: validators.py:9 models.py
+        #, python-format
+        msgid "String with a: colon"
+        msgstr "Translated %s"
+
+        msgctxt "context"
+        msgid ""
+        "Multi-line "
+        "msgid"
+        msgstr ""
+        "A long translation that polib would wrap differently, so it is kept "
+        "as it is\\n"
+        "with an \\"escaped\\" quote"
+
+        #, fuzzy
+        msgid "Fuzzy"
+        msgstr "Ασαφές"
+
+        msgid "StringPlural"
+        msgid_plural "StringsPlural"
+        msgstr[0] "Singular"
+        msgstr[1] "Plural"
+
+        msgid "Untranslated"
+        msgstr ""
+
+        #~ msgid "Obsolete"
+        #~ msgstr "Παρωχημένο"
+        """
+    )
+
+    @staticmethod
+    def _entries(content):
+        return [
+            (entry.msgctxt, entry.msgid, entry.msgid_plural, entry.msgstr,
+             entry.msgstr_plural, entry.obsolete)
+            for entry in polib.pofile(content)
+        ]
+
+    @staticmethod
+    def _strings(stringset):
+        return [
+            (string.key, string.string, string.context, string.order,
+             string.fuzzy, string.pluralized, string.flags,
+             string.occurrences, string.developer_comment)
+            for string in stringset
+        ]
+
+    def _translate(self, stringset):
+        return [
+            OpenString(
+                string.key,
+                {rule: u'{} "tr"'.format(value)
+                 for rule, value in string.strings.items()},
+                context=string.context,
+                order=string.order,
+                pluralized=string.pluralized,
+            )
+            for string in stringset
+            if not string.fuzzy
+        ]
+
+    def test_parse_matches_po_handler(self):
+        for is_source in (False, True):
+            template, stringset = self.handler.parse(
+                self.SOURCE.replace('msgstr ""\n\n#~', 'msgstr " "\n\n#~'),
+                is_source=is_source,
+            )
+            po_template, po_stringset = PoHandler().parse(
+                self.SOURCE.replace('msgstr ""\n\n#~', 'msgstr " "\n\n#~'),
+                is_source=is_source,
+            )
+            self.assertEqual(self._strings(stringset),
+                             self._strings(po_stringset))
+            self.assertEqual(
+                self._entries(template),
+                self._entries(PoHandler.pofile_to_str(po_template)),
+            )
+
+    def test_compile_matches_po_handler(self):
+        template, stringset = self.handler.parse(self.SOURCE)
+        po_template, _ = PoHandler().parse(self.SOURCE)
+        translations = self._translate(stringset)
+
+        compiled = self.handler.compile(template, translations)
+        po_compiled = PoHandler().compile(po_template, translations)
+        self.assertEqual(self._entries(compiled), self._entries(po_compiled))
+
+        # Everything but the msgstrs is left as is
+        self.assertIn(u'#: validators.py:9 models.py\n', compiled)
+        self.assertIn(u'msgid ""\n"Multi-line "\n"msgid"\n', compiled)
+        self.assertIn(u'#~ msgid "Obsolete"\n#~ msgstr "Παρωχημένο \\"tr\\""',
+                      compiled)
+        self.assertNotIn(u'Fuzzy', compiled)
+
+    def test_sync_template_matches_po_handler(self):
+        template, stringset = self.handler.parse(self.SOURCE)
+        po_template, _ = PoHandler().parse(self.SOURCE)
+        new_string = OpenString(u"new:news", {0: u"new", 1: u"news"},
+                                context=u"new", order=10)
+        translations = self._translate(stringset)[1:] + [new_string]
+
+        handler, po_handler = PoHandlerV2(), PoHandler()
+        template = handler.sync_template(template, translations)
+        po_template = po_handler.sync_template(po_template, translations)
+        self.assertEqual(handler.stringset_index, po_handler.stringset_index)
+        self.assertEqual(self._entries(template), self._entries(po_template))
+        self.assertEqual(
+            self._entries(handler.compile(template, translations)),
+            self._entries(po_handler.compile(po_template, translations)),
+        )
+
+    def test_errors_match_po_handler(self):
+        sources = [
+            (u'msgid "p1"\nmsgid_plural "p2"\nmsgstr "msgstr"\n', False),
+            (u'msgid "p1"\nmsgstr[0] "s1"\nmsgstr[1] "s2"\n', False),
+            (u'msgid ""\nmsgstr ""\n\nmsgid ""\nmsgstr "s"\n', False),
+            (u'msgid "p1"\nmsgstr "1"\n\nmsgid "p1"\nmsgstr "2"\n', False),
+            (u'msgctxt "t1"\nmsgid "p1"\nmsgid_plural "p2"\nmsgstr[0] "1"\n'
+             u'msgstr[1] "2"\n\nmsgctxt "t1"\nmsgid "p1"\nmsgid_plural "p2"\n'
+             u'msgstr[0] "3"\nmsgstr[1] "4"\n', False),
+            (u'msgid "p1"\nmsgid_plural "p2"\nmsgstr[0] "s"\nmsgstr[1] ""\n',
+             False),
+            (u'msgid "m1"\nmsgstr "s1"\n\nmsgid "m2"\nmsgstr ""\n', True),
+            (u'msgid "m1"\nmsgstr ""\n\nmsgid "m2"\nmsgstr "s2"\n', True),
+        ]
+        for source, is_source in sources:
+            with self.assertRaises(ParseError) as context:
+                self.handler.parse(source, is_source=is_source)
+            with self.assertRaises(ParseError) as po_context:
+                PoHandler().parse(source, is_source=is_source)
+            self.assertEqual(six.text_type(context.exception),
+                             six.text_type(po_context.exception))
+
+    def test_syntax_errors(self):
+        for source in (u'blyargh',
+                       u'msgid "a "quoted" msgid"\nmsgstr ""\n',
+                       u'msgstr "no msgid"\n',
+                       u'msgid "m1"\nmsgid "m2"\nmsgstr ""\n'):
+            with self.assertRaises(ParseError):
+                PoHandler().parse(source)
+            with self.assertRaises(ParseError):
+                self.handler.parse(source)
+
+    def test_dos_newlines_are_preserved(self):
+        source = self.data["1_en"].replace("\n", "\r\n")
+        template, stringset = self.handler.parse(source)
+        self.assertEqual(template, self.data["1_tpl"].replace("\n", "\r\n"))
+        self.assertEqual(self.handler.compile(template, stringset), source)
+
+
+class PoTemplateTestCase(unittest.TestCase):
+    SOURCE = PoHandlerV2TestCase.SOURCE
+
+    def _parse(self, handler_class):
+        template, stringset = handler_class().parse(self.SOURCE)
+        if isinstance(template, polib.POFile):
+            template = PoHandler.pofile_to_str(template)
+        translations = [
+            OpenString(
+                string.key,
+                {rule: u"{} tr".format(value)
+                 for rule, value in string.strings.items()},
+                context=string.context,
+                order=string.order,
+                pluralized=string.pluralized,
+            )
+            for string in stringset
+            if not string.fuzzy
+        ]
+        return template, translations
+
+    def test_to_string(self):
+        for handler_class in (PoHandler, PoHandlerV2):
+            template, _ = self._parse(handler_class)
+            po_template = handler_class().load_template(template)
+            self.assertEqual(po_template.to_string(), template)
+
+        template = PoHandlerV2TestCase.SOURCE.replace(u"\n", u"\r\n")
+        self.assertEqual(PoHandlerV2().load_template(template).to_string(),
+                         template)
+
+    def test_compile_many_times(self):
+        for handler_class in (PoHandler, PoHandlerV2):
+            template, translations = self._parse(handler_class)
+            compiled = handler_class().compile(template, translations)
+            po_template = handler_class().load_template(template)
+            for _ in range(2):
+                self.assertEqual(
+                    handler_class().compile(po_template, translations),
+                    compiled,
+                )
+            self.assertEqual(po_template.to_string(), template)
+
+    def test_serialization(self):
+        for handler_class in (PoHandler, PoHandlerV2):
+            template, translations = self._parse(handler_class)
+            handler = handler_class()
+            po_template = handler.load_template(template)
+            compiled = handler.compile(po_template, translations)
+            for loaded in (PoTemplate.from_json(po_template.to_json()),
+                           pickle.loads(pickle.dumps(po_template))):
+                self.assertEqual(loaded.to_string(), template)
+                self.assertEqual(handler.compile(loaded, translations),
+                                 compiled)
+
+    def test_sync_template_does_not_modify_loaded_template(self):
+        new_string = OpenString(u"new", u"new", order=10)
+        for handler_class in (PoHandler, PoHandlerV2):
+            template, translations = self._parse(handler_class)
+            stringset = translations[1:] + [new_string]
+            po_template = handler_class().load_template(template)
+
+            handler = handler_class()
+            synced = handler.sync_template(po_template, stringset)
+            self.assertEqual(handler.stringset_index, len(translations) - 1)
+            self.assertIn(u'msgid "new"', synced)
+            self.assertNotIn(u"String with a: colon", synced)
+            self.assertEqual(handler_class().sync_template(template, stringset),
+                             synced)
+            self.assertEqual(po_template.to_string(), template)
+
+    def test_sync_template_parses_template_once(self):
+        template, translations = self._parse(PoHandler)
+        new_string = OpenString(u"new", u"new", order=10)
+        with mock.patch("polib.pofile", wraps=polib.pofile) as pofile:
+            PoHandler().sync_template(template, translations + [new_string])
+        self.assertEqual(pofile.call_count, 1)
+
+
+class PoStreamingCompileTestCase(unittest.TestCase):
+    SOURCE = PoHandlerV2TestCase.SOURCE
+
+    def test_compile_to(self):
+        for handler_class in (PoHandler, PoHandlerV2):
+            for source in (self.SOURCE, self.SOURCE.replace(u"\n", u"\r\n")):
+                handler = handler_class()
+                template, stringset = handler.parse(source)
+                po_template = handler.load_template(template)
+
+                chunks = list(handler.iter_compile(po_template, stringset))
+                self.assertEqual(len(chunks), len(po_template.entries) + 1)
+
+                output = io.StringIO()
+                handler.compile_to(po_template, stringset, output)
+                self.assertEqual(output.getvalue(), u"".join(chunks))
+                self.assertEqual(output.getvalue(),
+                                 handler.compile(template, stringset))
+
+    def test_format_field_matches_polib(self):
+        entry = polib.POEntry()
+        values = [
+            u"",
+            u"short",
+            u"with \"quotes\" and \\ backslashes",
+            u"multi\nline\r\nvalue\n",
+            u"a long value with words that has to be wrapped " * 3,
+            u"a long value\twith\ttabs and \\\\ escaped characters " * 3,
+            u"hyphenated-words-are-split-by-polib " * 5,
+            u"x" * 200,
+            u"ends with a backslash, which polib escapes once more " * 2
+            + u"\\",
+            u"form\x0cfeed and vertical\x0btab are spaces in wrapped lines " * 2,
+        ]
+        for value in values:
+            for delflag in (u"", u"#~ "):
+                for plural_index in (u"", u"[1]"):
+                    self.assertEqual(
+                        format_field(u"msgstr", value, delflag, plural_index),
+                        entry._str_field(u"msgstr", delflag, plural_index,
+                                         value, 78),
+                    )
+
+
+class PoCompileMoTestCase(unittest.TestCase):
+    SOURCE = PoHandlerV2TestCase.SOURCE
+
+    def _compile_mo(self, handler_class, **kwargs):
+        handler = handler_class()
+        template, stringset = handler.parse(self.SOURCE)
+        translations = [
+            OpenString(
+                string.key,
+                {rule: u"{} tr".format(value)
+                 for rule, value in string.strings.items()},
+                context=string.context,
+                order=string.order,
+                pluralized=string.pluralized,
+            )
+            for string in stringset
+            if not string.fuzzy and string.key != u"Untranslated"
+        ]
+        translations.append(OpenString(u"Untranslated", u"", order=100))
+        return handler.compile_mo(template, translations, **kwargs)
+
+    @staticmethod
+    def _lookup(mo, original):
+        """Looks up `original` using the hash table, like the gettext runtime
+        does."""
+        count, _, translations_offset, size, hash_offset = struct.unpack(
+            "<5I", mo[8:28]
+        )
+        hash_value = hash_string(original)
+        position = hash_value % size
+        increment = 1 + hash_value % (size - 2)
+        while True:
+            index, = struct.unpack_from("<I", mo, hash_offset + 4 * position)
+            if not index:
+                return None
+            length, offset = struct.unpack(
+                "<2I", mo[28 + 8 * (index - 1):28 + 8 * index]
+            )
+            if mo[offset:offset + length] == original:
+                length, offset = struct.unpack(
+                    "<2I",
+                    mo[translations_offset + 8 * (index - 1):
+                       translations_offset + 8 * index],
+                )
+                return mo[offset:offset + length]
+            position = (position + increment) % size
+
+    def test_round_trip_through_gnu_translations(self):
+        for handler_class in (PoHandler, PoHandlerV2):
+            translations = gettext.GNUTranslations(
+                io.BytesIO(self._compile_mo(handler_class))
+            )
+            self.assertEqual(translations.gettext(u"String with a: colon"),
+                             u"Translated %s tr")
+            self.assertEqual(
+                translations.pgettext(u"context", u"Multi-line msgid"),
+                u"A long translation that polib would wrap differently, so "
+                u"it is kept as it is\nwith an \"escaped\" quote tr",
+            )
+            self.assertEqual(
+                translations.ngettext(u"StringPlural", u"StringsPlural", 1),
+                u"Singular tr",
+            )
+            self.assertEqual(
+                translations.ngettext(u"StringPlural", u"StringsPlural", 2),
+                u"Plural tr",
+            )
+            self.assertEqual(translations.info()["plural-forms"],
+                             u"nplurals=2; plural=(n != 1);")
+            # Like msgfmt, fuzzy, untranslated and obsolete entries are left
+            # out
+            for msgid in (u"Fuzzy", u"Untranslated", u"Obsolete"):
+                self.assertEqual(translations.gettext(msgid), msgid)
+
+    def test_hash_table(self):
+        mo = self._compile_mo(PoHandlerV2)
+        self.assertEqual(mo, self._compile_mo(PoHandler))
+        self.assertEqual(self._lookup(mo, b"String with a: colon"),
+                         b"Translated %s tr")
+        self.assertEqual(self._lookup(mo, b"StringPlural\x00StringsPlural"),
+                         b"Singular tr\x00Plural tr")
+        self.assertIsNone(self._lookup(mo, b"Fuzzy"))
+        self.assertTrue(self._lookup(mo, b"").startswith(b"Content-Type"))
+
+        without_hash_table = self._compile_mo(PoHandlerV2, hash_table=False)
+        self.assertEqual(struct.unpack("<I", without_hash_table[20:24]), (0,))
+        translations = gettext.GNUTranslations(io.BytesIO(without_hash_table))
+        self.assertEqual(translations.gettext(u"String with a: colon"),
+                         u"Translated %s tr")
+
+    def test_hash_string(self):
+        # The values of gettext's own hash_string, that is kept in 32 bits
+        for string, hash_value in (
+            (b"", 0),
+            (b"a", 97),
+            (b"hello", 7258927),
+            (b"String with a: colon", 200591822),
+            (b"MzbxhS AyDYEJCFSYbMKm", 541),
+            (b"context\x04msgid", 248590692),
+            (u"\u00dcn\u00efc\u00f6d\u00e9 str\u00eeng".encode("utf-8"),
+             246741767),
+            (b"hello\x00plural", 7258927),
+        ):
+            self.assertEqual(hash_string(string), hash_value)
+
+    def test_charset(self):
+        source = self.SOURCE.replace(u"charset=UTF-8", u"charset=ISO-8859-7")
+        handler = PoHandlerV2()
+        template, stringset = handler.parse(source)
+        translations = [OpenString(stringset[0].key, u"Μετάφραση", order=0)]
+        mo = handler.compile_mo(template, translations)
+        self.assertIn(u"Μετάφραση".encode("iso-8859-7"), mo)
+        self.assertEqual(
+            gettext.GNUTranslations(io.BytesIO(mo)).gettext(
+                u"String with a: colon"
+            ),
+            u"Μετάφραση",
+        )
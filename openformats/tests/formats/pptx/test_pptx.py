@@ -1,8 +1,11 @@
 # -*- coding: utf-8 -*-
+import io
 import unittest
 import re
 import six
 
+from zipfile import ZipFile
+
 from bs4 import BeautifulSoup
 
 from openformats.formats.pptx import PptxFile, PptxHandler, PptxHandlerV2
@@ -803,6 +806,69 @@ class PptxTestCase(unittest.TestCase):
             u'8'
         )
         
+    def test_compile_many(self):
+        path = '{}/multi_with_notes.pptx'.format(self.TESTFILE_BASE)
+        with open(path, 'rb') as f:
+            content = f.read()
+
+        handler = PptxHandler()
+        template, stringset = handler.parse(content)
+
+        stringsets = {
+            'el': [
+                OpenString(s.key, u'<tx>Ελ & </tx>' + s.string, order=i)
+                for i, s in enumerate(stringset)
+            ],
+            'ar': [
+                OpenString(s.key, s.string[::-1], order=i)
+                for i, s in enumerate(stringset[::2])
+            ],
+            'fr': [],
+        }
+        is_rtl = {'ar': True}
+
+        compiled = handler.compile_many(template, stringsets, is_rtl=is_rtl)
+
+        self.assertEqual(set(compiled), {'el', 'ar', 'fr'})
+        for language, language_stringset in stringsets.items():
+            expected = handler.compile(
+                template, language_stringset,
+                is_rtl=is_rtl.get(language, False),
+            )
+            with ZipFile(io.BytesIO(expected)) as expected_zip, \
+                    ZipFile(io.BytesIO(compiled[language])) as compiled_zip:
+                self.assertEqual(
+                    compiled_zip.namelist(), expected_zip.namelist()
+                )
+                for name in expected_zip.namelist():
+                    self.assertEqual(
+                        compiled_zip.read(name), expected_zip.read(name)
+                    )
+
+    def test_compile_leaves_untouched_slides_as_is(self):
+        path = '{}/multi_with_notes.pptx'.format(self.TESTFILE_BASE)
+        with open(path, 'rb') as f:
+            content = f.read()
+
+        handler = PptxHandler()
+        template, stringset = handler.parse(content)
+
+        compiled = handler.compile(
+            template, [OpenString(stringset[-1].key, u'Translated')]
+        )
+
+        with ZipFile(io.BytesIO(template)) as template_zip, \
+                ZipFile(io.BytesIO(compiled)) as compiled_zip:
+            changed = [
+                name
+                for name in template_zip.namelist()
+                if template_zip.read(name) != compiled_zip.read(name)
+            ]
+        self.assertEqual(changed, [
+            'ppt/slides/slide11.xml', 'ppt/slides/_rels/slide11.xml.rels'
+        ])
+
+
 class PptxHandlerV2TestCase(PptxTestCase):
     def test_pptx_simple_parser(self):
         path = '{}/hello_world.pptx'.format(self.TESTFILE_BASE)
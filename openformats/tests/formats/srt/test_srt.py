@@ -1,7 +1,9 @@
 import unittest
+from io import StringIO
 
 from openformats.tests.formats.common import CommonFormatTestMixin
-from openformats.tests.utils import strip_leading_spaces
+from openformats.tests.utils import TrickleStream, strip_leading_spaces
+from openformats.exceptions import ParseError
 from openformats.formats.srt import SrtHandler
 
 
@@ -19,6 +21,57 @@ class SrtTestCase(CommonFormatTestMixin, unittest.TestCase):
         template, stringset = self.handler.parse(source)
         self.assertEqual(stringset[0].occurrences, '00:01:28.797,00:01:30.297')
 
+    def test_parse_stream(self):
+        template = StringIO()
+        stringset = list(self.handler.parse_stream(
+            TrickleStream(self.data["1_en"]), template
+        ))
+
+        self.assertEqual(template.getvalue(), self.tmpl)
+        self.assertEqual(
+            [(string.key, string.string, string.occurrences)
+             for string in stringset],
+            [(string.key, string.string, string.occurrences)
+             for string in self.strset]
+        )
+
+    def test_compile_stream(self):
+        output = StringIO()
+        self.handler.compile_stream(TrickleStream(self.tmpl), self.strset,
+                                    output)
+        self.assertEqual(output.getvalue(), self.data["1_en"])
+
+    def test_parse_stream_error_line_number(self):
+        source = u"".join(
+            u"{}\r\n00:01:28,797 --> 00:01:30,297\r\nHello, World!\r\n\r\n".
+            format(order) for order in range(1, 51)
+        ) + u"51\r\n00:01:28,797 00:01:30,297\r\nHello, World!\r\n"
+        with self.assertRaises(ParseError) as context:
+            list(self.handler.parse_stream(TrickleStream(source), StringIO()))
+        self.assertEqual(
+            str(context.exception),
+            "Timings on line 202 don't follow '[start] --> [end] "
+            "(position)' pattern"
+        )
+
+    def test_timings(self):
+        source = strip_leading_spaces("""
+            1
+            00:01:28,797 --> 00:01:30,297
+            Hello, World!
+
+            2
+            01:00:01,5 --> 01:00:00
+            Goodbye, World!
+        """)
+        template, stringset = self.handler.parse(source)
+
+        self.assertEqual(list(self.handler.timings),
+                         [(88797, 90297), (3601500, 3600000)])
+        self.assertEqual(list(self.handler.timings.inverted), [1])
+        self.assertEqual(stringset[1].occurrences,
+                         '01:00:01.500,01:00:00.000')
+
     def test_missing_order(self):
         source = strip_leading_spaces("""
             00:01:28,797 --> 00:01:30,297
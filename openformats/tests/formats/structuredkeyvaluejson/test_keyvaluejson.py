@@ -4,6 +4,8 @@ import unittest
 import json
 import six
 
+import mock
+
 from openformats.formats.json import StructuredJsonHandler
 
 from openformats.exceptions import ParseError
@@ -446,6 +448,20 @@ class StructuredJsonTestCase(CommonFormatTestMixin, unittest.TestCase):
         self.assertEqual(stringset[0].character_limit, None)
         self.assertEqual(stringset[0].context, "")
 
+    def test_openstring_structure_is_decoded(self):
+        _, stringset = self.handler.parse(
+            '{"a": {"developer_comment": "say \\"hi\\"\\n",'
+            ' "cont\\u0065xt": "caf\\u00e9", "character_limit": null,'
+            ' "string": "a \\"quoted\\" string"},'
+            ' "b": {"string": "b", "context": null, "character_limit": 20}}'
+        )
+        self.assertEqual(
+            [(string.string, string.developer_comment, string.context,
+              string.character_limit) for string in stringset],
+            [('a \\"quoted\\" string', 'say "hi"\n', "café", None),
+             ("b", "", "", 20)],
+        )
+
     def _test_parse_error_message(self, source, msg_substr):
         error_raised = False
         try:
@@ -632,6 +648,68 @@ class StructuredJsonTestCase(CommonFormatTestMixin, unittest.TestCase):
         compiled = self.handler.compile(template, with_updated_char_limit)
         self.assertEqual(compiled, expected_compilation)
 
+    def test_metadata_added_after_non_string_value(self):
+        source = (
+            '{"a": {\n    "character_limit": 10,\n    "string": "%s"},\n'
+            ' "b": {\n    "string": "%s",\n    "character_limit": 10}}'
+            % (self.random_string, self.random_string)
+        )
+        template, stringset = self.handler.parse(source)
+        for string in stringset:
+            string.context = "ctx"
+
+        compiled = self.handler.compile(template, stringset)
+
+        self.assertEqual(
+            compiled,
+            '{"a": {\n    "character_limit": 10,\n    "string": "%s",\n'
+            '    "context": "ctx"},\n'
+            ' "b": {\n    "string": "%s",\n    "character_limit": 10,\n'
+            '    "context":"ctx"}}' % (self.random_string, self.random_string),
+        )
+        self.assertEqual(json.loads(compiled)["b"]["context"], "ctx")
+
+    def test_compile_leaves_objects_in_lists_untouched(self):
+        source = '{"a": [{"string": "in list"}], "b": {"string": "%s"}}'
+        template, stringset = self.handler.parse(source % self.random_string)
+        translation = OpenString(stringset[0].key, "translated", order=0)
+
+        compiled = self.handler.compile(template, [translation])
+
+        self.assertEqual(compiled, source % "translated")
+
+    def test_compile_many(self):
+        source = '{"a": {"string": "%s", "context": "c"}, "b": {"string": "b"}}'
+        template, stringset = self.handler.parse(source % self.random_string)
+        translated = [
+            OpenString(string.key, "%s_tr" % string.string,
+                       context="tr", order=string.order)
+            for string in stringset
+        ]
+
+        with mock.patch.object(
+            StructuredJsonHandler,
+            "_add_to_layout",
+            wraps=StructuredJsonHandler._add_to_layout,
+        ) as add_to_layout:
+            self.handler.compile(template, stringset)
+            calls = add_to_layout.call_count
+            add_to_layout.reset_mock()
+            compiled = self.handler.compile_many(
+                template, {"en": stringset, "tr": translated}
+            )
+
+        self.assertEqual(compiled, {
+            "en": source % self.random_string,
+            "tr": '{"a": {"string": "%s_tr", "context": "tr"}, '
+                  '"b": {"string": "b_tr","context": "tr"}}'
+                  % self.random_string,
+        })
+        self.assertEqual(compiled["tr"],
+                         self.handler.compile(template, translated))
+        # The template is read once for all the languages
+        self.assertEqual(add_to_layout.call_count, calls)
+
     def test_unicode(self):
         source = (
             """
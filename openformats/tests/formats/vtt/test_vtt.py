@@ -1,14 +1,74 @@
 import unittest
+from io import StringIO
 
+from openformats.exceptions import ParseError
 from openformats.formats.vtt import VttHandler
 from openformats.tests.formats.common import CommonFormatTestMixin
-from openformats.tests.utils import strip_leading_spaces
+from openformats.tests.utils import TrickleStream, strip_leading_spaces
 
 
 class VttTestCase(CommonFormatTestMixin, unittest.TestCase):
     HANDLER_CLASS = VttHandler
     TESTFILE_BASE = "openformats/tests/formats/vtt/files"
 
+    def test_parse_stream(self):
+        template = StringIO()
+        stringset = list(
+            self.handler.parse_stream(TrickleStream(self.data["1_en"]), template)
+        )
+
+        self.assertEqual(template.getvalue(), self.tmpl)
+        self.assertEqual(
+            [(s.key, s.string, s.occurrences, s.order) for s in stringset],
+            [(s.key, s.string, s.occurrences, s.order) for s in self.strset],
+        )
+
+    def test_parse_stream_without_header(self):
+        source = strip_leading_spaces(
+            """00:01:28.797 --> 00:01:30.297
+            Check the first line
+
+            00:01:31.000 --> 00:01:32.000
+            Check the second line
+        """
+        )
+        template = StringIO()
+        strings = self.handler.parse_stream(TrickleStream(source), template)
+
+        # Nothing is yielded or written before the error
+        with self.assertRaises(ParseError) as context:
+            next(strings)
+        self.assertEqual(
+            str(context.exception), "VTT file should start with 'WEBVTT'!"
+        )
+        self.assertEqual(template.getvalue(), "")
+
+    def test_compile_stream(self):
+        output = StringIO()
+        self.handler.compile_stream(TrickleStream(self.tmpl), self.strset, output)
+        self.assertEqual(output.getvalue(), self.data["1_en"])
+
+    def test_timings(self):
+        source = strip_leading_spaces(
+            """WEBVTT
+
+            00:01.000 --> 00:04.000
+            Hello, World!
+
+            00:03.500 --> 01:00:00.250
+            Goodbye, World!
+
+            00:05.000 --> 00:06.000
+            """
+        )
+        template, stringset = self.handler.parse(source)
+
+        self.assertEqual(
+            list(self.handler.timings), [(1000, 4000), (3500, 3600250)]
+        )
+        self.assertEqual(list(self.handler.timings.overlapping), [1])
+        self.assertEqual(stringset[1].occurrences, "00:03.500,01:00:00.250")
+
     def test_vtt_metadata(self):
         """vtt: Test that metadata is included in template but not included in stringset."""
         source = strip_leading_spaces(
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 from copy import copy
 from unittest import mock
+from zipfile import ZipFile
+import io
 import unittest
 import uuid
 
@@ -363,3 +365,91 @@ class XlsxTestCase(unittest.TestCase):
                 "order": 11,
             },
         )
+
+    def test_compile_many(self):
+        content = self.load_file("example.xlsx")
+        xlsx_handler = XlsxUnstructuredHandler()
+        template, stringset = xlsx_handler.parse(content)
+
+        stringsets = {
+            "el": [
+                OpenString(string.key, string.string + " & Ελ")
+                for string in stringset
+            ],
+            "ar": [
+                OpenString(string.key, string.string[::-1])
+                for string in stringset[1::2]
+            ],
+            "fr": [],
+        }
+        is_rtl = {"ar": True}
+
+        compiled = xlsx_handler.compile_many(
+            template, stringsets, is_rtl=is_rtl
+        )
+
+        self.assertEqual(set(compiled), {"el", "ar", "fr"})
+        for language, language_stringset in stringsets.items():
+            expected = xlsx_handler.compile(
+                template, language_stringset,
+                is_rtl=is_rtl.get(language, False),
+            )
+            with ZipFile(io.BytesIO(expected)) as expected_zip, \
+                    ZipFile(io.BytesIO(compiled[language])) as compiled_zip:
+                self.assertEqual(
+                    compiled_zip.namelist(), expected_zip.namelist()
+                )
+                for name in expected_zip.namelist():
+                    self.assertEqual(
+                        compiled_zip.read(name), expected_zip.read(name)
+                    )
+
+    def test_compile_leaves_untouched_parts_as_is(self):
+        content = self.load_file("example.xlsx")
+        xlsx_handler = XlsxUnstructuredHandler()
+        template, stringset = xlsx_handler.parse(content)
+
+        # "FormulaLink" lives in an inline cell of the last sheet
+        compiled = xlsx_handler.compile(
+            template, [OpenString(stringset[11].key, "Translated")]
+        )
+
+        with ZipFile(io.BytesIO(template)) as template_zip, \
+                ZipFile(io.BytesIO(compiled)) as compiled_zip:
+            changed = [
+                name
+                for name in template_zip.namelist()
+                if template_zip.read(name) != compiled_zip.read(name)
+            ]
+        self.assertEqual(changed, ["xl/worksheets/sheet6.xml"])
+
+    def test_compile_rtl_orients_untouched_sheets(self):
+        content = self.load_file("example.xlsx")
+        xlsx_handler = XlsxUnstructuredHandler()
+        template, stringset = xlsx_handler.parse(content)
+
+        compiled = xlsx_handler.compile(
+            template, [OpenString(stringset[11].key, "Translated")],
+            is_rtl=True,
+        )
+
+        xlsx = XlsxFile(compiled)
+        for sheet in xlsx.get_sheets():
+            self.assertIn('rightToLeft="True"', xlsx.get_sheet_content(sheet))
+        xlsx.delete()
+
+    def test_orient_sheet_content(self):
+        orient = XlsxUnstructuredHandler._orient_sheet_content
+
+        self.assertIsNone(orient('<sheetViews><sheetView/></sheetViews>', False))
+        self.assertIsNone(
+            orient('<sheetView rightToLeft="1" workbookViewId="0"/>', True)
+        )
+        self.assertEqual(
+            orient('<sheetViews><sheetView workbookViewId="0"/></sheetViews>', True),
+            '<sheetViews><sheetView workbookViewId="0" rightToLeft="True"/></sheetViews>',
+        )
+        self.assertEqual(
+            orient('<sheetView rightToLeft="true" workbookViewId="0">', False),
+            '<sheetView rightToLeft="False" workbookViewId="0">',
+        )
@@ -1,9 +1,16 @@
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from io import open
 from os import path
 
+from yaml.constructor import SafeConstructor
+
 from openformats.exceptions import ParseError
 from openformats.formats.yaml import YamlHandler
+from openformats.formats.yaml import yaml as yaml_module
+from openformats.formats.yaml.utils import (StyledScalarWriter, TxYamlCLoader,
+                                            TxYamlDumper, TxYamlLoader,
+                                            YamlGenerator)
 from openformats.strings import OpenString
 from openformats.tests.formats.common import CommonFormatTestMixin
 
@@ -34,6 +41,20 @@ class YamlTestCase(CommonFormatTestMixin, unittest.TestCase):
         self.assertEqual(remade_orig_content,
                          self.data["1_en_exported_without_template"])
 
+    def test_compile_without_template_in_any_order(self):
+        """The strings are written in the order the keys first appear in the
+        stringset, like when dumping the dictionary of YamlGenerator."""
+        self.handler.should_use_template = False
+        self.handler.indent = self.handler._get_indent(self.tmpl)
+        stringset = sorted(self.strset, key=lambda string: string.key)
+        yaml_dict = YamlGenerator(self.handler).generate_yaml_dict(stringset)
+        expected = yaml_module.yaml.dump(
+            yaml_dict, width=float('inf'), Dumper=TxYamlDumper,
+            allow_unicode=True, indent=self.handler.indent
+        )
+        self.assertEqual(self.handler.compile(self.tmpl, stringset),
+                         expected)
+
     def test_get_indent(self):
         template = "en:\n  foo: bar"
         self.assertEqual(self.handler._get_indent(template), 2)
@@ -95,6 +116,25 @@ class YamlTestCase(CommonFormatTestMixin, unittest.TestCase):
         end = len(content) - 1
         self.assertEqual(self.handler._find_comment(content, start, end), '')
 
+    def test_find_comment_after_value(self):
+        content = ("a: b  # inline\n"
+                   "\n"
+                   "  # one\n"
+                   "# two\n"
+                   "c: d\n"
+                   "e: f")
+        # `b`, `c`, `d` and `e` are the nodes
+        self.assertEqual(
+            self.handler._find_comment(content, content.index("b") + 1,
+                                       content.index("c")),
+            "inline one two"
+        )
+        self.assertEqual(
+            self.handler._find_comment(content, content.index("d") + 1,
+                                       content.index("e")),
+            ""
+        )
+
     def test_write_styled_literal(self):
         string = OpenString('key', "a random string", flags="\"")
         self.assertEqual(self.handler._write_styled_literal(string),
@@ -121,6 +161,35 @@ class YamlTestCase(CommonFormatTestMixin, unittest.TestCase):
         self.assertEqual(self.handler._write_styled_literal(string),
                          "a random string")
 
+    def test_write_styled_literal_with_shared_writer(self):
+        strings = [
+            OpenString('key', "it's", flags="'"),
+            OpenString('a.key', "a random string\n", flags=">"),
+            OpenString('key', "- dash", flags=""),
+            OpenString('a.b.key', "with \"quotes\"", flags="\""),
+            OpenString('key', "it's", flags="'"),
+            OpenString('a.key', "a random string\nwith multiple lines\n",
+                       flags="|"),
+            OpenString('a.key', "a random string", flags=">"),
+            OpenString('key', "a random string", flags=""),
+        ]
+        writer = StyledScalarWriter()
+        self.assertEqual(
+            [self.handler._write_styled_literal(string, writer)
+             for string in strings],
+            [self.handler._write_styled_literal(string)
+             for string in strings],
+        )
+
+    def test_compile_with_missing_strings(self):
+        template, stringset = self.handler.parse("a: b\nc: d\ne: f\n")
+        stringset[0]._strings[5] = "x"
+        stringset[2]._strings[5] = "z"
+        self.assertEqual(
+            self.handler.compile(template, [stringset[0], stringset[2]]),
+            "a: x\nc: {}\ne: z\n".format(stringset[1].template_replacement)
+        )
+
     # for covarage's sake
     def test_compile_pluralized(self):
         with self.assertRaises(NotImplementedError):
@@ -255,3 +324,107 @@ class YamlTestCase(CommonFormatTestMixin, unittest.TestCase):
                                     stringset[1].template_replacement))
         self.assertEqual(expected_template, template)
         self.assertEqual(self.handler.compile(template, stringset), source)
+
+
+class YamlConcurrencyTestCase(unittest.TestCase):
+    TESTFILE_BASE = "openformats/tests/formats/yaml/files"
+
+    @staticmethod
+    def _parse(content):
+        template, stringset = YamlHandler().parse(content)
+        return template, [
+            (string.key, string.string, string.context, string.flags,
+             string.developer_comment)
+            for string in stringset
+        ]
+
+    def test_parse_in_threads(self):
+        filepath = path.join(self.TESTFILE_BASE, "1_en.yml")
+        with open(filepath, "r", encoding='utf-8') as myfile:
+            source = myfile.read()
+        sources = [
+            source.replace(u"About writing",
+                           u"About writing ({})".format(index))
+            for index in range(300)
+        ]
+        expected = [self._parse(content) for content in sources]
+
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            results = list(executor.map(self._parse, sources))
+
+        self.assertEqual(results, expected)
+        # Custom tags are parsed as strings (by the loaders' own registry)
+        self.assertIn((u'foo', u'bar', u'test', u''),
+                      [string[:4] for string in results[0][1]])
+        self.assertEqual(SafeConstructor.yaml_constructors[None],
+                         SafeConstructor.construct_undefined)
+
+
+@unittest.skipIf(TxYamlCLoader is None, "PyYAML was built without libyaml")
+class YamlCLoaderTestCase(unittest.TestCase):
+    TESTFILE_BASE = "openformats/tests/formats/yaml/files"
+
+    def setUp(self):
+        filepath = path.join(self.TESTFILE_BASE, "1_en.yml")
+        with open(filepath, "r", encoding='utf-8') as myfile:
+            self.source = myfile.read()
+
+    def _parse_with_pure_python_loader(self, content):
+        original_loader = yaml_module.TxYamlCLoader
+        yaml_module.TxYamlCLoader = None
+        try:
+            return YamlHandler().parse(content)
+        finally:
+            yaml_module.TxYamlCLoader = original_loader
+
+    def test_loaders_return_the_same_nodes(self):
+        handler = YamlHandler()
+        self.assertIs(handler._get_loader(self.source), TxYamlCLoader)
+        self.assertEqual(handler._load_yaml(self.source, TxYamlCLoader),
+                         handler._load_yaml(self.source, TxYamlLoader))
+
+    def test_parse_matches_pure_python_loader(self):
+        template, stringset = YamlHandler().parse(self.source)
+        expected_template, expected_stringset = \
+            self._parse_with_pure_python_loader(self.source)
+        self.assertEqual(template, expected_template)
+        self.assertEqual(
+            [(string.key, string.string, string.context, string.flags,
+              string.developer_comment) for string in stringset],
+            [(string.key, string.string, string.context, string.flags,
+              string.developer_comment) for string in expected_stringset],
+        )
+
+    def test_content_with_tabs_uses_pure_python_loader(self):
+        # libyaml accepts the tab, PyYAML does not
+        content = "foo: \t\nbar: baz\n"
+        self.assertIs(YamlHandler()._get_loader(content), TxYamlLoader)
+        with self.assertRaises(ParseError):
+            YamlHandler().parse(content)
+
+    def test_content_with_bom_uses_pure_python_loader(self):
+        # libyaml's marks do not count the byte order mark
+        content = u'\ufeffen:\n  a: "x"\n  b: \'y\'\n'
+        handler = YamlHandler()
+        self.assertIs(handler._get_loader(content), TxYamlLoader)
+        template, stringset = handler.parse(content)
+        self.assertEqual(
+            template,
+            u'\ufeffen:\n  a: {}\n  b: {}\n'.format(
+                stringset[0].template_replacement,
+                stringset[1].template_replacement,
+            ),
+        )
+        self.assertEqual([string.string for string in stringset],
+                         [u'x', u'y'])
+        self.assertEqual(handler.compile(template, stringset), content)
+
+    def test_errors_match_pure_python_loader(self):
+        for content in ("foo: bar\nwrong indentation",
+                        "foo: [bar\n",
+                        "foo: 'bar\n"):
+            with self.assertRaises(ParseError) as c_error:
+                YamlHandler().parse(content)
+            with self.assertRaises(ParseError) as error:
+                self._parse_with_pure_python_loader(content)
+            self.assertEqual(str(c_error.exception), str(error.exception))
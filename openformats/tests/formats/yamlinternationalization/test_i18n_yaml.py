@@ -1,5 +1,5 @@
 import unittest
-from io import open
+from io import StringIO, open
 from os import path
 
 from openformats.formats.yaml import I18nYamlHandler
@@ -39,3 +39,10 @@ class I18nYamlTestCase(CommonFormatTestMixin, unittest.TestCase):
         remade_orig_content = self.handler.compile(self.tmpl, self.strset)
         self.assertEqual(remade_orig_content,
                          self.data["1_en_exported_without_template"])
+
+    def test_compile_to_without_template(self):
+        self.handler.should_use_template = False
+        output = StringIO()
+        self.handler.compile_to(self.tmpl, self.strset, output)
+        self.assertEqual(output.getvalue(),
+                         self.data["1_en_exported_without_template"])
@@ -1,5 +1,7 @@
 import unittest
 
+import mock
+
 from openformats.utils.json import DumbJson
 
 
@@ -106,6 +108,27 @@ class DumbJsonTestCase(unittest.TestCase):
             self.assertEqual(DumbJson(source).find_children(*keys),
                              expected_result)
 
+    # Iterating again
+    def test_source_is_read_once(self):
+        source = '{"a": {"b": ["c", 1]}, "d": "e"}'
+        with mock.patch.object(DumbJson, "_process_value", autospec=True,
+                               side_effect=DumbJson._process_value) as \
+                process_value:
+            dumb_json = DumbJson(source)
+            first = self._dfs(dumb_json)
+            calls = process_value.call_count
+            second = self._dfs(dumb_json)
+
+        self.assertEqual(first, second)
+        self.assertEqual(calls, 5)
+        self.assertEqual(process_value.call_count, calls)
+
+    def test_interrupted_iteration_starts_over(self):
+        dumb_json = DumbJson('["a", "b"]')
+        self.assertEqual(next(iter(dumb_json)), ("a", 2))
+        self.assertEqual(list(dumb_json), [("a", 2), ("b", 7)])
+        self.assertEqual(dumb_json.end, 9)
+
     # Utils
     def _test_dfs(self, content, against):
         dumb_json = DumbJson(content)
@@ -0,0 +1,67 @@
+import unittest
+from io import StringIO
+
+from openformats.tests.utils import TrickleStream
+from openformats.utils.subtitles import SubtitleReader, TimingIndex
+
+
+class SubtitleReaderTestCase(unittest.TestCase):
+
+    CONTENT = u"\n1\nfoo\n\n\n 2\nbar \n\n\n\n3\nbaz\n"
+
+    def test_sections_are_split_on_blank_lines(self):
+        for stream in (StringIO(self.CONTENT), TrickleStream(self.CONTENT)):
+            reader = SubtitleReader(stream)
+            self.assertEqual(list(reader), self.CONTENT.split(u"\n\n"))
+            self.assertEqual(reader.newline_type, 'UNIX')
+
+    def test_dos_newlines(self):
+        content = self.CONTENT.replace(u"\n", u"\r\n")
+        for stream in (StringIO(content), TrickleStream(content)):
+            reader = SubtitleReader(stream)
+            self.assertEqual(list(reader), self.CONTENT.split(u"\n\n"))
+            self.assertEqual(reader.newline_type, 'DOS')
+            self.assertEqual(reader.restore_newlines(u"1\nfoo"),
+                             u"1\r\nfoo")
+
+    def test_empty_content(self):
+        reader = SubtitleReader(StringIO(u""))
+        self.assertEqual(list(reader), [u""])
+        self.assertEqual(reader.newline_type, 'UNIX')
+
+    def test_iter_subtitles(self):
+        reader = SubtitleReader(TrickleStream(self.CONTENT))
+        self.assertEqual(list(reader.iter_subtitles()), [
+            (u"\n", u"1\nfoo"),
+            (u"\n\n\n ", u"2\nbar"),
+            (u" \n\n\n\n", u"3\nbaz"),
+            (u"\n", None),
+        ])
+
+
+class TimingIndexTestCase(unittest.TestCase):
+
+    def test_timings(self):
+        timings = TimingIndex()
+        for start, end in [(0, 1000), (1000, 2000), (3000, 2500)]:
+            timings.append(start, end)
+
+        self.assertEqual(len(timings), 3)
+        self.assertEqual(timings[2], (3000, 2500))
+        self.assertEqual(list(timings),
+                         [(0, 1000), (1000, 2000), (3000, 2500)])
+        self.assertEqual(timings.starts.typecode, 'q')
+        self.assertEqual(list(timings.inverted), [2])
+        self.assertEqual(list(timings.overlapping), [])
+        self.assertTrue(timings.is_ordered)
+
+    def test_unordered_and_overlapping_timings(self):
+        timings = TimingIndex()
+        for start, end in [(0, 5000), (1000, 2000), (3000, 4000),
+                           (2000, 6000), (6000, 7000)]:
+            timings.append(start, end)
+
+        self.assertEqual(list(timings.unordered), [3])
+        # Cues 1-3 start before the first one ends
+        self.assertEqual(list(timings.overlapping), [1, 2, 3])
+        self.assertFalse(timings.is_ordered)
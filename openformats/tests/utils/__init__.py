@@ -1,6 +1,7 @@
 # flake8: noqa
 
 from openformats.tests.utils.dictionary import translate_stringset
+from openformats.tests.utils.streams import TrickleStream
 from openformats.tests.utils.strings import (
     generate_random_string, strip_leading_spaces
 )
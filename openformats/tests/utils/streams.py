@@ -0,0 +1,8 @@
+from io import StringIO
+
+
+class TrickleStream(StringIO):
+    """A text stream that returns at most a few characters per read."""
+
+    def read(self, size=-1):
+        return super(TrickleStream, self).read(3)
@@ -66,9 +66,28 @@ class DumbJson(object):
     CARRIAGE_RETURN = u'\r'
     TAB = u'\t'
 
+    # The first non-empty value after a position: a container, a string or
+    # a literal allowed by JSON
+    VALUE_PAT = re.compile(
+        r'(?P<spaces>\s*)(?P<value>{dict_list_string}|{true_false_null}|'
+        r'{e_notation}|{_float}|{integer})'.format(
+            dict_list_string=r'[{\["]',
+            true_false_null=r'true|false|null',
+            e_notation=r'-?\d+e-?\d+',
+            _float=r'-?\d+\.\d+',
+            integer=r'-?\d+',
+        )
+    )
+    FIRST_SYMBOL_PAT = re.compile(r'\s*.')
+    WHITESPACE_PAT = re.compile(r'\s*')
+
     def __init__(self, source, start=0):
         self.source = source
         self._end = None
+        # The items, once the container has been iterated over; computing
+        # `end` and iterating again later reuse them instead of scanning the
+        # source again
+        self._items = None
         starting_symbol, self.start = self._find_next('{[', start,
                                                       require_whitespace=True)
         if starting_symbol == '{':
@@ -79,10 +98,20 @@ class DumbJson(object):
             raise ValueError("Input is not a JSON container")
 
     def __iter__(self):
+        if self._items is not None:
+            return iter(self._items)
+        return self._iter_and_remember()
+
+    def _iter_and_remember(self):
         if self.type == dict:
-            return self._iter_dict()
-        elif self.type == list:
-            return self._iter_list()
+            iterator = self._iter_dict()
+        else:
+            iterator = self._iter_list()
+        items = []
+        for item in iterator:
+            items.append(item)
+            yield item
+        self._items = items
 
     def _iter_dict(self):
         # The '_p' suffix means 'position'
@@ -149,10 +178,10 @@ class DumbJson(object):
         start = self.start + 1
 
         # Maybe it's an empty list
-        match = re.search(r'^\s*.', self.source[start:])
+        match = self.FIRST_SYMBOL_PAT.match(self.source, start)
         if match:
             if match.group()[-1] == "]":
-                self.end = start + match.end() - 1
+                self.end = match.end() - 1
                 return
 
         while True:
@@ -195,6 +224,38 @@ class DumbJson(object):
                 break
 
     def _find_next(self, symbols, start=0, require_whitespace=True):
+        if require_whitespace:
+            # Skip the whitespace, the symbol has to come right after it
+            ptr = self.WHITESPACE_PAT.match(self.source, start).end()
+            if ptr >= len(self.source):
+                return None, None
+            candidate = self.source[ptr]
+            if candidate in symbols:
+                return candidate, ptr
+            newline_count = self.source.count(self.NEWLINE, 0, ptr)
+            raise ValueError(
+                u"Was expecting whitespace or one of `{symbols}` on line "
+                u"{line_no}, found `{candidate}` instead".format(
+                    symbols=''.join(sorted(set(symbols))),
+                    line_no=newline_count + 1,
+                    candidate=candidate,
+                )
+            )
+
+        if symbols == self.DOUBLE_QUOTES:
+            # The closing quotes of a string: skip the ones escaped by an odd
+            # number of backslashes
+            ptr = self.source.find(self.DOUBLE_QUOTES, start)
+            while ptr != -1:
+                backslash_p = ptr
+                while (backslash_p > start and
+                        self.source[backslash_p - 1] == self.BACKSLASH):
+                    backslash_p -= 1
+                if (ptr - backslash_p) % 2 == 0:
+                    return self.DOUBLE_QUOTES, ptr
+                ptr = self.source.find(self.DOUBLE_QUOTES, ptr + 1)
+            return None, None
+
         symbols = {s for s in symbols}
         after_backslash = False
         for ptr in six.moves.xrange(start, len(self.source)):
@@ -208,16 +269,6 @@ class DumbJson(object):
                 return candidate, ptr
             if candidate != '\\':
                 after_backslash = False
-            if require_whitespace and not candidate.isspace():
-                newline_count = self.source.count(self.NEWLINE, 0, ptr)
-                raise ValueError(
-                    u"Was expecting whitespace or one of `{symbols}` on line "
-                    u"{line_no}, found `{candidate}` instead".format(
-                        symbols=''.join(sorted(symbols)),
-                        line_no=newline_count + 1,
-                        candidate=candidate,
-                    )
-                )
         return None, None
 
     def _process_value(self, start):
@@ -237,17 +288,7 @@ class DumbJson(object):
             - value_start_p: where the value, whatever it is, is encountered
         """
 
-        # Lets construct a regular expression to find the first non-empty char
-        value_pat = r'{dict_list_string}|{true_false_null}|{e_notation}|'\
-            r'{_float}|{integer}'.format(
-                dict_list_string=r'[{\["]',
-                true_false_null=r'true|false|null',
-                e_notation=r'-?\d+e-?\d+',
-                _float=r'-?\d+\.\d+',
-                integer=r'-?\d+',
-            )
-        first_non_empty = r'^(?P<spaces>\s*)(?P<value>{})'.format(value_pat)
-        match = re.search(first_non_empty, self.source[start:])
+        match = self.VALUE_PAT.match(self.source, start)
         # We probably found a match, otherwise this is not JSON
         if match:
             spaces, value = match.groups()
@@ -300,39 +341,24 @@ class DumbJson(object):
         return [(found.get(key, (None, None))) for key in keys]
 
 
+# What `escape` replaces each symbol with
+_ESCAPES = {
+    ord(DumbJson.DOUBLE_QUOTES): DumbJson.BACKSLASH + DumbJson.DOUBLE_QUOTES,
+    ord(DumbJson.BACKSLASH): DumbJson.BACKSLASH + DumbJson.BACKSLASH,
+    ord(DumbJson.BACKSPACE): DumbJson.BACKSLASH + u'b',
+    ord(DumbJson.FORMFEED): DumbJson.BACKSLASH + u'f',
+    ord(DumbJson.NEWLINE): DumbJson.BACKSLASH + u'n',
+    ord(DumbJson.CARRIAGE_RETURN): DumbJson.BACKSLASH + u'r',
+    ord(DumbJson.TAB): DumbJson.BACKSLASH + u't',
+}
+
+
 def escape(string):
-    return u''.join(_escape_generator(string))
+    return string.translate(_ESCAPES)
     # btw, this seems equivalent to
     # return json.dumps(string, ensure_ascii=False)[1:-1]
 
 
-def _escape_generator(string):
-    for symbol in string:
-        if symbol == DumbJson.DOUBLE_QUOTES:
-            yield DumbJson.BACKSLASH
-            yield DumbJson.DOUBLE_QUOTES
-        elif symbol == DumbJson.BACKSLASH:
-            yield DumbJson.BACKSLASH
-            yield DumbJson.BACKSLASH
-        elif symbol == DumbJson.BACKSPACE:
-            yield DumbJson.BACKSLASH
-            yield u'b'
-        elif symbol == DumbJson.FORMFEED:
-            yield DumbJson.BACKSLASH
-            yield u'f'
-        elif symbol == DumbJson.NEWLINE:
-            yield DumbJson.BACKSLASH
-            yield u'n'
-        elif symbol == DumbJson.CARRIAGE_RETURN:
-            yield DumbJson.BACKSLASH
-            yield u'r'
-        elif symbol == DumbJson.TAB:
-            yield DumbJson.BACKSLASH
-            yield u't'
-        else:
-            yield symbol
-
-
 def unescape(string):
     return u''.join(_unescape_generator(string))
     # btw, this seems equivalent to
@@ -0,0 +1,119 @@
+"""
+Writer for the binary GNU gettext `.mo` format.
+
+The layout is described here:
+https://www.gnu.org/software/gettext/manual/html_node/MO-Files.html
+
+Apart from the (sorted) tables of original and translated strings, the files
+include the optional hash table that the gettext runtime uses to look up
+messages in O(1) instead of doing a binary search.
+"""
+
+import struct
+
+MAGIC = 0x950412de
+HEADER_SIZE = 28
+
+# Separates the context from the msgid in the original strings
+CONTEXT_SEPARATOR = b"\x04"
+# Separates the singular from the plural forms of the strings
+PLURAL_SEPARATOR = b"\x00"
+
+
+def hash_string(string):
+    """The hashpjw function that gettext uses for the hash table.
+
+    Like gettext, it stops at the first NUL byte, so only the msgid (and the
+    context) of a plural original is hashed.
+    """
+    hash_value = 0
+    for byte in bytearray(string.split(b"\x00", 1)[0]):
+        # gettext keeps the value in an unsigned 32 bit integer
+        hash_value = ((hash_value << 4) + byte) & 0xffffffff
+        high_bits = hash_value & 0xf0000000
+        if high_bits:
+            hash_value ^= high_bits >> 24
+            hash_value ^= high_bits
+    return hash_value
+
+
+def next_prime(number):
+    """Returns the smallest odd prime that is not smaller than `number`."""
+    number |= 1
+    while True:
+        divisor = 3
+        while divisor * divisor <= number and number % divisor:
+            divisor += 2
+        if divisor * divisor > number:
+            return number
+        number += 2
+
+
+def make_original(msgid, msgctxt=None, msgid_plural=None):
+    """Returns the original (source) string of a message, as bytes."""
+    original = msgid
+    if msgctxt is not None:
+        original = msgctxt + CONTEXT_SEPARATOR + original
+    if msgid_plural:
+        original += PLURAL_SEPARATOR + msgid_plural
+    return original
+
+
+def write_mo(messages, hash_table=True):
+    """Returns the content of a `.mo` file with the given messages.
+
+    :param dict messages: maps the original strings (see `make_original`) to
+        their translations, both as bytes. Plural translations are the plural
+        forms joined with `PLURAL_SEPARATOR`. The metadata is the translation
+        of the empty original.
+    :param bool hash_table: whether to include the hash table
+    :rtype: bytes
+    """
+    originals = sorted(messages)
+    count = len(originals)
+
+    if hash_table:
+        # Same sizing as msgfmt's: a prime at least 4/3 times the number of
+        # messages, so that collisions are rare
+        hash_table_size = next_prime(max(count * 4 // 3, 3))
+    else:
+        hash_table_size = 0
+
+    originals_table_offset = HEADER_SIZE
+    translations_table_offset = originals_table_offset + 8 * count
+    hash_table_offset = translations_table_offset + 8 * count
+    offset = hash_table_offset + 4 * hash_table_size
+
+    originals_table = []
+    translations_table = []
+    strings = []
+    for original in originals:
+        originals_table.append((len(original), offset))
+        strings.append(original + b"\x00")
+        offset += len(original) + 1
+    for original in originals:
+        translation = messages[original]
+        translations_table.append((len(translation), offset))
+        strings.append(translation + b"\x00")
+        offset += len(translation) + 1
+
+    table = [0] * hash_table_size
+    for index, original in enumerate(originals if hash_table else ()):
+        hash_value = hash_string(original)
+        position = hash_value % hash_table_size
+        increment = 1 + hash_value % (hash_table_size - 2)
+        while table[position]:
+            position = (position + increment) % hash_table_size
+        # Zero marks an empty slot, so indexes are stored off by one
+        table[position] = index + 1
+
+    result = [struct.pack("<7I", MAGIC, 0, count, originals_table_offset,
+                          translations_table_offset, hash_table_size,
+                          hash_table_offset)]
+    result.extend(struct.pack("<2I", length, string_offset)
+                  for length, string_offset in originals_table)
+    result.extend(struct.pack("<2I", length, string_offset)
+                  for length, string_offset in translations_table)
+    result.append(struct.pack("<%dI" % hash_table_size, *table))
+    result.extend(strings)
+    return b"".join(result)
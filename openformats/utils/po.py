@@ -0,0 +1,558 @@
+"""
+A lightweight PO scanner that records where every entry and every msgstr is
+in the content, so that templates and compiled files can be written by
+slicing the original text instead of re-serializing it with polib.
+
+The scanner follows the grammar (and the quirks) of polib's parser, so that
+both produce the same entries for the same content.
+"""
+
+import json
+import re
+import textwrap
+from collections import namedtuple
+
+from .newlines import force_newline_type
+
+
+ESCAPED_CHARACTER_REGEX = re.compile(r'\\(\\|n|t|r|")')
+UNESCAPED_QUOTE_REGEX = re.compile(r'([^\\]|^)"')
+UNESCAPED_CHARACTERS = {'n': '\n', 't': '\t', 'r': '\r', '\\': '\\', '"': '"'}
+
+
+def escape(string):
+    """Escapes the characters `\\`, `\\t`, `\\n`, `\\r` and `"`."""
+    return (string.replace('\\', r'\\')
+                  .replace('\t', r'\t')
+                  .replace('\r', r'\r')
+                  .replace('\n', r'\n')
+                  .replace('"', r'\"'))
+
+
+def unescape(string):
+    """Unescapes the characters `\\`, `\\t`, `\\n`, `\\r` and `"`."""
+    if '\\' not in string:
+        return string
+    return ESCAPED_CHARACTER_REGEX.sub(
+        lambda match: UNESCAPED_CHARACTERS[match.group(1)], string
+    )
+
+
+def format_field(fieldname, value, delflag=u"", plural_index=u"",
+                 wrapwidth=78):
+    """Formats a PO field, eg `msgstr "value"`, exactly like polib does.
+
+    :param str fieldname: the PO keyword, eg 'msgstr'
+    :param str value: the unescaped value of the field
+    :param str delflag: '#~ ' for obsolete entries
+    :param str plural_index: eg '[0]' for plural msgstrs
+    :param int wrapwidth: the width after which lines are wrapped
+    :return: the lines of the field
+    :rtype: list
+    """
+    # comparison must take into account fieldname length + one space
+    # + 2 quotes (eg. msgid "<string>")
+    flength = len(fieldname) + 3 + len(plural_index)
+    lines = value.splitlines(True)
+    if len(lines) > 1:
+        # start with initial empty line
+        result = [u'%s%s%s ""' % (delflag, fieldname, plural_index)]
+        for line in lines:
+            result.append(u'%s"%s"' % (delflag, escape(line)))
+        return result
+    if wrapwidth <= 0 or len(value) <= wrapwidth - flength:
+        # Short enough no matter how many characters need escaping
+        return [u'%s%s%s "%s"' % (delflag, fieldname, plural_index,
+                                  escape(value))]
+
+    escaped_value = escape(value)
+    # The escaped value is longer by the number of escaped characters
+    if len(escaped_value) - len(value) + wrapwidth - flength >= len(value):
+        return [u'%s%s%s "%s"' % (delflag, fieldname, plural_index,
+                                  escaped_value)]
+
+    # Wrap the line but take field name into account
+    result = [u'%s%s%s ""' % (delflag, fieldname, plural_index)]
+    for item in wrap(escaped_value, wrapwidth - 2):  # 2 for quotes ""
+        if u'\\' in item:
+            # polib unescapes the wrapped lines before escaping them again,
+            # which is not a no-op for lines that end in a backslash
+            item = escape(unescape(item))
+        result.append(u'%s"%s"' % (delflag, item))
+    return result
+
+
+WORDSEP_REGEX = textwrap.TextWrapper.wordsep_re
+# Without hyphens, which need textwrap's (slow) regex, words are split on
+# spaces alone
+SPACES_REGEX = re.compile(r'( +)')
+WHITESPACE_TRANSLATION = {ord(char): u' ' for char in u'\t\n\x0b\x0c\r'}
+
+
+def wrap(text, width):
+    """Same as `textwrap.wrap(text, width, drop_whitespace=False,
+    break_long_words=False)`, which is how polib wraps fields, without
+    creating a `TextWrapper` for every call.
+    """
+    text = text.expandtabs().translate(WHITESPACE_TRANSLATION)
+    lines = []
+    line = []
+    length = 0
+    regex = WORDSEP_REGEX if u'-' in text else SPACES_REGEX
+    for chunk in regex.split(text):
+        if not chunk:
+            continue
+        if line and length + len(chunk) > width:
+            lines.append(u''.join(line))
+            line = []
+            length = 0
+        line.append(chunk)
+        length += len(chunk)
+    if line:
+        lines.append(u''.join(line))
+    return lines
+
+
+def _build_transitions():
+    """Builds the (symbol, state) -> next state table of polib's parser.
+
+    Signification of symbols (same as polib's):
+        * ST: Beginning of the file (start)
+        * HE: Header
+        * TC: a translation comment
+        * GC: a generated comment
+        * OC: a file/line occurence
+        * FL: a flags line
+        * CT: a message context
+        * PC: a previous msgctxt
+        * PM: a previous msgid
+        * PP: a previous msgid_plural
+        * MI: a msgid
+        * MP: a msgid plural
+        * MS: a msgstr
+        * MX: a msgstr plural
+        * MC: a msgid or msgstr continuation line
+    """
+    all_states = ['ST', 'HE', 'GC', 'OC', 'FL', 'CT', 'PC', 'PM', 'PP', 'TC',
+                  'MS', 'MP', 'MX', 'MI']
+    transitions = {}
+
+    def add(symbol, states, next_state):
+        for state in states:
+            transitions[(symbol, state)] = next_state
+
+    add('TC', ['ST', 'HE'],                                     'HE')
+    add('TC', ['GC', 'OC', 'FL', 'TC', 'PC', 'PM', 'PP', 'MS',
+               'MP', 'MX', 'MI'],                               'TC')
+    add('GC', all_states,                                       'GC')
+    add('OC', all_states,                                       'OC')
+    add('FL', all_states,                                       'FL')
+    add('PC', all_states,                                       'PC')
+    add('PM', all_states,                                       'PM')
+    add('PP', all_states,                                       'PP')
+    add('CT', ['ST', 'HE', 'GC', 'OC', 'FL', 'TC', 'PC', 'PM',
+               'PP', 'MS', 'MX'],                               'CT')
+    add('MI', ['ST', 'HE', 'GC', 'OC', 'FL', 'CT', 'TC', 'PC',
+               'PM', 'PP', 'MS', 'MX'],                         'MI')
+    add('MP', ['TC', 'GC', 'PC', 'PM', 'PP', 'MI'],             'MP')
+    add('MS', ['MI', 'MP', 'TC'],                               'MS')
+    add('MX', ['MI', 'MX', 'MP', 'TC'],                         'MX')
+    add('MC', ['CT', 'MI', 'MP', 'MS', 'MX', 'PM', 'PP', 'PC'], 'MC')
+    return transitions
+
+
+class PoSyntaxError(Exception):
+    pass
+
+
+class PoEntry(object):
+    """A single entry of a PO file, along with its position in the content.
+
+    The unescaped fields use the same names and types as polib's `POEntry`.
+    The positions are:
+
+    * `leading`: where the blank space before the entry begins
+    * `start`: where the first line of the entry begins
+    * `msgstr_start`, `msgstr_end`: the span of the msgstr or msgstr[N]
+      lines, without the final newline; both are `None` if the entry has no
+      msgstr at all
+    * `content_end`: where the last line of the entry ends, without its
+      newline
+    * `end`: where the last line of the entry ends, including its newline
+    """
+
+    __slots__ = ('msgctxt', 'msgid', 'msgid_plural', 'msgstr',
+                 'msgstr_plural', 'obsolete', 'comment', 'tcomment',
+                 'occurrences', 'flags', 'previous_msgctxt', 'previous_msgid',
+                 'previous_msgid_plural', 'leading', 'start', 'msgstr_start',
+                 'msgstr_end', 'content_end', 'end')
+
+    def __init__(self, leading, start):
+        self.msgctxt = None
+        self.msgid = u''
+        self.msgid_plural = u''
+        self.msgstr = u''
+        self.msgstr_plural = {}
+        self.obsolete = False
+        self.comment = u''
+        self.tcomment = u''
+        self.occurrences = []
+        self.flags = []
+        self.previous_msgctxt = None
+        self.previous_msgid = None
+        self.previous_msgid_plural = None
+        self.leading = leading
+        self.start = start
+        self.msgstr_start = None
+        self.msgstr_end = None
+        self.content_end = start
+        self.end = start
+
+
+class PoScanner(object):
+    """Scans the content of a PO file into `PoEntry` objects.
+
+    After `scan()`:
+
+    * `entries` holds all the entries, except for the metadata one, in the
+      order they appear in the content (obsolete ones included)
+    * `metadata_entry` holds the entry with the empty msgid, if any
+    * `header` holds the comments before the first entry
+
+    Usage:
+
+        >>> scanner = PoScanner(content)
+        >>> for entry in scanner.scan():
+        ...     content[entry.msgstr_start:entry.msgstr_end]
+    """
+
+    KEYWORDS = {'msgctxt': 'CT', 'msgid': 'MI', 'msgstr': 'MS',
+                'msgid_plural': 'MP'}
+    PREVIOUS_KEYWORDS = {'msgid_plural': 'PP', 'msgid': 'PM',
+                         'msgctxt': 'PC'}
+
+    TRANSITIONS = _build_transitions()
+    # Symbols that start a new entry when they follow a msgstr
+    ENTRY_STARTING_SYMBOLS = frozenset(('TC', 'GC', 'OC', 'FL', 'PP', 'PM',
+                                        'PC', 'CT', 'MI'))
+
+    def __init__(self, content):
+        self.content = content
+        self.header = u''
+        self.entries = []
+        self.metadata_entry = None
+
+    def scan(self):
+        transitions = self.TRANSITIONS
+        entry_starting_symbols = self.ENTRY_STARTING_SYMBOLS
+        entries = []
+        entry = None
+        state = 'ST'
+        msgstr_index = None
+        last_end = position = 0
+
+        for line_number, raw_line in enumerate(
+                self.content.splitlines(True), 1):
+            line_start = position
+            position += len(raw_line)
+            line = raw_line.strip()
+            if not line:
+                continue
+
+            obsolete = False
+            if line[0] == '"':
+                # The most common case, a continuation line
+                symbol, token = 'MC', line
+                if '"' in line[1:-1]:
+                    self._check_quotes(line, line_number)
+            else:
+                tokens = line.split(None, 2)
+                if tokens[0] == '#~|':
+                    continue
+                if tokens[0] == '#~' and len(tokens) > 1:
+                    obsolete = True
+                    line = line[3:].strip()
+                    tokens = tokens[1:]
+                symbol, token = self._classify(line, tokens, line_number)
+                if symbol is None:
+                    continue
+
+            try:
+                next_state = transitions[(symbol, state)]
+            except KeyError:
+                raise PoSyntaxError(
+                    u"Syntax error in po file (line {})".format(line_number)
+                )
+
+            if next_state == 'HE':
+                if self.header:
+                    self.header += u'\n'
+                self.header += token[2:]
+                last_end = position
+                state = next_state
+                continue
+
+            if entry is None or (state in ('MS', 'MX') and
+                                 symbol in entry_starting_symbols):
+                if entry is not None:
+                    self._close_entry(entry, last_line_start, last_line)
+                    entries.append(entry)
+                entry = PoEntry(last_end, line_start)
+            last_end = position
+            last_line_start, last_line = line_start, raw_line
+
+            if symbol == 'MC':
+                # Continuation lines do not change the state
+                value = unescape(token[1:-1])
+                if state == 'MS':
+                    entry.msgstr += value
+                    entry.msgstr_end = line_start + len(raw_line.rstrip())
+                elif state == 'MI':
+                    entry.msgid += value
+                elif state == 'MX':
+                    entry.msgstr_plural[msgstr_index] += value
+                    entry.msgstr_end = line_start + len(raw_line.rstrip())
+                elif state == 'MP':
+                    entry.msgid_plural += value
+                elif state == 'CT':
+                    entry.msgctxt += value
+                elif state == 'PM':
+                    entry.previous_msgid += value[3:]
+                elif state == 'PP':
+                    entry.previous_msgid_plural += value[3:]
+                elif state == 'PC':
+                    entry.previous_msgctxt += value[3:]
+                continue
+
+            if symbol == 'MI':
+                entry.obsolete = obsolete
+                entry.msgid = unescape(token[1:-1])
+            elif symbol == 'MS':
+                entry.msgstr = unescape(token[1:-1])
+                entry.msgstr_start = line_start
+                entry.msgstr_end = line_start + len(raw_line.rstrip())
+            elif symbol == 'OC':
+                for occurrence in token[3:].split():
+                    try:
+                        filename, line = occurrence.split(':')
+                        if not line.isdigit():
+                            filename = filename + line
+                            line = u''
+                        entry.occurrences.append((filename, line))
+                    except ValueError:
+                        entry.occurrences.append((occurrence, u''))
+            elif symbol == 'FL':
+                entry.flags += token[3:].split(', ')
+            elif symbol == 'GC':
+                if entry.comment:
+                    entry.comment += u'\n'
+                entry.comment += token[3:]
+            elif symbol == 'TC':
+                if entry.tcomment:
+                    entry.tcomment += u'\n'
+                tcomment = token.lstrip('#')
+                if tcomment.startswith(' '):
+                    tcomment = tcomment[1:]
+                entry.tcomment += tcomment
+            elif symbol == 'MX':
+                msgstr_index, _, value = token[7:].partition(']')
+                entry.msgstr_plural[msgstr_index] = unescape(
+                    value.lstrip()[1:-1]
+                )
+                if state != 'MX':
+                    entry.msgstr_start = line_start
+                entry.msgstr_end = line_start + len(raw_line.rstrip())
+            elif symbol == 'MP':
+                entry.msgid_plural = unescape(token[1:-1])
+            elif symbol == 'CT':
+                entry.msgctxt = unescape(token[1:-1])
+            elif symbol == 'PM':
+                entry.previous_msgid = unescape(token[1:-1])
+            elif symbol == 'PP':
+                entry.previous_msgid_plural = unescape(token[1:-1])
+            elif symbol == 'PC':
+                entry.previous_msgctxt = unescape(token[1:-1])
+            state = next_state
+
+        if entry is not None:
+            self._close_entry(entry, last_line_start, last_line)
+            entries.append(entry)
+
+        for index, entry in enumerate(entries):
+            if entry.msgid == u'' and not entry.obsolete:
+                self.metadata_entry = entries.pop(index)
+                break
+        self.entries = entries
+        return entries
+
+    @staticmethod
+    def _close_entry(entry, last_line_start, last_line):
+        """Sets the end positions of the entry, given its last line."""
+        entry.content_end = last_line_start + len(last_line.splitlines()[0])
+        entry.end = last_line_start + len(last_line)
+
+    def _classify(self, line, tokens, line_number):
+        """Returns the symbol of a (stripped) line that is not a continuation
+        line and the token that should be processed for it, or
+        `(None, None)` if the line is to be ignored.
+        """
+        keyword = tokens[0]
+        if keyword in self.KEYWORDS and len(tokens) > 1:
+            token = line[len(keyword):].lstrip()
+            if '"' in token[1:-1]:
+                self._check_quotes(token, line_number)
+            return self.KEYWORDS[keyword], token
+        if keyword == '#:':
+            return ('OC', line) if len(tokens) > 1 else (None, None)
+        if line[:1] == '"':
+            if '"' in line[1:-1]:
+                self._check_quotes(line, line_number)
+            return 'MC', line
+        if line[:7] == 'msgstr[':
+            return 'MX', line
+        if keyword == '#,':
+            return ('FL', line) if len(tokens) > 1 else (None, None)
+        if keyword == '#' or keyword.startswith('##'):
+            if line == '#':
+                line += ' '
+            return 'TC', line
+        if keyword == '#.':
+            return ('GC', line) if len(tokens) > 1 else (None, None)
+        if keyword == '#|':
+            if len(tokens) <= 1:
+                raise PoSyntaxError(
+                    u"Syntax error in po file (line {})".format(line_number)
+                )
+            line = line[2:].lstrip()
+            if tokens[1].startswith('"'):
+                # Continuation of a previous msgid/msgctxt
+                return 'MC', line
+            if len(tokens) == 2:
+                raise PoSyntaxError(
+                    u"Syntax error in po file (line {}): invalid "
+                    u"continuation line".format(line_number)
+                )
+            if tokens[1] not in self.PREVIOUS_KEYWORDS:
+                raise PoSyntaxError(
+                    u"Syntax error in po file (line {}): unknown keyword "
+                    u"{}".format(line_number, tokens[1])
+                )
+            return (self.PREVIOUS_KEYWORDS[tokens[1]],
+                    line[len(tokens[1]):].lstrip())
+        raise PoSyntaxError(
+            u"Syntax error in po file (line {})".format(line_number)
+        )
+
+    @staticmethod
+    def _check_quotes(token, line_number):
+        if UNESCAPED_QUOTE_REGEX.search(token[1:-1]):
+            raise PoSyntaxError(
+                u"Syntax error in po file (line {}): unescaped double quote "
+                u"found".format(line_number)
+            )
+
+
+# The text of an entry is `head + placeholder + tail`, where `placeholder` is
+# its msgstr lines. `replacement` is the value that is compared with the
+# strings' template replacements (msgstr[0] for plural entries).
+PoTemplateEntry = namedtuple(
+    "PoTemplateEntry",
+    ['head', 'placeholder', 'tail', 'replacement', 'plural', 'obsolete',
+     'msgctxt', 'msgid', 'msgid_plural'],
+)
+
+
+class PoTemplate(object):
+    """A PO template that has been parsed once and can be compiled any number
+    of times, without parsing it again.
+
+    * `chunks` holds the text between the entries, so there is always one
+      chunk more than there are entries; the header and the metadata entry
+      are in the first one
+    * `entries` holds a `PoTemplateEntry` for every entry
+    * `metadata` holds the msgstr of the metadata entry, if any
+    * `newline_type` is the newline type of the text ('UNIX' or 'DOS'); the
+      chunks and entries always use UNIX newlines
+
+    Removing and adding entries returns a new template, so a cached template
+    is never modified. Templates can be pickled or serialized with
+    `to_json`.
+    """
+
+    __slots__ = ('chunks', 'entries', 'metadata', 'newline_type')
+
+    def __init__(self, chunks, entries, metadata=None, newline_type='UNIX'):
+        self.chunks = chunks
+        self.entries = entries
+        self.metadata = metadata
+        self.newline_type = newline_type
+
+    def __getstate__(self):
+        return (self.chunks, self.entries, self.metadata, self.newline_type)
+
+    def __setstate__(self, state):
+        self.chunks, self.entries, self.metadata, self.newline_type = state
+
+    def to_string(self):
+        """Returns the text of the template."""
+        return self.finalize(u''.join(self._pieces()))
+
+    def _pieces(self):
+        yield self.chunks[0]
+        for entry, chunk in zip(self.entries, self.chunks[1:]):
+            yield entry.head
+            yield entry.placeholder
+            yield entry.tail
+            yield chunk
+
+    def finalize(self, content):
+        """Restores the newline type of the template in `content`."""
+        if self.newline_type == 'DOS':
+            return force_newline_type(content, 'DOS')
+        return content
+
+    def without_entries(self, indexes):
+        """Returns a copy of the template without the entries at `indexes`.
+        The text around a removed entry is kept.
+        """
+        indexes = set(indexes)
+        chunks = [self.chunks[0]]
+        entries = []
+        for index, (entry, chunk) in enumerate(zip(self.entries,
+                                                   self.chunks[1:])):
+            if index in indexes:
+                chunks[-1] += chunk
+            else:
+                entries.append(entry)
+                chunks.append(chunk)
+        return PoTemplate(chunks, entries, self.metadata, self.newline_type)
+
+    def with_entries(self, entries):
+        """Returns a copy of the template with `entries` appended. The entries'
+        heads are expected to start with the blank line that separates them
+        from the previous entry.
+        """
+        chunks = list(self.chunks)
+        last_piece = next(
+            (piece for piece in reversed(list(self._pieces())) if piece), u''
+        )
+        if not last_piece.endswith(u'\n'):
+            chunks[-1] += u'\n'
+        chunks.extend(u'' for _ in entries)
+        return PoTemplate(chunks, self.entries + list(entries), self.metadata,
+                          self.newline_type)
+
+    def to_json(self):
+        return json.dumps({
+            'chunks': self.chunks,
+            'entries': self.entries,
+            'metadata': self.metadata,
+            'newline_type': self.newline_type,
+        })
+
+    @classmethod
+    def from_json(cls, content):
+        data = json.loads(content)
+        return cls(data['chunks'],
+                   [PoTemplateEntry(*entry) for entry in data['entries']],
+                   data['metadata'], data['newline_type'])
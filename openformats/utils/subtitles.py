@@ -0,0 +1,202 @@
+"""
+Incremental reader for subtitle files (SRT, VTT), so that they can be parsed
+and compiled a section at a time instead of holding the whole file, and its
+copies, in memory.
+"""
+
+from array import array
+
+from ..transcribers import Transcriber
+from .newlines import find_newline_type, force_newline_type
+
+
+class SubtitleReader(object):
+    r"""
+    Reads the sections of a subtitle file, the parts of it that are
+    separated by blank lines, from a text stream.
+
+    The sections are the same as ``content.split('\n\n')`` of the whole
+    content, but only the section being read (and a chunk of the stream) is
+    held in memory.
+
+    Like `Transcriber`, the reader detects the newline type of the content
+    from its first newline and hands out sections with UNIX newlines.
+    `newline_type` is known once the first section has been read and
+    `restore_newlines` turns text back to it:
+
+        >>> reader = SubtitleReader(io.StringIO(u"1\r\nfoo\r\n\r\n2\r\nbar"))
+        >>> list(reader)
+
+        [u"1\nfoo", u"2\nbar"]
+
+        >>> reader.restore_newlines(u"1\nfoo")
+
+        u"1\r\nfoo"
+    """
+
+    SEPARATOR = '\n\n'
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, stream, chunk_size=None):
+        self.stream = stream
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self.newline_type = None
+
+    def _read_chunks(self):
+        carriage_return = ''
+        while True:
+            chunk = self.stream.read(self.chunk_size)
+            if not chunk:
+                break
+            chunk = carriage_return + chunk
+            # Keep a trailing '\r' for the next chunk, it may be followed by
+            # the '\n' of a DOS newline
+            if chunk.endswith('\r'):
+                chunk, carriage_return = chunk[:-1], '\r'
+            else:
+                carriage_return = ''
+            if chunk:
+                yield chunk
+        if carriage_return:
+            yield carriage_return
+
+    def _read_unix_chunks(self):
+        pending = ''
+        for chunk in self._read_chunks():
+            if self.newline_type is None:
+                pending += chunk
+                if '\n' not in pending:
+                    continue
+                self.newline_type = find_newline_type(pending)
+                chunk, pending = pending, ''
+            if self.newline_type == 'DOS':
+                chunk = force_newline_type(chunk, 'UNIX')
+            yield chunk
+        if self.newline_type is None:
+            self.newline_type = find_newline_type(pending)
+        if pending:
+            yield pending
+
+    def __iter__(self):
+        buffer = ''
+        # Where to look for the next separator from, the rest of the buffer
+        # has been searched already
+        search_from = 0
+        for chunk in self._read_unix_chunks():
+            buffer += chunk
+            start = 0
+            while True:
+                end = buffer.find(self.SEPARATOR, max(start, search_from))
+                if end == -1:
+                    break
+                yield buffer[start:end]
+                start = end + len(self.SEPARATOR)
+            buffer = buffer[start:]
+            search_from = max(len(buffer) - len(self.SEPARATOR) + 1, 0)
+        yield buffer
+
+    def iter_subtitles(self):
+        """
+        Yield a `(gap, subtitle)` tuple for each section with content, where
+        `subtitle` is the section without the whitespace around it and `gap`
+        is all the content between the previous subtitle and this one. The
+        content after the last subtitle is yielded with a None subtitle.
+        """
+        gap = ''
+        for index, section in enumerate(self):
+            if index:
+                gap += self.SEPARATOR
+            subtitle = section.strip()
+            if not subtitle:
+                gap += section
+                continue
+            start = section.index(subtitle[0])
+            yield gap + section[:start], subtitle
+            gap = section[start + len(subtitle):]
+        yield gap, None
+
+    def restore_newlines(self, text):
+        """Convert the UNIX newlines of `text` to the newline type of the
+        content that is being read."""
+        if self.newline_type == 'DOS':
+            return force_newline_type(text, 'DOS')
+        return text
+
+
+class SectionTranscriber(Transcriber):
+    """
+    A Transcriber for a subtitle handed out by `SubtitleReader`.
+
+    The reader has already taken care of the newlines, so the subtitle is
+    used as it is and the destination gets the newlines of the content, and
+    the line numbers continue from `newline_count`, the newlines of the
+    content before it.
+    """
+
+    def __init__(self, subtitle, newline_type='UNIX', newline_count=0):
+        super(SectionTranscriber, self).__init__(subtitle)
+        self.source = subtitle
+        self.newline_type = newline_type
+        self.newline_count = newline_count
+
+
+def to_milliseconds(hours, minutes, seconds, milliseconds):
+    """Return the time of a timestamp's parts in milliseconds."""
+    return ((hours * 60 + minutes) * 60 + seconds) * 1000 + milliseconds
+
+
+class TimingIndex(object):
+    """
+    The start and end times of the cues of a subtitle file in milliseconds,
+    in two compact `array('q')` columns, so that tools that retime, merge
+    or check cues do not need to parse the `occurrences` of every string.
+
+    Cue `i` is the `i`-th string of the stringset. The index is validated
+    while the cues are added: it records the positions of the cues that
+    start before the cue before them (`unordered`), that end before they
+    start (`inverted`) and that start before an earlier cue has ended
+    (`overlapping`).
+
+        >>> timings = TimingIndex()
+        >>> timings.append(0, 2000)
+        >>> timings.append(1500, 3000)
+        >>> timings[1], list(timings.overlapping)
+
+        ((1500, 3000), [1])
+    """
+
+    def __init__(self):
+        self.starts = array('q')
+        self.ends = array('q')
+        self.unordered = array('q')
+        self.inverted = array('q')
+        self.overlapping = array('q')
+        self._last_end = None
+
+    def append(self, start, end):
+        position = len(self.starts)
+        if position:
+            if start < self.starts[-1]:
+                self.unordered.append(position)
+            if start < self._last_end:
+                self.overlapping.append(position)
+            self._last_end = max(self._last_end, end)
+        else:
+            self._last_end = end
+        if end < start:
+            self.inverted.append(position)
+        self.starts.append(start)
+        self.ends.append(end)
+
+    @property
+    def is_ordered(self):
+        return not self.unordered
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, position):
+        return self.starts[position], self.ends[position]
+
+    def __iter__(self):
+        return zip(self.starts, self.ends)